@@ -1,22 +1,45 @@
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 from models.pedido import Pedido
-from typing import List, Optional
+from typing import Dict, List, Optional
 import streamlit as st
 import os
 import shutil
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.pedidos_store import criar_store, campos_transicao, filtrar_periodo, COLUNAS_PEDIDOS, STATUS_PEDIDO
+from utils.sequencia_pedidos import ARQUIVO_SEQUENCIA, SequenciaPedidos
+from utils.indice_pendentes import IndicePendentes
+from utils.backup_pedidos import BackupPedidos
+from utils.cache_colunar import ler_excel
+from utils.sincronizador_sheets import SincronizadorSheets
+from utils.cota_sheets import CotaExcedida, PRIORIDADE_LEITURA
 import webbrowser
 import pathlib
 import base64
 
+# Colunas da aba 'paco' usadas para montar os pedidos (as demais não são baixadas)
+COLUNAS_PACO = ["Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT", "Semiacabado", "Pagoda"]
+
 class PedidoController:
-    def __init__(self, caminho_planilha: str, enable_sheets: bool = False):
+    def __init__(
+        self,
+        caminho_planilha: str,
+        enable_sheets: bool = False,
+        backend: str = "sqlite",
+        diretorio_pedidos: Optional[str] = None,
+        sheets_sync: Optional[SheetsPedidosSync] = None,
+        sincronizar_em_segundo_plano: bool = True
+    ):
         """
         Inicializa o controlador com o caminho da planilha de localizações
         Args:
             caminho_planilha: Caminho da planilha que contém as localizações (definido no .env)
             enable_sheets: Se True, inicializa o SheetsPedidosSync
+            backend: Armazenamento local dos pedidos ('sqlite' ou 'excel')
+            diretorio_pedidos: Pasta do armazenamento local, do backup e da numeração (padrão: pedidos/ do projeto)
+            sheets_sync: SheetsPedidosSync já conectado, usado no lugar de criar um (enable_sheets é ignorado)
+            sincronizar_em_segundo_plano: Se False, não inicia o envio em segundo plano; sincronizar_sheets
+                é chamado diretamente
         """
         # Normalizar o caminho da planilha
         self.caminho_planilha = os.path.abspath(caminho_planilha)
@@ -24,7 +47,7 @@ class PedidoController:
         
         # Definir caminho do arquivo de pedidos
         self.diretorio_base = os.path.dirname(os.path.abspath(__file__))
-        self.diretorio_pedidos = os.path.join(os.path.dirname(self.diretorio_base), 'pedidos')
+        self.diretorio_pedidos = diretorio_pedidos or os.path.join(os.path.dirname(self.diretorio_base), 'pedidos')
         self.arquivo_pedidos = os.path.join(self.diretorio_pedidos, 'pedidos.xlsx')
         self.diretorio_backup = os.path.join(self.diretorio_pedidos, 'backup')
 
@@ -32,12 +55,41 @@ class PedidoController:
         os.makedirs(self.diretorio_pedidos, exist_ok=True)
         os.makedirs(self.diretorio_backup, exist_ok=True)
 
+        # Armazenamento local dos pedidos (pedidos.xlsx fica apenas para importação/exportação)
+        self.store = criar_store(backend, self.diretorio_pedidos)
+        # Índice em memória dos pedidos PENDENTE para a verificação de serial duplicado
+        self.indice_pendentes = IndicePendentes(self.store.carregar_pendentes, versao=self.store.revisao)
+        # Snapshots comprimidos + diário de operações (cada escrita só acrescenta uma linha)
+        self.backup = BackupPedidos(self.diretorio_backup, self.store.carregar_pedidos)
+
         # Inicializar Google Sheets Sync
-        self.sheets_sync = None
-        if enable_sheets:
-            from utils.sheets_pedidos_sync import SheetsPedidosSync
+        self.sheets_sync = sheets_sync
+        if self.sheets_sync is None and enable_sheets:
             self.sheets_sync = SheetsPedidosSync(enable_sheets=True)
 
+        # Alocador de números de pedido: com o Google Sheets, o mesmo contador (e os mesmos blocos
+        # reservados na aba 'Controle') usado pelos apps de leitura local; sem ele, numeração local
+        if self.sheets_sync and self.sheets_sync.client:
+            self.sequencia = self.sheets_sync.obter_sequencia()
+        else:
+            self.sequencia = SequenciaPedidos(
+                os.path.join(self.diretorio_pedidos, os.path.basename(ARQUIVO_SEQUENCIA)),
+                semente=self._ultimo_numero_local
+            )
+
+        # Envio em segundo plano ao Google Sheets: escritas gravam localmente e só avisam o sincronizador.
+        # Um sincronizador por armazenamento no processo (sessões do Streamlit sobre o mesmo arquivo o compartilham)
+        self.sincronizador = None
+        if self.sheets_sync and self.sheets_sync.client and sincronizar_em_segundo_plano:
+            self.sincronizador = SincronizadorSheets.obter(
+                os.path.abspath(self.store.caminho),
+                self.sincronizar_sheets,
+                self.contar_pendencias_sincronizacao,
+                os.path.join(self.diretorio_pedidos, 'sincronizacao.lock'),
+                contar_quarentena=lambda: len(self.store.quarentena_sincronizacao())
+            )
+            self.sincronizador.iniciar()
+
         # Verificar se a planilha existe
         if not os.path.exists(self.caminho_planilha):
             st.error(f"""
@@ -64,7 +116,7 @@ class PedidoController:
             # Tenta abrir a planilha local e ler a aba correta
             try:
                 # Tenta ler a aba 'Projeto' (ajuste se o nome for diferente)
-                df = pd.read_excel(caminho, sheet_name='Projeto', dtype=str)
+                df = ler_excel(caminho, 'Projeto', dtype=str)
             except ValueError as ve:
                 # Se a aba não existir, mostra as abas disponíveis
                 abas = pd.ExcelFile(caminho).sheet_names
@@ -120,113 +172,135 @@ class PedidoController:
         self.pedidos = self._carregar_planilha(self.caminho_planilha)
         return self.pedidos
 
+    def exportar_pedidos_excel(self, caminho: Optional[str] = None) -> str:
+        """Exporta os pedidos do armazenamento local para Excel (padrão: pedidos/pedidos.xlsx)"""
+        caminho = caminho or self.arquivo_pedidos
+        self.store.exportar_excel(caminho)
+        return caminho
+
+    def importar_pedidos_excel(self, caminho: str) -> int:
+        """Importa pedidos de um arquivo Excel, ignorando números que já existem localmente"""
+        importados = self.store.importar_excel(caminho)
+        if importados:
+            self._fazer_backup()
+            self._agendar_sincronizacao()
+        return importados
+
     def _fazer_backup(self):
-        """Faz backup do arquivo antes de modificá-lo"""
+        """Grava um snapshot completo dos pedidos (usado após importações e restaurações)"""
         try:
-            if os.path.exists(self.arquivo_pedidos):
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_path = os.path.join(
-                    self.diretorio_backup, 
-                    f"pedidos_backup_{timestamp}.xlsx"
-                )
-                
-                # Copiar arquivo atual para backup
-                shutil.copy2(self.arquivo_pedidos, backup_path)
-                
-                # Manter apenas os últimos 10 backups
-                backups = sorted([
-                    os.path.join(self.diretorio_backup, f) 
-                    for f in os.listdir(self.diretorio_backup)
-                    if f.endswith('.xlsx')
-                ])
-                while len(backups) > 10:
-                    os.remove(backups.pop(0))
+            self.backup.snapshot()
         except Exception as e:
             st.warning(f"Não foi possível fazer backup: {str(e)}")
 
-    def _ler_pedidos(self) -> pd.DataFrame:
-        """Lê a aba 'Pedidos' do Google Sheets com cache"""
+    def _registrar_backup(self, operacao: str, **dados):
+        """Registra no diário de backup uma escrita já gravada no armazenamento local"""
         try:
-            # Verificar cache
-            if 'cache_pedidos' in st.session_state:
-                return st.session_state['cache_pedidos']
+            self.backup.registrar(operacao, **dados)
+        except Exception as e:
+            st.warning(f"Não foi possível registrar o backup: {str(e)}")
 
+    def listar_pontos_restauracao(self) -> List[dict]:
+        """Snapshots disponíveis e até quando o diário de cada um permite restaurar"""
+        return self.backup.pontos_restauracao()
+
+    def restaurar_backup(self, ate: datetime, aceitar_lacuna: bool = False) -> int:
+        """
+        Restaura os pedidos como estavam no instante informado. Se a retenção já descartou o
+        diário que levava até esse instante, lança RestauracaoIncompleta, a menos que
+        `aceitar_lacuna` seja True (restaura o ponto mais próximo disponível antes dele).
+
+        Returns:
+            int: Quantidade de pedidos restaurados
+        """
+        df = self.backup.restaurar(ate, aceitar_lacuna=aceitar_lacuna)
+        registros = df.to_dict(orient='records')
+        # Guarda o estado atual antes de sobrescrever, para a restauração poder ser desfeita
+        self._fazer_backup()
+        self.store.substituir_pedidos(registros)
+        self._fazer_backup()
+        self.indice_pendentes.invalidar()
+        return len(registros)
+
+    def _ler_pedidos(self, prioridade: int = PRIORIDADE_LEITURA) -> pd.DataFrame:
+        """Lê a aba 'Pedidos' do Google Sheets (leitura incremental compartilhada entre as sessões)"""
+        try:
             if self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL:
-                sheet = self.sheets_sync.client.open_by_url(self.sheets_sync.SPREADSHEET_URL)
-                worksheet = sheet.worksheet("Pedidos")
-                data = worksheet.get_all_records()
-                df = pd.DataFrame(data)
+                df = self.sheets_sync.carregar_pedidos_incremental(prioridade=prioridade)
                 # Garantir que as colunas existam
                 if 'Ultima_Atualizacao' not in df.columns:
                     df['Ultima_Atualizacao'] = ""
                 if 'Responsavel_Atualizacao' not in df.columns:
                     df['Responsavel_Atualizacao'] = ""
-                
-                # Salvar no cache
-                st.session_state['cache_pedidos'] = df
                 return df
             else:
                 return pd.DataFrame()
         except Exception as e:
-            if "Quota exceeded" in str(e) or "[429]" in str(e):
-                # Se tiver cache, usa ele
-                if 'cache_pedidos' in st.session_state:
-                    return st.session_state['cache_pedidos']
-                return pd.DataFrame()
+            self._avisar_falha_leitura("Pedidos", e)
             return pd.DataFrame()
 
     def _ler_itens(self) -> pd.DataFrame:
-        """Lê a aba 'Itens' do Google Sheets com cache"""
+        """Lê a aba 'Itens' do Google Sheets (cache compartilhado entre as sessões)"""
         try:
-            # Verificar cache
-            if 'cache_itens' in st.session_state:
-                return st.session_state['cache_itens']
-
             if self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL:
-                sheet = self.sheets_sync.client.open_by_url(self.sheets_sync.SPREADSHEET_URL)
-                worksheet = sheet.worksheet("Itens")
-                data = worksheet.get_all_records()
-                df = pd.DataFrame(data)
-                
-                # Salvar no cache
-                st.session_state['cache_itens'] = df
-                return df
+                data = self.sheets_sync.ler_registros("Itens")
+                return pd.DataFrame(data)
             else:
                 return pd.DataFrame()
         except Exception as e:
-            if "Quota exceeded" in str(e) or "[429]" in str(e):
-                # Se tiver cache, usa ele
-                if 'cache_itens' in st.session_state:
-                    return st.session_state['cache_itens']
-                return pd.DataFrame()
+            self._avisar_falha_leitura("Itens", e)
             return pd.DataFrame()
 
-    def _gerar_numero_pedido(self) -> str:
-        """Gera um número único para o pedido"""
+    def legenda_atualizacao_pedidos(self) -> Optional[str]:
+        """Texto com a idade dos pedidos exibidos (lidos do Google Sheets); None sem integração"""
+        if not (self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL):
+            return None
+        return self._legenda_atualizacao(self.sheets_sync.situacao_pedidos())
+
+    def legenda_contagem_status(self) -> Optional[str]:
+        """Texto com a idade dos totais por Status do dashboard; None sem integração"""
+        if not (self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL):
+            return None
+        return self._legenda_atualizacao(self.sheets_sync.situacao_contagem_status())
+
+    @staticmethod
+    def _legenda_atualizacao(situacao: dict) -> Optional[str]:
+        if situacao["idade_s"] is None:
+            return None
+        idade = int(situacao["idade_s"])
+        legenda = f"Dados do Google Sheets de {idade} s atrás" if idade < 120 else f"Dados do Google Sheets de {idade // 60} min atrás"
+        if situacao["atualizando"]:
+            legenda += " · atualizando…"
+        elif situacao["erro"]:
+            legenda += f" · última atualização falhou: {situacao['erro']}"
+        return legenda
+
+    @staticmethod
+    def _avisar_falha_leitura(aba: str, erro: Exception):
+        if isinstance(erro, CotaExcedida):
+            st.warning(f"Cota do Google Sheets esgotada ao ler a aba '{aba}'. Aguarde um minuto e recarregue a página.")
+        else:
+            st.warning(f"Erro ao ler a aba '{aba}' do Google Sheets: {str(erro)}")
+
+    def _ultimo_numero_local(self) -> int:
+        """Último número de pedido gravado localmente (semente do alocador de números)"""
+        ultimo_numero = self.store.ultimo_numero_pedido()
+        if not ultimo_numero:
+            return 0
         try:
-            if not os.path.exists(self.arquivo_pedidos):
-                return "REQ-001"
-            df = pd.read_excel(self.arquivo_pedidos)
-            if df.empty or 'Numero_Pedido' not in df.columns:
-                return "REQ-001"
-            # Garante que pega o último número válido
-            numeros = df['Numero_Pedido'].dropna().tolist()
-            if not numeros:
-                return "REQ-001"
-            ultimo_numero = numeros[-1]
-            try:
-                numero = int(ultimo_numero.split("-")[-1]) + 1
-            except Exception:
-                numero = len(numeros) + 1
-            return f"REQ-{numero:03d}"
+            return int(str(ultimo_numero).split("-")[-1])
         except Exception:
-            return "REQ-001"
+            return len(self.store.carregar_pedidos())
+
+    def _gerar_numero_pedido(self) -> str:
+        """Gera um número único para o pedido"""
+        return self.sequencia.proximo()
 
     def _normalizar_status(self, status: str) -> str:
         """Normaliza o status para maiúsculo e garante que seja um dos valores válidos."""
         status_upper = status.upper()
-        if status_upper not in ['PENDENTE', 'PROCESSO', 'CONCLUÍDO']:
-            raise ValueError(f"Status inválido: {status}. Status permitidos: PENDENTE, PROCESSO, CONCLUÍDO")
+        if status_upper not in STATUS_PEDIDO:
+            raise ValueError(f"Status inválido: {status}. Status permitidos: {', '.join(STATUS_PEDIDO)}")
         return status_upper
 
     def _verificar_serial_mesmo_lote(self, serial: str, maquina: str, posto: str, coordenada: str) -> bool:
@@ -234,30 +308,38 @@ class PedidoController:
         Verifica se já existe um pedido PENDENTE com o mesmo serial, máquina, posto e coordenada
         """
         try:
-            if not os.path.exists(self.arquivo_pedidos):
-                return False
-
-            df = pd.read_excel(self.arquivo_pedidos)
-            if df.empty:
-                return False
-
             # Só bloqueia se já houver um pedido PENDENTE igual
-            pedidos_serial = df[
-                (df['Serial'] == serial) &
-                (df['Status'] == 'PENDENTE') &
-                (df['Maquina'] == maquina) &
-                (df['Posto'] == posto) &
-                (df['Coordenada'] == coordenada)
-            ]
-
-            return len(pedidos_serial) > 0
+            return self.indice_pendentes.contem(serial, maquina, posto, coordenada)
         except Exception as e:
             st.error(f"Erro ao verificar serial: {str(e)}")
             return False
 
+    def _montar_pedido(self, pedido_info: dict, numero_pedido: str) -> dict:
+        """Monta a linha do pedido a partir das informações do formulário/leitura"""
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return {
+            "Numero_Pedido": numero_pedido,
+            "Data": agora,
+            "Serial": pedido_info['serial'],
+            "Maquina": pedido_info['maquina'],
+            "Posto": pedido_info['posto'],
+            "Coordenada": pedido_info['coordenada'],
+            "Modelo": pedido_info['modelo'],
+            "OT": pedido_info['ot'],
+            "Semiacabado": pedido_info['semiacabado'],
+            "Pagoda": pedido_info['pagoda'],
+            "Solicitante": pedido_info['solicitante'],
+            "Observacoes": pedido_info['observacoes'],
+            "Urgente": pedido_info['urgente'],
+            "Status": "PENDENTE",
+            "Ultima_Atualizacao": agora,
+            "Responsavel_Atualizacao": pedido_info['solicitante'],
+            "Quantidade": pedido_info.get('quantidade', 1)
+        }
+
     def salvar_pedido(self, pedido_info: dict) -> str:
         """
-        Salva um novo pedido no arquivo Excel e sincroniza com o Google Sheets
+        Salva um novo pedido no armazenamento local e sincroniza com o Google Sheets
         
         Args:
             pedido_info (dict): Dicionário com as informações do pedido
@@ -266,17 +348,6 @@ class PedidoController:
             str: Número do pedido criado
         """
         try:
-            # Verificar se o arquivo existe
-            if not os.path.exists(self.arquivo_pedidos):
-                # Criar DataFrame vazio com as colunas corretas
-                df = pd.DataFrame(columns=[
-                    "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada",
-                    "Modelo", "OT", "Semiacabado", "Pagoda", "Solicitante", "Observacoes",
-                    "Urgente", "Status", "Ultima_Atualizacao", "Responsavel_Atualizacao"
-                ])
-                # Salvar arquivo vazio
-                df.to_excel(self.arquivo_pedidos, index=False)
-
             # Verificar se o serial já existe no mesmo lote
             if self._verificar_serial_mesmo_lote(
                 pedido_info['serial'],
@@ -289,55 +360,16 @@ class PedidoController:
             # Gerar número do pedido
             numero_pedido = self._gerar_numero_pedido()
 
-            # Fazer backup antes de modificar
-            self._fazer_backup()
-
-            # Ler o arquivo atual
-            df = pd.read_excel(self.arquivo_pedidos)
-
             # Preparar novo pedido
-            novo_pedido = {
-                "Numero_Pedido": numero_pedido,
-                "Data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Serial": pedido_info['serial'],
-                "Maquina": pedido_info['maquina'],
-                "Posto": pedido_info['posto'],
-                "Coordenada": pedido_info['coordenada'],
-                "Modelo": pedido_info['modelo'],
-                "OT": pedido_info['ot'],
-                "Semiacabado": pedido_info['semiacabado'],
-                "Pagoda": pedido_info['pagoda'],
-                "Solicitante": pedido_info['solicitante'],
-                "Observacoes": pedido_info['observacoes'],
-                "Urgente": pedido_info['urgente'],
-                "Status": "PENDENTE",
-                "Ultima_Atualizacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Responsavel_Atualizacao": pedido_info['solicitante']
-            }
+            novo_pedido = self._montar_pedido(pedido_info, numero_pedido)
 
-            # Adicionar novo pedido ao DataFrame
-            df = pd.concat([df, pd.DataFrame([novo_pedido])], ignore_index=True)
-
-            # Salvar no arquivo local
-            df.to_excel(self.arquivo_pedidos, index=False)
-
-            # Sincronizar com Google Sheets se habilitado
-            if self.sheets_sync and self.sheets_sync.client:
-                try:
-                    # Preparar dados para o Google Sheets
-                    df_pedidos = df.copy()
-                    df_itens = pd.DataFrame([{
-                        "Numero_Pedido": numero_pedido,
-                        "Serial": pedido_info['serial'],
-                        "Quantidade": pedido_info.get('quantidade', 1)
-                    }])
-
-                    # Sincronizar com Google Sheets
-                    success, message = self.sheets_sync.salvar_pedido_completo(df_pedidos, df_itens)
-                    if not success:
-                        st.warning(f"Aviso: {message}")
-                except Exception as e:
-                    st.warning(f"Aviso: Erro ao sincronizar com Google Sheets: {str(e)}")
+            # Gravar somente o novo pedido no armazenamento local
+            self.store.inserir_pedidos([novo_pedido])
+            self.indice_pendentes.adicionar(novo_pedido)
+            self._registrar_backup('inserir', pedidos=[novo_pedido])
+
+            # Envio ao Google Sheets em segundo plano
+            self._agendar_sincronizacao()
 
             return numero_pedido
 
@@ -345,19 +377,168 @@ class PedidoController:
             st.error(f"Erro ao salvar pedido: {str(e)}")
             raise
 
-    def buscar_pedidos(self, numero_pedido: Optional[str] = None, status: Optional[str] = None) -> pd.DataFrame:
+    def salvar_pedidos_lote(self, pedidos_info: List[dict]) -> List[dict]:
         """
-        Busca pedidos com base em filtros opcionais
+        Salva vários pedidos de uma vez: valida, numera, grava em uma única transação local,
+        registra uma única entrada de backup e agenda o envio ao Google Sheets.
+
+        Args:
+            pedidos_info (list): Lista de dicionários com as informações de cada pedido
+
+        Returns:
+            list: Um resultado por pedido, na mesma ordem: {'serial', 'numero_pedido', 'erro'}
+        """
+        resultados = []
+        validos = []
+        chaves_lote = set()
+        for pedido_info in pedidos_info:
+            resultado = {'serial': pedido_info.get('serial', ''), 'numero_pedido': None, 'erro': None}
+            resultados.append(resultado)
+            try:
+                chave = tuple(str(pedido_info[campo]).strip() for campo in ('serial', 'maquina', 'posto', 'coordenada'))
+            except KeyError as e:
+                resultado['erro'] = f"Campo obrigatório ausente: {str(e)}"
+                continue
+            # Duplicado em pedido ativo ou repetido dentro do próprio lote
+            if chave in chaves_lote or self._verificar_serial_mesmo_lote(*chave):
+                resultado['erro'] = "Este serial já existe em um pedido ativo com as mesmas informações de máquina, posto e coordenada."
+                continue
+            chaves_lote.add(chave)
+            validos.append((resultado, pedido_info))
+
+        if not validos:
+            return resultados
+
+        try:
+            # Reservar todos os números de uma vez
+            numeros = [self.sequencia.formatar(n) for n in self.sequencia.reservar(len(validos))]
+
+            novos_pedidos = [
+                self._montar_pedido(pedido_info, numero)
+                for (_, pedido_info), numero in zip(validos, numeros)
+            ]
+            self.store.inserir_pedidos(novos_pedidos)
+            self._registrar_backup('inserir', pedidos=novos_pedidos)
+            for indice, novo_pedido in enumerate(novos_pedidos):
+                self.indice_pendentes.adicionar(novo_pedido, registrar_escrita=(indice == 0))
+            for (resultado, _), numero in zip(validos, numeros):
+                resultado['numero_pedido'] = numero
+        except Exception as e:
+            st.error(f"Erro ao salvar lote de pedidos: {str(e)}")
+            for resultado, _ in validos:
+                resultado['erro'] = f"Erro ao criar pedido: {str(e)}"
+            return resultados
+
+        # O lote inteiro vai ao Google Sheets em um único envio, em segundo plano
+        self._agendar_sincronizacao()
+
+        return resultados
+
+    def _agendar_sincronizacao(self):
+        """Avisa o sincronizador em segundo plano que há escritas locais a enviar"""
+        if self.sincronizador:
+            self.sincronizador.notificar()
+
+    def contar_pendencias_sincronizacao(self) -> int:
+        """Pedidos criados ou alterados localmente que ainda não foram enviados ao Google Sheets"""
+        novos, alterados, _ = self.store.pendencias_sincronizacao()
+        return len(novos) + len(alterados)
+
+    def status_sincronizacao(self) -> Optional[dict]:
+        """Fila de envio ao Google Sheets (pendentes, atraso, erros); None sem integração"""
+        return self.sincronizador.status() if self.sincronizador else None
+
+    def sincronizar_sheets(self) -> tuple[bool, str]:
+        """
+        Envia ao Google Sheets apenas os pedidos criados ou alterados desde o último envio
+        confirmado (cursor de sincronização do armazenamento local). Pedidos que a planilha
+        recusa (serial já pendente lá, pedido ausente da aba) vão para a quarentena e não
+        impedem o envio dos demais; falhas de conexão ou cota mantêm tudo na fila.
+        """
+        if not self.sheets_sync or not self.sheets_sync.client:
+            return False, "Cliente do Google Sheets não configurado."
+
+        novos, alterados, marca = self.store.pendencias_sincronizacao()
+        recusados = 0
+
+        # Pedidos novos: um único append com as linhas ainda não enviadas
+        if not novos.empty:
+            duplicados = self.sheets_sync.pedidos_duplicados(novos)
+            enviar = novos[~novos["Numero_Pedido"].astype(str).isin(duplicados)]
+            if not enviar.empty:
+                df_itens = pd.DataFrame({
+                    "Numero_Pedido": enviar["Numero_Pedido"],
+                    "Serial": enviar["Serial"],
+                    "Quantidade": enviar["Quantidade"]
+                })
+                df_pedidos = enviar.reindex(columns=COLUNAS_PEDIDOS, fill_value="")
+                success, message = self.sheets_sync.salvar_pedido_completo(df_pedidos, df_itens)
+                if not success:
+                    return False, message
+            if duplicados:
+                self.store.colocar_em_quarentena('criacao', {
+                    numero: f"Serial já existe em um pedido ativo na planilha: {motivo}"
+                    for numero, motivo in duplicados.items()
+                })
+                recusados += len(duplicados)
+            self.store.confirmar_criacoes(marca)
+
+        # Pedidos já enviados que tiveram o status alterado: uma única escrita para todos
+        if not alterados.empty:
+            resultado = self.sheets_sync.atualizar_status_pedidos_sheets(
+                alterados[['Numero_Pedido', 'Status', 'Ultima_Atualizacao', 'Responsavel_Atualizacao']].to_dict(orient='records')
+            )
+            if resultado["erro"]:
+                return False, resultado["erro"]
+            if resultado["nao_encontrados"]:
+                self.store.colocar_em_quarentena('alteracao', {
+                    numero: "Pedido não encontrado na aba Pedidos do Google Sheets."
+                    for numero in resultado["nao_encontrados"]
+                })
+                recusados += len(resultado["nao_encontrados"])
+        self.store.confirmar_alteracoes(marca)
+
+        mensagem = f"{len(novos)} pedido(s) novo(s) e {len(alterados)} alteração(ões) processados."
+        if recusados:
+            mensagem += f" {recusados} recusado(s) pelo Google Sheets e colocado(s) em quarentena."
+        return True, mensagem
+
+    def quarentena_sincronizacao(self) -> pd.DataFrame:
+        """Pedidos recusados pelo Google Sheets no envio em segundo plano"""
+        return self.store.quarentena_sincronizacao()
+
+    def reenviar_quarentena(self, numeros: List[str]) -> int:
+        """Devolve pedidos da quarentena à fila de envio (após corrigir a causa na planilha)"""
+        reenviados = self.store.reenviar_quarentena(numeros)
+        if reenviados:
+            self._agendar_sincronizacao()
+        return reenviados
+
+    def descartar_quarentena(self, numeros: List[str]) -> int:
+        """Tira pedidos da quarentena sem reenviá-los"""
+        return self.store.descartar_quarentena(numeros)
+
+    def buscar_pedidos(
+        self,
+        numero_pedido: Optional[str] = None,
+        status: Optional[str] = None,
+        data_inicial: Optional[date] = None,
+        data_final: Optional[date] = None,
+        prioridade: int = PRIORIDADE_LEITURA
+    ) -> pd.DataFrame:
+        """
+        Busca pedidos com base em filtros opcionais. O período (data_inicial/data_final,
+        inclusive) é aplicado no armazenamento local, que lê apenas as partições do intervalo.
+        `prioridade` ordena a leitura no Google Sheets quando a cota está no limite
+        (ex.: PRIORIDADE_SEGUNDO_PLANO para o dashboard).
         """
         try:
             # Se integração com Google Sheets está ativa, lê de lá
             if self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL:
-                df = self._ler_pedidos()
-            # Senão, lê do arquivo local
-            elif os.path.exists(self.arquivo_pedidos):
-                df = pd.read_excel(self.arquivo_pedidos)
+                df = filtrar_periodo(self._ler_pedidos(prioridade), data_inicial, data_final)
+            # Senão, lê do armazenamento local
             else:
-                return pd.DataFrame()
+                df = self.store.carregar_pedidos(data_inicial, data_final)
 
             # Converter a coluna de data para datetime
             if 'Data' in df.columns:
@@ -374,17 +555,27 @@ class PedidoController:
             st.error(f"Erro ao buscar pedidos: {str(e)}")
             return pd.DataFrame()
 
+    def contar_status(self, prioridade: int = PRIORIDADE_LEITURA) -> pd.Series:
+        """
+        Quantidade de pedidos por Status, para os totais do dashboard: no Google Sheets, contada
+        só na coluna Status (sem esperar o Google enquanto houver um resultado recente; ver
+        legenda_contagem_status); no armazenamento local, pelo próprio store.
+        """
+        try:
+            if self.sheets_sync and self.sheets_sync.client and self.sheets_sync.SPREADSHEET_URL:
+                return self.sheets_sync.contar_status_pedidos(prioridade)
+            return self.store.contar_status()
+        except Exception as e:
+            self._avisar_falha_leitura("Pedidos", e)
+            return pd.Series(dtype=int)
+
     def get_pedido_detalhes(self, numero_pedido: str) -> dict:
-        """Retorna os detalhes completos de um pedido do arquivo."""
+        """Retorna os detalhes completos de um pedido do armazenamento local."""
         try:
-            if not os.path.exists(self.arquivo_pedidos):
-                return {}
-            
-            # Ler arquivo de pedidos
-            df_pedidos = pd.read_excel(self.arquivo_pedidos)
-            
             # Buscar pedido específico
-            pedido = df_pedidos[df_pedidos["Numero_Pedido"] == numero_pedido].iloc[0]
+            pedido = self.store.buscar_pedido(numero_pedido)
+            if not pedido:
+                return {}
             
             # Converter pedido para dicionário
             info_dict = {
@@ -408,28 +599,28 @@ class PedidoController:
             return {}
 
     def atualizar_status_pedido(self, numero_pedido: str, novo_status: str, responsavel: str):
-        """Atualiza o status de um pedido no arquivo."""
+        """Atualiza o status de um pedido no armazenamento local."""
         try:
             # Normalizar o status para maiúsculo
             novo_status = self._normalizar_status(novo_status)
             
-            # Carregar dados do arquivo
-            if not os.path.exists(self.arquivo_pedidos):
-                raise Exception("Arquivo de pedidos não encontrado")
-            
-            df_pedidos = pd.read_excel(self.arquivo_pedidos)
-            
-            # Encontrar o índice do pedido no DataFrame
-            pedidos_encontrados = df_pedidos[
-                df_pedidos['Numero_Pedido'].astype(str).str.strip().str.upper() == str(numero_pedido).strip().upper()
-            ]
-            if pedidos_encontrados.empty:
+            # Status e informações específicas (separação/coleta) de acordo com o novo status
+            ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
+            campos = campos_transicao(novo_status, responsavel, ultima_atualizacao)
+
+            # Registrar a transição no diário (sem reescrever o histórico de pedidos)
+            numero_encontrado = self.store.registrar_transicao(numero_pedido, novo_status, responsavel, ultima_atualizacao)
+            if numero_encontrado:
+                self._registrar_backup('atualizar', numero_pedido=numero_encontrado, campos=campos)
+                pedido = self.store.buscar_pedido(numero_encontrado) if novo_status == "PENDENTE" else None
+                self.indice_pendentes.atualizar_status(numero_encontrado, novo_status, pedido=pedido)
+            else:
                 # Tenta atualizar direto no Google Sheets
                 if hasattr(self, 'sheets_sync') and self.sheets_sync:
                     success, message = self.sheets_sync.atualizar_status_pedido_sheets(
                         numero_pedido,
                         novo_status,
-                        datetime.now().strftime('%d/%m/%Y %H:%M'),
+                        ultima_atualizacao,
                         responsavel
                     )
                     if not success:
@@ -441,39 +632,63 @@ class PedidoController:
                 else:
                     raise Exception(f"Pedido com número {numero_pedido} não encontrado localmente nem no Google Sheets.")
             
-            idx = pedidos_encontrados.index[0]
-            
-            # Atualizar status e informações básicas
-            ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
-            df_pedidos.loc[idx, 'Status'] = novo_status
-            df_pedidos.loc[idx, 'Ultima_Atualizacao'] = ultima_atualizacao
-            df_pedidos.loc[idx, 'Responsavel_Atualizacao'] = responsavel
-            
-            # Atualizar informações específicas baseado no status
-            if novo_status == "PROCESSO":
-                df_pedidos.loc[idx, 'Responsavel_Separacao'] = responsavel
-                df_pedidos.loc[idx, 'Data_Separacao'] = ultima_atualizacao
-            elif novo_status == "CONCLUÍDO":
-                df_pedidos.loc[idx, 'Responsavel_Coleta'] = responsavel
-                df_pedidos.loc[idx, 'Data_Coleta'] = ultima_atualizacao
-            
-            # Salvar alterações
-            df_pedidos.to_excel(self.arquivo_pedidos, index=False)
-            
-            # Se houver integração com Google Sheets, atualizar lá também
-            if hasattr(self, 'sheets_sync') and self.sheets_sync:
-                success, message = self.sheets_sync.atualizar_status_pedido_sheets(
-                    numero_pedido,
-                    novo_status,
-                    ultima_atualizacao,
-                    responsavel
-                )
-                if not success:
-                    st.warning(f"Aviso: {message}")
+            # Envio ao Google Sheets em segundo plano
+            self._agendar_sincronizacao()
         except Exception as e:
             st.error(f"Erro ao atualizar status: {str(e)}")
             raise
 
+    def atualizar_status_pedidos(self, alteracoes: List[dict], responsavel: str) -> Dict[str, str]:
+        """
+        Atualiza o status de vários pedidos (dicionários com numero_pedido e novo_status) e
+        agenda o envio de todas as alterações ao Google Sheets em uma única escrita.
+        Cada pedido é tratado separadamente: retorna {numero_pedido: mensagem de erro} apenas
+        para os que não foram atualizados (vazio se tudo foi atualizado).
+        """
+        erros = {}
+        ultima_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M')
+        somente_sheets = []
+        for alteracao in alteracoes:
+            numero_pedido = alteracao['numero_pedido']
+            try:
+                novo_status = self._normalizar_status(alteracao['novo_status'])
+                numero_encontrado = self.store.registrar_transicao(numero_pedido, novo_status, responsavel, ultima_atualizacao)
+                if numero_encontrado:
+                    campos = campos_transicao(novo_status, responsavel, ultima_atualizacao)
+                    self._registrar_backup('atualizar', numero_pedido=numero_encontrado, campos=campos)
+                    pedido = self.store.buscar_pedido(numero_encontrado) if novo_status == "PENDENTE" else None
+                    self.indice_pendentes.atualizar_status(numero_encontrado, novo_status, pedido=pedido)
+                else:
+                    somente_sheets.append({
+                        'Numero_Pedido': numero_pedido,
+                        'Status': novo_status,
+                        'Ultima_Atualizacao': ultima_atualizacao,
+                        'Responsavel_Atualizacao': responsavel
+                    })
+            except Exception as e:
+                erros[numero_pedido] = str(e)
+
+        if self.sheets_sync and self.sheets_sync.client:
+            # Pedidos que só existem no Google Sheets
+            if somente_sheets:
+                resultado = self.sheets_sync.atualizar_status_pedidos_sheets(somente_sheets)
+                for alteracao in somente_sheets:
+                    numero_pedido = alteracao['Numero_Pedido']
+                    if resultado["erro"]:
+                        erros[numero_pedido] = resultado["erro"]
+                    elif numero_pedido in resultado["nao_encontrados"]:
+                        erros[numero_pedido] = "Pedido não encontrado localmente nem no Google Sheets."
+            # Alterações locais: envio em segundo plano
+            self._agendar_sincronizacao()
+        else:
+            for alteracao in somente_sheets:
+                erros[alteracao['Numero_Pedido']] = "Pedido não encontrado localmente nem no Google Sheets."
+        return erros
+
+    def historico_status_pedido(self, numero_pedido: str) -> pd.DataFrame:
+        """Transições de status do pedido (De, Para, Responsavel, Quando)"""
+        return self.store.historico_status(numero_pedido)
+
     @staticmethod
     @st.cache_data
     def filtrar_dados(pedidos: List[Pedido], rack: Optional[str] = None) -> List[Pedido]:
@@ -574,7 +789,7 @@ class PedidoController:
         Carrega os dados da aba 'Paco' do arquivo local, usando as colunas corretas.
         """
         try:
-            df = pd.read_excel(self.caminho_planilha, sheet_name='Paco', dtype=str)
+            df = ler_excel(self.caminho_planilha, 'Paco', dtype=str)
             df = df.fillna("")
             pedidos = [
                 Pedido(
@@ -627,7 +842,7 @@ class PedidoController:
             st.error("Google Sheets não está configurado!")
             return []
         try:
-            df = self.sheets_sync.get_paco_as_dataframe()
+            df = self.sheets_sync.ler_abas({"paco": COLUNAS_PACO})["paco"]
             # Normalizar nomes das colunas (remover espaços, capitalizar)
             df.columns = [str(col).strip().title() for col in df.columns]
             df = df.fillna("")
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 import os
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.sequencia_pedidos import ReservaIndisponivel
 
 st.set_page_config(page_title="Pedido Local - Sincronização Google Sheets", page_icon="📦", layout="centered")
 
@@ -61,7 +62,7 @@ if st.button("Criar Pedido e Sincronizar", use_container_width=True):
             try:
                 # Buscar próximo número sequencial REQ - N
                 proximo_num = sheets_sync.get_proximo_numero_pedido(prefixo="REQ-")
-                numero_pedido = f"REQ-{proximo_num}"
+                numero_pedido = f"REQ-{proximo_num:03d}"
                 df_pedidos = pd.DataFrame([{
                     "Numero_Pedido": numero_pedido,
                     "Data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -90,6 +91,9 @@ if st.button("Criar Pedido e Sincronizar", use_container_width=True):
                     st.success(f"Pedido {numero_pedido} criado e sincronizado com sucesso!")
                 else:
                     st.error(f"Erro ao sincronizar: {message}")
+            except ReservaIndisponivel:
+                st.error("Sem conexão com o Google Sheets para reservar o número do pedido. "
+                         "O pedido não foi criado; tente novamente quando a conexão voltar.")
             except Exception as e:
                 st.error(f"Erro ao criar pedido: {str(e)}")
         else:
@@ -5,6 +5,7 @@ from datetime import datetime
 import os
 import json
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.sequencia_pedidos import ReservaIndisponivel
 import sys
 import threading
 
@@ -263,6 +264,10 @@ class PedidoLocalApp:
                 else:
                     # Só mostra erro de conexão
                     leituras_sincronizadas.append({"serial": codigo, "status": "❌", "mensagem": f"Erro ao sincronizar: {message}", "hora": hora})
+            except ReservaIndisponivel:
+                # Sem números reservados nenhuma leitura pode virar pedido: as demais também ficam pendentes
+                leituras_sincronizadas.append({"serial": codigo, "status": "❌", "mensagem": "Sem conexão para reservar o número do pedido (pendente)", "hora": hora})
+                break
             except Exception as e:
                 # Só mostra erro de conexão
                 leituras_sincronizadas.append({"serial": codigo, "status": "❌", "mensagem": f"Erro: {str(e)} (pendente)", "hora": hora})
@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Os testes importam os módulos do projeto (utils, controllers...) a partir da raiz
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+from typing import Union
+
+import pandas as pd
+import pytest
+
+from utils.cota_sheets import CotaSheets
+from utils.gspread_fake import ServidorSheetsFalso, URL_PADRAO
+from utils.pedidos_store import COLUNAS_PEDIDOS
+
+
+def _novo_pedido(numero: Union[int, str], serial: str = None, data: str = "2025-01-10 08:00:00", **campos) -> dict:
+    numero = f"REQ-{numero:03d}" if isinstance(numero, int) else numero
+    pedido = {col: "" for col in COLUNAS_PEDIDOS}
+    pedido.update({
+        "Numero_Pedido": numero, "Data": data, "Serial": serial or f"S-{numero}",
+        "Maquina": "M1", "Posto": "P1", "Coordenada": "C1", "Status": "PENDENTE"
+    })
+    pedido.update(campos)
+    return pedido
+
+
+def _gravar_na_planilha(sync, *pedidos):
+    df = pd.DataFrame([
+        pedido if isinstance(pedido, dict) else _novo_pedido(pedido) for pedido in pedidos
+    ]).reindex(columns=COLUNAS_PEDIDOS, fill_value="")
+    itens = pd.DataFrame({"Numero_Pedido": df["Numero_Pedido"], "Serial": df["Serial"], "Quantidade": "1"})
+    sucesso, mensagem = sync.salvar_pedido_completo(df, itens)
+    assert sucesso, mensagem
+
+
+def _esperar(condicao, limite: float = 5.0):
+    fim = time.time() + limite
+    while not condicao():
+        assert time.time() < fim, "condição não atingida a tempo"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def novo_pedido():
+    """Linha de pedido PENDENTE completa: novo_pedido(1) ou novo_pedido("REQ-001", serial=..., **campos)"""
+    return _novo_pedido
+
+
+@pytest.fixture
+def gravar_na_planilha():
+    """Pedidos criados direto no Google Sheets (sem passar pelo armazenamento local); aceita linhas ou números"""
+    return _gravar_na_planilha
+
+
+@pytest.fixture
+def esperar():
+    """Aguarda uma condição de uma thread em segundo plano, falhando após o limite"""
+    return _esperar
+
+
+@pytest.fixture
+def servidor():
+    """Google Sheets falso em memória, com a planilha padrão e a aba Pedidos"""
+    servidor = ServidorSheetsFalso()
+    servidor.criar_planilha()
+    return servidor
+
+
+@pytest.fixture
+def criar_sync(servidor, tmp_path):
+    """
+    Cria SheetsPedidosSync ligados ao servidor falso. Cada um tem a própria pasta e a própria
+    credencial (cota, conexão e caches do processo separados), como clientes distintos.
+    """
+    from utils.sheets_pedidos_sync import SheetsPedidosSync
+
+    def criar(nome: str = "cliente"):
+        diretorio = tmp_path / nome
+        diretorio.mkdir(exist_ok=True)
+        chave = f"teste:{uuid.uuid4().hex}"
+        CotaSheets.obter(chave, leituras_por_minuto=100000, escritas_por_minuto=100000, espera_base=0.01)
+        sync = SheetsPedidosSync(enable_sheets=False, config_file=str(diretorio / "config.json"))
+        sync.SPREADSHEET_URL = URL_PADRAO
+        sync.conectar(chave, servidor.cliente)
+        return sync
+    return criar
+
+
+@pytest.fixture
+def criar_controller(tmp_path):
+    """
+    PedidoController com o armazenamento local, o backup e a numeração numa pasta temporária,
+    opcionalmente ligado a um SheetsPedidosSync do servidor falso. O sincronizador em segundo
+    plano não é iniciado: os testes chamam sincronizar_sheets diretamente.
+    """
+    from controllers.pedido_controller import PedidoController
+
+    planilha = tmp_path / "localizacoes.xlsx"
+    planilha.touch()
+
+    def criar(sync=None, nome: str = "local", backend: str = "sqlite"):
+        return PedidoController(
+            str(planilha), backend=backend, diretorio_pedidos=str(tmp_path / nome),
+            sheets_sync=sync, sincronizar_em_segundo_plano=False
+        )
+    return criar
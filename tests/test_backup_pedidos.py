@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import utils.backup_pedidos as backup_pedidos
+from utils.backup_pedidos import BackupPedidos, RestauracaoIncompleta
+
+
+class Relogio(datetime):
+    """datetime com now() controlado pelo teste"""
+    agora = datetime(2025, 3, 10, 8, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    monkeypatch.setattr(backup_pedidos, "datetime", Relogio)
+    Relogio.agora = datetime(2025, 3, 10, 8, 0)
+    return Relogio
+
+
+@pytest.fixture
+def backup(tmp_path, relogio):
+    estado = {"pedidos": []}
+    backup = BackupPedidos(str(tmp_path), lambda: pd.DataFrame(estado["pedidos"]))
+    backup.estado = estado
+    return backup
+
+
+def _inserir(backup, relogio, numero: int, quando: datetime):
+    relogio.agora = quando
+    pedido = {"Numero_Pedido": f"REQ-{numero:03d}", "Status": "PENDENTE"}
+    backup.estado["pedidos"].append(pedido)
+    backup.registrar("inserir", pedidos=[pedido])
+
+
+def test_restaura_o_instante_pelo_diario(backup, relogio):
+    inicio = datetime(2025, 3, 10, 8, 0)
+    _inserir(backup, relogio, 1, inicio)
+    _inserir(backup, relogio, 2, inicio + timedelta(minutes=10))
+    relogio.agora = inicio + timedelta(minutes=20)
+    backup.registrar("atualizar", numero_pedido="REQ-001", campos={"Status": "CONCLUÍDO"})
+
+    df = backup.restaurar(inicio + timedelta(minutes=15))
+    assert list(df["Numero_Pedido"]) == ["REQ-001", "REQ-002"]
+    assert list(df["Status"]) == ["PENDENTE", "PENDENTE"]
+
+    df = backup.restaurar(inicio + timedelta(minutes=25))
+    assert df.set_index("Numero_Pedido").loc["REQ-001", "Status"] == "CONCLUÍDO"
+
+
+def test_instante_sem_diario_apos_retencao_nao_e_restaurado_em_silencio(backup, relogio):
+    dia1 = datetime(2025, 3, 10, 22, 0)
+    _inserir(backup, relogio, 1, dia1)                                   # snapshot A (dia 1)
+    _inserir(backup, relogio, 2, dia1 + timedelta(hours=1, minutes=30))  # diário de A; snapshot B (dia 2, 23:30)
+    _inserir(backup, relogio, 3, dia1 + timedelta(hours=2, minutes=40))  # diário de B; snapshot C (dia 2, 00:40)
+    _inserir(backup, relogio, 4, dia1 + timedelta(hours=5))              # diário de C; snapshot D (dia 2, 03:00)
+
+    # Dias depois, a retenção guarda um snapshot por dia: C (e o seu diário) é descartado
+    _inserir(backup, relogio, 5, dia1 + timedelta(days=3))
+    assert len(backup._ler_manifesto()) < 5
+
+    alvo = dia1 + timedelta(hours=4)  # dia 2, 02:00: coberto só pelo diário descartado de C
+    pontos = backup.pontos_restauracao()
+    anterior = max((p for p in pontos if p["snapshot"] <= alvo), key=lambda p: p["snapshot"])
+    assert anterior["ate"] < alvo
+
+    with pytest.raises(RestauracaoIncompleta) as erro:
+        backup.restaurar(alvo)
+    assert erro.value.disponivel_ate == anterior["ate"]
+
+    # Confirmado pelo usuário: restaura o estado do fim do diário que restou
+    df = backup.restaurar(alvo, aceitar_lacuna=True)
+    assert len(df) == len(backup.restaurar(erro.value.disponivel_ate))
+
+
+def test_snapshots_iguais_compartilham_o_objeto(backup, relogio, tmp_path):
+    _inserir(backup, relogio, 1, datetime(2025, 3, 10, 8, 0))
+    backup.snapshot()
+    backup.snapshot()
+    assert len(list((tmp_path / "objetos").iterdir())) == 1
@@ -0,0 +1,18 @@
+from utils.benchmark_sheets import executar
+from utils.pedidos_store import STATUS_PEDIDO
+
+
+def test_cenarios_do_benchmark():
+    resultados = {linha["cenario"]: linha for linha in executar(pedidos=40, lote=10, catalogo=200)}
+
+    assert all(linha["recusadas"] == 0 for linha in resultados.values())
+    assert resultados["salvar pedidos"]["detalhe"].endswith("0 lote(s) com falha")
+    assert resultados["atualizar status"]["detalhe"] == "30 status"
+    # A contagem do dashboard só vê status válidos, com uma única leitura
+    contagem = dict(item.split(": ") for item in resultados["contar status (dashboard)"]["detalhe"].split(", "))
+    assert set(contagem) <= set(STATUS_PEDIDO)
+    assert contagem == {"PROCESSO": "30", "PENDENTE": "10"}
+    assert resultados["contar status (dashboard)"]["leituras"] == 1
+    # Reimportar com 1% de mudanças regrava só as linhas alteradas
+    assert "(2 de 200 linhas atualizadas)" in resultados["reimportar catálogo (1% alterado)"]["detalhe"]
+    assert resultados["ler catálogo (sem mudança)"]["leituras"] == 1
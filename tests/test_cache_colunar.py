@@ -0,0 +1,85 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import utils.cache_colunar as cache_colunar
+from utils.cache_colunar import gravar_excel, ler_excel
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def leituras_excel(monkeypatch):
+    """Conta as leituras do .xlsx (as que não vieram do cache)"""
+    chamadas = []
+    original = pd.read_excel
+
+    def contar(*args, **kwargs):
+        chamadas.append(kwargs.get("dtype"))
+        return original(*args, **kwargs)
+    monkeypatch.setattr(cache_colunar.pd, "read_excel", contar)
+    return chamadas
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    caminho = str(tmp_path / "mapa.xlsx")
+    pd.DataFrame({"Codigo": [1, 20, 300], "Nome": ["a", "b", "c"]}).to_excel(caminho, sheet_name="Paco", index=False)
+    return caminho
+
+
+def test_cache_evita_reler_o_excel(planilha, leituras_excel):
+    assert list(ler_excel(planilha, "Paco", dtype=str)["Codigo"]) == ["1", "20", "300"]
+    assert list(ler_excel(planilha, "Paco", dtype=str)["Codigo"]) == ["1", "20", "300"]
+    assert len(leituras_excel) == 1
+
+
+def test_dtype_faz_parte_da_chave_do_cache(planilha, leituras_excel):
+    inferido = ler_excel(planilha, "Paco")
+    texto = ler_excel(planilha, "Paco", dtype=str)
+    assert inferido["Codigo"].tolist() == [1, 20, 300]
+    assert texto["Codigo"].tolist() == ["1", "20", "300"]
+
+    # Cada variante tem o seu cache: nenhuma devolve a outra
+    assert ler_excel(planilha, "Paco")["Codigo"].tolist() == [1, 20, 300]
+    assert ler_excel(planilha, "Paco", dtype=str)["Codigo"].tolist() == ["1", "20", "300"]
+    assert ler_excel(planilha, "Paco", dtype={"Codigo": str})["Codigo"].tolist() == ["1", "20", "300"]
+    assert leituras_excel == [None, str, {"Codigo": str}]
+
+
+def test_cache_refeito_quando_o_excel_muda(planilha, leituras_excel):
+    ler_excel(planilha, "Paco", dtype=str)
+    time.sleep(0.01)
+    pd.DataFrame({"Codigo": [7], "Nome": ["z"]}).to_excel(planilha, sheet_name="Paco", index=False)
+    os.utime(planilha, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert ler_excel(planilha, "Paco", dtype=str)["Codigo"].tolist() == ["7"]
+    assert len(leituras_excel) == 2
+
+
+def test_gravar_excel_atualiza_o_cache(tmp_path, leituras_excel):
+    caminho = str(tmp_path / "pedidos.xlsx")
+    gravar_excel(pd.DataFrame({"Numero_Pedido": ["REQ-001"], "Status": ["PENDENTE"]}), caminho)
+    assert ler_excel(caminho)["Numero_Pedido"].tolist() == ["REQ-001"]
+    assert leituras_excel == []
+
+
+def test_leitura_fria_e_quente_sao_iguais(tmp_path, leituras_excel):
+    caminho = str(tmp_path / "mapa.xlsx")
+    pd.DataFrame({"Serial": [123, "ABC"], "Qtd": [1, 2]}).to_excel(caminho, index=False)
+
+    fria = ler_excel(caminho)
+    quente = ler_excel(caminho)
+    assert len(leituras_excel) == 1
+    assert fria["Serial"].tolist() == quente["Serial"].tolist() == ["123", "ABC"]
+    pd.testing.assert_frame_equal(fria, quente)
+
+
+def test_gravar_excel_cacheia_o_mesmo_que_a_releitura(tmp_path):
+    caminho = str(tmp_path / "mapa.xlsx")
+    gravar_excel(pd.DataFrame({"Serial": [123, "ABC"], "Obs": ["", "x"]}), caminho)
+    do_cache = ler_excel(caminho)
+
+    os.remove(cache_colunar._caminho_cache(caminho, 0))
+    pd.testing.assert_frame_equal(do_cache, ler_excel(caminho))
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from utils.cache_leituras_sheets import CacheLeiturasSheets
+from utils.gspread_fake import URL_PADRAO
+
+
+def test_uma_leitura_para_sessoes_simultaneas():
+    cache = CacheLeiturasSheets(ttl=60)
+    leituras = []
+
+    def carregar():
+        leituras.append(1)
+        time.sleep(0.1)
+        return ["registros"]
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.ler("paco", carregar))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(leituras) == 1
+    assert resultados == [["registros"]] * 8
+    estatisticas = cache.resumo()[0]
+    assert estatisticas["leituras"] == 1 and estatisticas["compartilhadas"] + estatisticas["acertos"] == 7
+
+
+def test_leitura_anterior_a_invalidacao_nao_fica_em_cache():
+    cache = CacheLeiturasSheets(ttl=60)
+    liberar = threading.Event()
+    versoes = iter(["antes", "depois"])
+
+    def carregar():
+        liberar.wait()
+        return next(versoes)
+
+    thread = threading.Thread(target=lambda: cache.ler("paco", carregar))
+    thread.start()
+    time.sleep(0.05)
+    cache.invalidar(["paco"])
+    liberar.set()
+    thread.join()
+
+    assert cache.ler("paco", carregar) == "depois"
+
+
+def test_erro_chega_a_quem_esperava_e_nao_fica_em_cache():
+    cache = CacheLeiturasSheets(ttl=60)
+
+    def falhar():
+        raise RuntimeError("cota")
+
+    with pytest.raises(RuntimeError):
+        cache.ler("paco", falhar)
+    assert cache.ler("paco", lambda: "ok") == "ok"
+
+
+def test_gravacao_invalida_a_leitura_da_aba(criar_sync, servidor):
+    servidor.planilhas[URL_PADRAO].add_worksheet("Itens", 100, 3).update("A1", [["Numero_Pedido", "Serial", "Quantidade"]])
+    sync = criar_sync()
+    sync.obter_aba("Itens")
+    servidor.zerar_contadores()
+
+    assert sync.ler_registros("Itens") == []
+    assert sync.ler_registros("Itens") == []
+    assert servidor.total("leitura") == 1
+
+    sync._acrescentar_linhas("Itens", [["REQ-001", "S1", "2"]])
+    assert sync.ler_registros("Itens") == [{"Numero_Pedido": "REQ-001", "Serial": "S1", "Quantidade": 2}]
@@ -0,0 +1,33 @@
+from utils.copia_local_sheets import CopiaLocalSheets
+from utils.gspread_fake import URL_PADRAO
+
+
+def _catalogo(descricao: str = "Item") -> list:
+    return [["Serial", "Descricao"]] + [[f"S{i:03d}", f"{descricao} {i}"] for i in range(10)]
+
+
+def test_copia_ligada_a_planilha(tmp_path):
+    caminho = str(tmp_path / "copia_sheets_paco.json")
+    CopiaLocalSheets(caminho, URL_PADRAO).salvar("v1", [{"Serial": "S1"}])
+
+    assert CopiaLocalSheets(caminho, URL_PADRAO).ler()["registros"] == [{"Serial": "S1"}]
+    assert CopiaLocalSheets(caminho, "https://outra-planilha").ler() is None
+
+
+def test_aba_sem_mudanca_e_lida_da_copia_local(criar_sync, servidor):
+    sync = criar_sync()
+    sync._substituir_aba("paco", _catalogo())
+    versao = servidor.planilhas[URL_PADRAO].worksheet("_versoes").get_all_values()[1]
+    assert versao[0] == "paco" and versao[1]
+
+    assert len(sync.ler_registros("paco")) == 10
+    sync.invalidar_leituras("paco")
+    servidor.zerar_contadores()
+
+    # Só a versão é conferida: nenhum download da aba
+    assert sync.ler_registros("paco")[0] == {"Serial": "S000", "Descricao": "Item 0"}
+    assert servidor.total("leitura") == 1
+
+    # Uma nova importação muda a versão e a aba volta a ser baixada
+    sync._substituir_aba("paco", _catalogo("Peça"))
+    assert sync.ler_registros("paco")[0] == {"Serial": "S000", "Descricao": "Peça 0"}
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import gspread
+import pytest
+
+from utils.cota_sheets import CotaExcedida, CotaSheets
+from utils.gspread_fake import URL_PADRAO
+from utils.sheets_conexao import ConexaoSheets
+
+
+def _cota(**kwargs) -> CotaSheets:
+    parametros = dict(leituras_por_minuto=100000, escritas_por_minuto=100000, espera_base=0.01)
+    parametros.update(kwargs)
+    return CotaSheets(**parametros)
+
+
+def test_429_e_repetido_com_espera(servidor):
+    cota = _cota()
+    aba = servidor.cliente().open_by_url(URL_PADRAO).worksheet("Pedidos")
+    servidor.falhar(429, vezes=2)
+
+    assert cota.executar(lambda: aba.get_values("A1:B2")) == []
+    leitura = next(linha for linha in cota.resumo() if linha["tipo"] == "leitura")
+    assert leitura["respostas_429"] == 2 and leitura["repeticoes"] == 2 and leitura["falhas"] == 0
+
+
+def test_429_persistente_vira_cota_excedida(servidor):
+    cota = _cota(tentativas=3)
+    aba = servidor.cliente().open_by_url(URL_PADRAO).worksheet("Pedidos")
+    servidor.falhar(429, vezes=3)
+
+    with pytest.raises(CotaExcedida):
+        cota.executar(lambda: aba.get_values("A1"))
+
+
+def test_erro_5xx_nao_repete_escrita_nao_repetivel(servidor):
+    cota = _cota()
+    aba = servidor.cliente().open_by_url(URL_PADRAO).worksheet("Pedidos")
+    servidor.falhar(503, vezes=1)
+
+    with pytest.raises(gspread.exceptions.APIError):
+        cota.executar(lambda: aba.append_rows([["REQ-1"]]), escrita=True, repetivel=False)
+    assert aba.get_values("A1") == []
+
+
+def test_processos_dividem_a_cota_da_credencial():
+    cota = CotaSheets(leituras_por_minuto=60, escritas_por_minuto=60, processos=3)
+
+    assert cota.baldes["leitura"].capacidade == 20
+    assert cota.baldes["escrita"].por_segundo == pytest.approx(20 / 60)
+
+
+def test_espera_pela_cota_nao_bloqueia_as_outras_sessoes(servidor):
+    # Uma única ficha de leitura: a reabertura da planilha fica esperando a cota
+    cota = CotaSheets(leituras_por_minuto=1, timeout=0.5)
+    conexao = ConexaoSheets(servidor.cliente, URL_PADRAO, ttl=0, cota=cota)
+    aberta = conexao.planilha()
+    resultado = {}
+
+    def reabrir():
+        try:
+            conexao.planilha()
+        except CotaExcedida as e:
+            resultado["erro"] = e
+
+    # Handle apenas expirado (ttl=0): só um thread tenta reabrir, os demais seguem com ele
+    thread = threading.Thread(target=reabrir)
+    thread.start()
+    time.sleep(0.1)
+    inicio = time.monotonic()
+    assert conexao.planilha() is aberta
+    assert conexao.metadados("Pedidos") == {}
+    assert time.monotonic() - inicio < 0.2
+    thread.join()
+    assert isinstance(resultado.get("erro"), CotaExcedida)
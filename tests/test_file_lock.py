@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from utils import file_lock
+from utils.file_lock import FileLock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def leitor_em_outro_processo(tmp_path, esperar):
+    """Outro processo com o bloqueio compartilhado de `caminho`, mantido até `soltar()`"""
+    processos = []
+
+    def iniciar(caminho: str):
+        pronto, soltar = tmp_path / "pronto", tmp_path / "soltar"
+        script = textwrap.dedent(f"""
+            import os, sys, time
+            sys.path.insert(0, {RAIZ!r})
+            from utils.file_lock import FileLock
+            with FileLock({caminho!r}, compartilhado=True):
+                open({str(pronto)!r}, "w").close()
+                while not os.path.exists({str(soltar)!r}):
+                    time.sleep(0.01)
+        """)
+        processo = subprocess.Popen([sys.executable, "-c", script])
+        processos.append(processo)
+        esperar(pronto.exists)
+
+        def liberar():
+            soltar.touch()
+            processo.wait(timeout=10)
+        return liberar
+
+    yield iniciar
+    for processo in processos:
+        if processo.poll() is None:
+            processo.kill()
+
+
+def test_leitura_em_outro_processo_bloqueia_a_escrita(tmp_path, leitor_em_outro_processo):
+    caminho = str(tmp_path / "pedidos.lock")
+    soltar = leitor_em_outro_processo(caminho)
+
+    with pytest.raises(TimeoutError):
+        with FileLock(caminho, timeout=0.3):
+            pass
+    if file_lock.fcntl:
+        # Leitores de processos diferentes entram juntos (no Windows a leitura também é exclusiva)
+        with FileLock(caminho, timeout=0.3, compartilhado=True):
+            pass
+
+    soltar()
+    with FileLock(caminho, timeout=0.3):
+        pass
@@ -0,0 +1,65 @@
+import pytest
+
+from utils.gspread_fake import URL_PADRAO
+from utils.importacao_sheets import planejar_substituicao, texto_celula, trechos_alterados
+
+
+def _catalogo(linhas: int, alteradas: int = 0) -> list:
+    return [["Serial", "Descricao"]] + [
+        [f"S{i:03d}", f"Item {i}{' (novo)' if i < alteradas else ''}"] for i in range(linhas)
+    ]
+
+
+def _conteudo(servidor, aba: str) -> list:
+    return servidor.planilhas[URL_PADRAO].worksheet(aba).get_all_values()
+
+
+def _abas(servidor) -> list:
+    return [aba.title for aba in servidor.planilhas[URL_PADRAO].worksheets()]
+
+
+def test_texto_celula_compara_como_o_sheets_guarda():
+    assert texto_celula(1.0) == "1"
+    assert texto_celula("007") == "7"
+    assert texto_celula(2.5) == "2.5"
+    assert texto_celula("1234567890123456789") == "1234567890123456789"
+    assert texto_celula("abc") == "abc"
+
+
+def test_planejar_substituicao_mexe_no_minimo_de_linhas():
+    atual = [["A"], ["1"], ["2"], ["3"], ["4"]]
+    novo = [["A"], ["4"], ["1"], ["5"], ["3"]]
+
+    final = planejar_substituicao(atual, novo)
+
+    # As linhas mantidas ficam no lugar; a nova ocupa a posição da removida
+    assert final == [["A"], ["1"], ["5"], ["3"], ["4"]]
+    assert trechos_alterados(atual, final) == [[(3, [["5"]])]]
+
+
+def test_reimportacao_grava_so_as_linhas_alteradas(criar_sync, servidor):
+    sync = criar_sync()
+    assert sync._substituir_aba("paco", _catalogo(50))["gravadas"] == 50
+
+    resultado = sync._substituir_aba("paco", _catalogo(50, alteradas=2))
+
+    assert resultado == {"linhas": 50, "gravadas": 2, "lotes": 1}
+    assert _conteudo(servidor, "paco") == _catalogo(50, alteradas=2)
+    assert "paco__importacao" not in _abas(servidor)
+
+
+def test_importacao_interrompida_nao_altera_a_aba_e_continua_depois(criar_sync, servidor):
+    sync = criar_sync()
+    sync._substituir_aba("paco", _catalogo(20))
+    servidor.falhar(400, vezes=1, operacao="batch_update")
+
+    with pytest.raises(RuntimeError, match="importação interrompida"):
+        sync._substituir_aba("paco", _catalogo(20, alteradas=5), linhas_por_lote=2)
+
+    assert _conteudo(servidor, "paco") == _catalogo(20)
+    assert "paco__importacao" in _abas(servidor)
+
+    resultado = sync._substituir_aba("paco", _catalogo(20, alteradas=5), linhas_por_lote=2)
+    assert resultado["gravadas"] == 5
+    assert _conteudo(servidor, "paco") == _catalogo(20, alteradas=5)
+    assert "paco__importacao" not in _abas(servidor)
@@ -0,0 +1,157 @@
+import time
+
+import pytest
+
+from utils.cota_sheets import CotaExcedida
+from utils.gspread_fake import URL_PADRAO
+from utils.leitor_incremental_sheets import ABA_ALTERACOES, LeitorIncremental
+from utils.pedidos_store import COLUNAS_PEDIDOS
+
+
+def _concluir(sync, numero):
+    return sync.atualizar_status_pedidos_sheets([{
+        "Numero_Pedido": numero, "Status": "CONCLUÍDO", "Ultima_Atualizacao": "11/01/2025 09:00",
+        "Responsavel_Atualizacao": "ana"
+    }])
+
+
+def test_leitura_incremental_busca_so_o_que_mudou(criar_sync, servidor, gravar_na_planilha):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001", "REQ-002", "REQ-003")
+    assert len(sync.carregar_pedidos_incremental()) == 3
+
+    # Outro cliente acrescenta um pedido e altera o status de uma linha antiga
+    outro = criar_sync("outro")
+    gravar_na_planilha(outro, "REQ-004")
+    assert _concluir(outro, "REQ-002")["atualizados"] == ["REQ-002"]
+    sync._leitor_pedidos().expirar()
+    servidor.zerar_contadores()
+
+    df = sync.carregar_pedidos_incremental()
+
+    assert df["Numero_Pedido"].tolist() == ["REQ-001", "REQ-002", "REQ-003", "REQ-004"]
+    assert df.set_index("Numero_Pedido").loc["REQ-002", "Status"] == "CONCLUÍDO"
+    # Uma leitura das linhas novas + Alteracoes e outra da linha alterada
+    assert servidor.total("leitura") == 2
+
+
+def test_leitor_nao_cria_a_aba_de_alteracoes(criar_sync, servidor, gravar_na_planilha, novo_pedido):
+    planilha = servidor.planilhas[URL_PADRAO]
+    pedido = novo_pedido("REQ-001")
+    planilha.worksheet("Pedidos").update("A1", [COLUNAS_PEDIDOS, [pedido[col] for col in COLUNAS_PEDIDOS]])
+    sync = criar_sync()
+
+    assert sync.carregar_pedidos_incremental()["Numero_Pedido"].tolist() == ["REQ-001"]
+    assert ABA_ALTERACOES not in [aba.title for aba in planilha.worksheets()]
+
+    # A primeira gravação migra o esquema e cria a aba; a leitura seguinte já a usa
+    outro = criar_sync("outro")
+    gravar_na_planilha(outro, "REQ-002")
+    assert _concluir(outro, "REQ-001")["atualizados"] == ["REQ-001"]
+    sync._leitor_pedidos().expirar()
+    df = sync.carregar_pedidos_incremental().set_index("Numero_Pedido")
+    assert df["Status"].to_dict() == {"REQ-001": "CONCLUÍDO", "REQ-002": "PENDENTE"}
+
+
+def test_linha_alterada_que_mudou_de_pedido_recarrega_tudo(criar_sync, servidor, gravar_na_planilha):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001", "REQ-002")
+    sync.carregar_pedidos_incremental()
+
+    outro = criar_sync("outro")
+    _concluir(outro, "REQ-002")
+    # Edição manual: a linha do REQ-002 passa a ser outro pedido
+    servidor.planilhas[URL_PADRAO].worksheet("Pedidos").update("A3", [["REQ-009"]])
+    sync._leitor_pedidos().expirar()
+    servidor.zerar_contadores()
+
+    df = sync.carregar_pedidos_incremental()
+    assert df["Numero_Pedido"].tolist() == ["REQ-001", "REQ-009"]
+    # Linhas novas + Alteracoes, releitura da linha (não confere) e a recarga completa
+    assert servidor.total("leitura") == 3
+
+
+def test_muitas_alteracoes_recarregam_em_vez_de_reler_linha_a_linha(criar_sync, servidor, gravar_na_planilha):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001", "REQ-002", "REQ-003")
+    leitor = sync._leitor_pedidos()
+    leitor.max_linhas_alteradas = 1
+    sync.carregar_pedidos_incremental()
+
+    outro = criar_sync("outro")
+    _concluir(outro, "REQ-001")
+    _concluir(outro, "REQ-003")
+    leitor.expirar()
+    servidor.zerar_contadores()
+
+    df = sync.carregar_pedidos_incremental().set_index("Numero_Pedido")
+    assert df["Status"].to_dict() == {"REQ-001": "CONCLUÍDO", "REQ-002": "PENDENTE", "REQ-003": "CONCLUÍDO"}
+    assert servidor.total("leitura") == 2
+
+
+def _numeros(df) -> list:
+    return df["Numero_Pedido"].tolist()
+
+
+@pytest.fixture
+def leitor_carregado(criar_sync, gravar_na_planilha):
+    """
+    (sync, leitor): leitor próprio já carregado com o REQ-001, sem intervalo mínimo (toda
+    leitura consulta o Google); depois da carga, outro cliente acrescenta o REQ-002
+    """
+    def criar(max_desatualizacao: float = 60.0):
+        sync = criar_sync()
+        gravar_na_planilha(sync, "REQ-001")
+        leitor = LeitorIncremental(intervalo_minimo=0, max_desatualizacao=max_desatualizacao)
+        assert _numeros(leitor.carregar(sync)) == ["REQ-001"]
+        gravar_na_planilha(criar_sync("outro"), "REQ-002")
+        return sync, leitor
+    return criar
+
+
+def test_resultado_dentro_do_limite_e_servido_sem_esperar(leitor_carregado, servidor, esperar):
+    sync, leitor = leitor_carregado()
+    servidor.latencia = 0.5
+
+    inicio = time.monotonic()
+    assert _numeros(leitor.carregar(sync)) == ["REQ-001"]
+    assert time.monotonic() - inicio < 0.25
+    assert leitor.situacao()["atualizando"]
+
+    # A atualização em segundo plano substitui o resultado servido
+    esperar(lambda: not leitor.situacao()["atualizando"])
+    servidor.latencia = 0
+    assert _numeros(leitor.carregar(sync)) == ["REQ-001", "REQ-002"]
+    esperar(lambda: not leitor.situacao()["atualizando"])
+
+
+def test_falha_serve_o_ultimo_resultado_dentro_do_limite(leitor_carregado, servidor):
+    sync, leitor = leitor_carregado()
+    leitor.expirar()
+    servidor.falhar(429, vezes=50)
+
+    assert _numeros(leitor.carregar(sync)) == ["REQ-001"]
+    assert "Cota" in leitor.situacao()["erro"]
+
+
+def test_depois_de_expirar_a_leitura_espera_o_google(leitor_carregado):
+    sync, leitor = leitor_carregado()
+    leitor.expirar()
+
+    assert _numeros(leitor.carregar(sync)) == ["REQ-001", "REQ-002"]
+    assert not leitor.situacao()["atualizando"]
+
+
+def test_resultado_acima_do_limite_nao_e_servido(leitor_carregado, servidor):
+    sync, leitor = leitor_carregado(max_desatualizacao=0.2)
+    time.sleep(0.3)
+
+    # Velho demais: a leitura espera a atualização em vez de servir o resultado antigo
+    assert _numeros(leitor.carregar(sync)) == ["REQ-001", "REQ-002"]
+    assert not leitor.situacao()["atualizando"]
+
+    # E, se a leitura falhar, o erro chega a quem leu
+    time.sleep(0.3)
+    servidor.falhar(429, vezes=50)
+    with pytest.raises(CotaExcedida):
+        leitor.carregar(sync)
@@ -0,0 +1,101 @@
+import pytest
+
+from utils.gspread_fake import URL_PADRAO as URL
+
+
+def test_status_invalido_nao_interrompe_o_lote(criar_controller, novo_pedido):
+    controller = criar_controller()
+    controller.store.inserir_pedidos([novo_pedido("REQ-001"), novo_pedido("REQ-002")])
+
+    erros = controller.atualizar_status_pedidos([
+        {"numero_pedido": "REQ-001", "novo_status": "EM ANDAMENTO"},
+        {"numero_pedido": "REQ-002", "novo_status": "concluído"},
+        {"numero_pedido": "REQ-404", "novo_status": "PROCESSO"},
+    ], responsavel="ana")
+
+    assert set(erros) == {"REQ-001", "REQ-404"}
+    assert "Status inválido" in erros["REQ-001"]
+    assert controller.store.buscar_pedido("REQ-001")["Status"] == "PENDENTE"
+    assert controller.store.buscar_pedido("REQ-002")["Status"] == "CONCLUÍDO"
+
+
+def test_status_so_na_planilha_informa_cada_pedido(criar_sync, criar_controller, servidor, novo_pedido, gravar_na_planilha):
+    sync = criar_sync()
+    gravar_na_planilha(sync, novo_pedido("REQ-050"), novo_pedido("REQ-051"))
+    controller = criar_controller(sync)
+
+    erros = controller.atualizar_status_pedidos([
+        {"numero_pedido": "REQ-050", "novo_status": "PROCESSO"},
+        {"numero_pedido": "REQ-054", "novo_status": "PROCESSO"},
+    ], responsavel="ana")
+
+    assert list(erros) == ["REQ-054"]
+    valores = servidor.planilhas[URL].worksheet("Pedidos").get_all_records()
+    status = {linha["Numero_Pedido"]: linha["Status"] for linha in valores}
+    assert status == {"REQ-050": "PROCESSO", "REQ-051": "PENDENTE"}
+
+
+def test_atualizar_status_na_planilha_retorna_resultado_por_pedido(criar_sync, novo_pedido, gravar_na_planilha):
+    sync = criar_sync()
+    gravar_na_planilha(sync, novo_pedido("REQ-050"))
+
+    resultado = sync.atualizar_status_pedidos_sheets([
+        {"Numero_Pedido": numero, "Status": "CONCLUÍDO", "Ultima_Atualizacao": "11/01/2025 09:00",
+         "Responsavel_Atualizacao": "ana"}
+        for numero in ("req-050", "REQ-054")
+    ])
+
+    assert resultado == {"atualizados": ["req-050"], "nao_encontrados": ["REQ-054"], "erro": None}
+
+
+def _leitura(serial: str, coordenada: str = "C1", **campos) -> dict:
+    info = {
+        "serial": serial, "maquina": "M1", "posto": "P1", "coordenada": coordenada, "modelo": "", "ot": "",
+        "semiacabado": "", "pagoda": "", "solicitante": "ana", "observacoes": "", "urgente": "Não"
+    }
+    info.update(campos)
+    return info
+
+
+def test_lote_numera_em_sequencia_e_recusa_duplicados(criar_controller, novo_pedido):
+    controller = criar_controller()
+    controller.store.inserir_pedidos([novo_pedido("REQ-900", serial="ATIVO")])
+
+    resultados = controller.salvar_pedidos_lote([
+        _leitura("A", quantidade=3), _leitura("A"), _leitura("ATIVO"), _leitura("B"), {"serial": "C"}
+    ])
+
+    assert [r["numero_pedido"] is not None for r in resultados] == [True, False, False, True, False]
+    primeiro, segundo = (int(r["numero_pedido"].split("-")[1]) for r in resultados if r["numero_pedido"])
+    assert segundo == primeiro + 1
+    assert "já existe em um pedido ativo" in resultados[1]["erro"]
+    assert "Campo obrigatório ausente" in resultados[4]["erro"]
+    novos, _, _ = controller.store.pendencias_sincronizacao()
+    assert dict(zip(novos["Serial"], novos["Quantidade"].astype(int))) == {"ATIVO": 1, "A": 3, "B": 1}
+    # O pedido gravado entra no índice de pendentes: repetir o serial é recusado
+    assert controller.salvar_pedidos_lote([_leitura("B")])[0]["erro"]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "excel"])
+def test_indice_de_pendentes_ve_escritas_de_outro_processo(criar_controller, novo_pedido, backend):
+    este, outro = criar_controller(backend=backend), criar_controller(backend=backend)
+    assert este.salvar_pedidos_lote([_leitura("A")])[0]["numero_pedido"]
+
+    outro.store.inserir_pedidos([novo_pedido("REQ-500", serial="B")])
+    assert "já existe em um pedido ativo" in este.salvar_pedidos_lote([_leitura("B")])[0]["erro"]
+
+    outro.atualizar_status_pedido("REQ-500", "CONCLUÍDO", "ana")
+    assert este.salvar_pedidos_lote([_leitura("B")])[0]["numero_pedido"]
+
+
+def test_indice_de_pendentes_acompanha_as_proprias_escritas_sem_recarregar(criar_controller, monkeypatch):
+    controller = criar_controller()
+    controller.salvar_pedidos_lote([_leitura("A")])
+    cargas = []
+    original = controller.store.carregar_pendentes
+    monkeypatch.setattr(controller.indice_pendentes, "_carregar", lambda: cargas.append(1) or original())
+
+    resultados = controller.salvar_pedidos_lote([_leitura("B"), _leitura("C")])
+    assert all(r["numero_pedido"] for r in resultados)
+    assert "já existe em um pedido ativo" in controller.salvar_pedidos_lote([_leitura("C")])[0]["erro"]
+    assert cargas == []
@@ -0,0 +1,146 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+from utils.pedidos_store import (
+    ExcelPedidosStore, PedidosStore, SQLitePedidosStore, criar_store
+)
+
+
+@pytest.fixture(params=["sqlite", "excel"])
+def store(request, tmp_path):
+    return criar_store(request.param, str(tmp_path))
+
+
+def test_interface_e_abstrata():
+    with pytest.raises(TypeError):
+        PedidosStore()
+
+
+def test_inserir_buscar_e_contar(store, novo_pedido):
+    store.inserir_pedidos([novo_pedido(1), novo_pedido(2), novo_pedido(3)])
+    store.registrar_transicao("req-002", "CONCLUÍDO", "ana", "2025-01-11 09:00:00")
+
+    assert store.buscar_pedido("REQ-002")["Status"] == "CONCLUÍDO"
+    assert store.contar_status().to_dict() == {"PENDENTE": 2, "CONCLUÍDO": 1}
+    assert list(store.historico_status("REQ-002")["Para"]) == ["CONCLUÍDO"]
+
+
+def test_pendencias_levam_a_quantidade(store, novo_pedido):
+    store.inserir_pedidos([novo_pedido(1, Quantidade=5), novo_pedido(2)])
+    novos, alterados, marca = store.pendencias_sincronizacao()
+
+    assert dict(zip(novos["Numero_Pedido"], novos["Quantidade"].astype(int))) == {"REQ-001": 5, "REQ-002": 1}
+    assert alterados.empty
+
+    store.confirmar_criacoes(marca)
+    store.confirmar_alteracoes(marca)
+    novos, alterados, _ = store.pendencias_sincronizacao()
+    assert novos.empty and alterados.empty
+
+
+def test_alteracao_depois_do_envio(store, novo_pedido):
+    store.inserir_pedidos([novo_pedido(1), novo_pedido(2)])
+    _, _, marca = store.pendencias_sincronizacao()
+    store.confirmar_criacoes(marca)
+    store.confirmar_alteracoes(marca)
+
+    store.registrar_transicao("REQ-001", "PROCESSO", "ana", "2025-01-11 09:00:00")
+    novos, alterados, _ = store.pendencias_sincronizacao()
+    assert novos.empty
+    assert list(alterados["Numero_Pedido"]) == ["REQ-001"]
+
+
+def test_particoes_e_poda_por_periodo(tmp_path, novo_pedido):
+    store = SQLitePedidosStore(str(tmp_path / "pedidos.db"))
+    store.inserir_pedidos([
+        novo_pedido(1, data="2025-01-10 08:00:00"), novo_pedido(2, data="2025-01-31 23:00:00"),
+        novo_pedido(3, data="2025-02-01 00:00:00"), novo_pedido(4, data="15/03/2025 10:00:00")
+    ])
+
+    manifesto = store.listar_particoes().set_index("particao")["linhas"].to_dict()
+    assert manifesto == {"2025-01": 2, "2025-02": 1, "2025-03": 1}
+
+    df = store.carregar_pedidos(date(2025, 1, 31), date(2025, 2, 28))
+    assert list(df["Numero_Pedido"]) == ["REQ-002", "REQ-003"]
+
+    # Mudar a data move o pedido de partição e atualiza o manifesto
+    store.atualizar_pedido("REQ-003", {"Data": "2025-03-02 10:00:00"})
+    manifesto = store.listar_particoes().set_index("particao")["linhas"].to_dict()
+    assert manifesto == {"2025-01": 2, "2025-03": 2}
+
+
+def test_consulta_por_periodo_so_visita_as_particoes_do_periodo(tmp_path, novo_pedido, monkeypatch):
+    store = SQLitePedidosStore(str(tmp_path / "pedidos.db"))
+    store.inserir_pedidos([novo_pedido(mes, data=f"2025-{mes:02d}-10 08:00:00") for mes in range(1, 13)])
+    comandos = []
+    conexao = store._conexao
+
+    @contextmanager
+    def registrar():
+        with conexao() as conn:
+            conn.set_trace_callback(comandos.append)
+            yield conn
+    monkeypatch.setattr(store, "_conexao", registrar)
+
+    assert list(store.carregar_pedidos(date(2025, 2, 1), date(2025, 3, 31))["Numero_Pedido"]) == ["REQ-002", "REQ-003"]
+    consulta, = [comando for comando in comandos if "FROM pedidos" in comando]
+    assert "_particao IN ('2025-02', '2025-03')" in consulta
+    with conexao() as conn:
+        plano = [linha["detail"] for linha in conn.execute(f"EXPLAIN QUERY PLAN {consulta}")]
+    assert any("USING INDEX idx_pedidos_particao" in passo for passo in plano), plano
+
+
+def test_compactar_sqlite_esvazia_o_wal(tmp_path, novo_pedido):
+    store = SQLitePedidosStore(str(tmp_path / "pedidos.db"))
+    # Um leitor com transação aberta (outro processo, por exemplo) impede o checkpoint ao fechar
+    leitor = sqlite3.connect(str(tmp_path / "pedidos.db"), isolation_level=None)
+    try:
+        leitor.execute("BEGIN")
+        leitor.execute("SELECT COUNT(*) FROM pedidos").fetchone()
+        store.inserir_pedidos([novo_pedido(n) for n in range(1, 50)])
+        leitor.execute("COMMIT")
+        assert store.compactar() > 0
+    finally:
+        leitor.close()
+    assert store.compactar() == 0
+    wal = tmp_path / "pedidos.db-wal"
+    assert not wal.exists() or wal.stat().st_size == 0
+
+
+def test_excel_compacta_o_diario(tmp_path, novo_pedido):
+    store = ExcelPedidosStore(str(tmp_path / "pedidos.xlsx"), limite_compactacao=100)
+    store.inserir_pedidos([novo_pedido(1), novo_pedido(2)])
+    store.registrar_transicao("REQ-001", "PROCESSO", "ana", "2025-01-11 09:00:00")
+    store.registrar_transicao("REQ-002", "CONCLUÍDO", "ana", "2025-01-11 09:05:00")
+
+    assert store.compactar() == 2
+    assert store.compactar() == 0
+    assert store.contar_status().to_dict() == {"PROCESSO": 1, "CONCLUÍDO": 1}
+
+
+def test_revisao_muda_a_cada_escrita(store, novo_pedido):
+    inicial = store.revisao()
+    store.inserir_pedidos([novo_pedido(1)])
+    depois_insercao = store.revisao()
+    store.registrar_transicao("REQ-001", "PROCESSO", "ana", "2025-01-11 09:00:00")
+
+    assert len({inicial, depois_insercao, store.revisao()}) == 3
+    assert store.revisao() == store.revisao()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "excel"])
+def test_historico_sobrevive_a_recarga(tmp_path, backend, novo_pedido):
+    store = criar_store(backend, str(tmp_path))
+    store.inserir_pedidos([novo_pedido(1)])
+    store.registrar_transicao("REQ-001", "PROCESSO", "ana", "2025-01-11 09:00:00")
+    store.registrar_transicao("REQ-001", "CONCLUÍDO", "bia", "2025-01-11 10:00:00")
+    store.compactar()
+
+    recarregado = criar_store(backend, str(tmp_path))
+    historico = recarregado.historico_status("REQ-001")
+    assert list(historico["Para"]) == ["PROCESSO", "CONCLUÍDO"]
+    assert list(historico["Responsavel"]) == ["ana", "bia"]
+    assert recarregado.buscar_pedido("REQ-001")["Status"] == "CONCLUÍDO"
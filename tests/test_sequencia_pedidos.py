@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+
+from utils.gspread_fake import URL_PADRAO
+from utils.sequencia_pedidos import ReservaIndisponivel, SequenciaPedidos
+from utils.sheets_pedidos_sync import blocos_reservados
+
+
+def _numeros(blocos):
+    return [n for primeiro, ultimo in blocos for n in range(primeiro, ultimo + 1)]
+
+
+def test_blocos_reservados_pela_ordem_das_linhas():
+    linhas = [
+        ["Tipo", "Valor"], ["BASE", "50"], ["BLOCO", "20"],
+        # Cliente que viu a aba vazia ao mesmo tempo: cabeçalho e BASE repetidos não recuam o contador
+        ["Tipo", "Valor"], ["BASE", "50"], ["BLOCO", "5"]
+    ]
+    assert blocos_reservados(linhas) == [(51, 70), (71, 75)]
+
+
+def test_contador_antigo_em_b1_e_respeitado():
+    assert blocos_reservados([["Ultimo_Numero_Reservado", "120"], ["BLOCO", "10"]]) == [(121, 130)]
+
+
+def test_primeira_reserva_parte_do_maior_numero_da_aba_pedidos(servidor, criar_sync):
+    servidor.planilhas[URL_PADRAO].worksheet("Pedidos").update("A1", [["Numero_Pedido"], ["REQ-007"], ["REQ-041"]])
+    sync = criar_sync()
+    assert sync.reservar_bloco_numeros(10) == (42, 51)
+    assert sync.reservar_bloco_numeros(5) == (52, 56)
+
+
+def test_reservas_concorrentes_nao_se_sobrepoem(criar_sync):
+    clientes = [criar_sync(f"cliente{i}") for i in range(8)]
+    blocos, erros = [], []
+    inicio = threading.Barrier(len(clientes))
+
+    def reservar(sync):
+        try:
+            inicio.wait()
+            for _ in range(5):
+                blocos.append(sync.reservar_bloco_numeros(7))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=reservar, args=(sync,)) for sync in clientes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros
+    numeros = _numeros(blocos)
+    assert len(blocos) == 40
+    assert len(numeros) == len(set(numeros)) == 280
+    assert sorted(numeros) == list(range(1, 281))
+
+
+def test_apps_compartilham_o_contador_e_nao_repetem_numeros(criar_sync):
+    web, desktop = criar_sync("web"), criar_sync("desktop")
+    numeros = []
+    for _ in range(30):
+        numeros.append(web.get_proximo_numero_pedido())
+        numeros.append(desktop.get_proximo_numero_pedido())
+    assert len(set(numeros)) == 60
+    # Um único arquivo de contador por pasta do app
+    assert web.obter_sequencia() is web.obter_sequencia()
+
+
+def test_sem_reserva_nao_emite_numero(tmp_path):
+    def sem_conexao(quantidade):
+        raise ConnectionError("sem rede")
+
+    sequencia = SequenciaPedidos(str(tmp_path / "sequencia.json"), reservar_bloco=sem_conexao)
+    with pytest.raises(ReservaIndisponivel):
+        sequencia.proximo()
+    assert not (tmp_path / "sequencia.json").exists()
+
+
+def test_bloco_e_consumido_ate_o_fim_antes_de_reservar_outro(tmp_path):
+    reservas = []
+
+    def reservar(quantidade):
+        inicio = 100 * (len(reservas) + 1)
+        reservas.append((inicio, inicio + quantidade - 1))
+        return reservas[-1]
+
+    sequencia = SequenciaPedidos(str(tmp_path / "sequencia.json"), reservar_bloco=reservar, tamanho_bloco=3)
+    assert [sequencia.proximo_numero() for _ in range(4)] == [100, 101, 102, 200]
+    # Um lote maior que o restante do bloco pede um bloco que comporte o lote inteiro
+    assert sequencia.reservar(5) == [300, 301, 302, 303, 304]
+
+
+def test_reserva_le_so_as_linhas_novas_da_aba_controle(servidor, criar_sync, monkeypatch):
+    web, desktop = criar_sync("web"), criar_sync("desktop")
+    assert web.reservar_bloco_numeros(10) == (1, 10)
+    assert desktop.reservar_bloco_numeros(5) == (11, 15)
+    assert desktop.reservar_bloco_numeros(5) == (16, 20)
+    controle = servidor.planilhas[URL_PADRAO].worksheet("Controle")
+    intervalos = []
+    original = controle.get_values
+
+    def registrar(range_name=None, *args, **kwargs):
+        intervalos.append(range_name)
+        return original(range_name, *args, **kwargs)
+    monkeypatch.setattr(controle, "get_values", registrar)
+
+    # Cabeçalho, BASE e o bloco do app web ocupam as linhas 1 a 3; os do desktop, as linhas 4 e 5
+    assert web.reservar_bloco_numeros(5) == (21, 25)
+    assert intervalos == ["A4:B6"]
+
+
+def test_bloco_antecipado_atende_sem_conexao(tmp_path):
+    reservas, conectado = [], [True]
+
+    def reservar(quantidade):
+        if not conectado[0]:
+            raise ConnectionError("sem rede")
+        inicio = 100 * (len(reservas) + 1)
+        reservas.append((inicio, inicio + quantidade - 1))
+        return reservas[-1]
+
+    sequencia = SequenciaPedidos(str(tmp_path / "sequencia.json"), reservar_bloco=reservar, tamanho_bloco=4, antecipar=2)
+    assert [sequencia.proximo_numero() for _ in range(2)] == [100, 101]
+    sequencia.aguardar_antecipacao(5)
+    assert reservas == [(100, 103), (200, 203)]
+
+    conectado[0] = False
+    assert [sequencia.proximo_numero() for _ in range(6)] == [102, 103, 200, 201, 202, 203]
+    with pytest.raises(ReservaIndisponivel):
+        sequencia.proximo()
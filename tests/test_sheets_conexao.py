@@ -0,0 +1,68 @@
+import time
+
+import gspread
+import pytest
+
+from utils.gspread_fake import URL_PADRAO
+from utils.sheets_conexao import ConexaoSheets
+
+
+@pytest.fixture
+def conexao(servidor):
+    """ConexaoSheets do servidor falso; `conexao.autorizacoes` conta os clientes criados"""
+    autorizacoes = []
+
+    def autorizar():
+        autorizacoes.append(time.monotonic())
+        return servidor.cliente()
+    conexao = ConexaoSheets(autorizar, URL_PADRAO)
+    conexao.autorizacoes = autorizacoes
+    return conexao
+
+
+def _ler(conexao):
+    return conexao.executar(lambda: conexao.aba("Pedidos").get_values("A1"))
+
+
+def _aberturas(servidor) -> tuple:
+    return servidor.chamadas[("leitura", "open_by_url")], servidor.chamadas[("leitura", "worksheets")]
+
+
+def test_handles_sao_reaproveitados_ate_o_ttl(conexao, servidor):
+    conexao.ttl = 0.2
+    for _ in range(5):
+        _ler(conexao)
+    assert _aberturas(servidor) == (1, 1)
+    assert servidor.chamadas[("leitura", "get_values")] == 5
+
+    time.sleep(0.3)
+    _ler(conexao)
+    assert _aberturas(servidor) == (2, 2)
+    assert len(conexao.autorizacoes) == 1
+
+
+def test_401_reautoriza_e_repete_uma_vez(conexao, servidor):
+    _ler(conexao)
+    servidor.falhar(401, vezes=1, operacao="get_values")
+
+    assert _ler(conexao) == []
+    assert len(conexao.autorizacoes) == 2
+    assert _aberturas(servidor) == (2, 2)
+
+
+def test_404_reabre_a_planilha_sem_reautorizar(conexao, servidor):
+    _ler(conexao)
+    servidor.falhar(404, vezes=1, operacao="get_values")
+
+    assert _ler(conexao) == []
+    assert len(conexao.autorizacoes) == 1
+    assert _aberturas(servidor) == (2, 2)
+
+
+def test_falha_repetida_apos_reconectar_e_propagada(conexao, servidor):
+    _ler(conexao)
+    servidor.falhar(404, vezes=2, operacao="get_values")
+
+    with pytest.raises(gspread.exceptions.APIError):
+        _ler(conexao)
+    assert _aberturas(servidor) == (2, 2)
@@ -0,0 +1,184 @@
+import time
+
+import gspread
+import pandas as pd
+import pytest
+
+import utils.sheets_pedidos_sync as sheets_pedidos_sync
+from utils.gspread_fake import URL_PADRAO
+from utils.pedidos_store import COLUNAS_PEDIDOS
+
+
+def _preencher(servidor):
+    planilha = servidor.planilhas[URL_PADRAO]
+    planilha.worksheet("Pedidos").update("A1", [
+        ["Numero_Pedido", "Data", "Serial", "Status", "Observacoes"],
+        ["REQ-001", "10/01/2025", "0042", "PENDENTE", "a"],
+        ["REQ-002", "11/01/2025", "S2", "CONCLUÍDO", ""],
+    ])
+    planilha.add_worksheet("Itens", 100, 3).update("A1", [
+        ["Numero_Pedido", "Serial", "Quantidade"], ["REQ-001", "0042", "3"]
+    ])
+
+
+def test_ler_abas_baixa_so_as_colunas_pedidas_em_um_batch_get(criar_sync, servidor):
+    _preencher(servidor)
+    sync = criar_sync()
+    servidor.zerar_contadores()
+
+    resultado = sync.ler_abas({"Pedidos": ["status", "Numero_Pedido", "Ausente"], "Itens": None})
+
+    pedidos = resultado["Pedidos"]
+    assert pedidos.columns.tolist() == ["Numero_Pedido", "Status", "Ausente"]
+    assert pedidos.values.tolist() == [["REQ-001", "PENDENTE", ""], ["REQ-002", "CONCLUÍDO", ""]]
+    # Valores tipados como em get_all_records
+    assert resultado["Itens"].to_dict(orient="records") == [{"Numero_Pedido": "REQ-001", "Serial": 42, "Quantidade": 3}]
+    # Cabeçalhos e dados: duas chamadas values_batch_get, nenhuma leitura da aba inteira de Pedidos
+    assert [linha["operacao"] for linha in servidor.resumo()] == ["values_batch_get"]
+    assert servidor.total() == 2
+
+    # Mesma consulta: cache compartilhado; o cabeçalho já conhecido não é relido
+    sync.ler_abas({"Pedidos": ["status", "Numero_Pedido", "Ausente"], "Itens": None})
+    assert servidor.total() == 2
+    sync.invalidar_leituras("Itens")
+    sync.ler_abas({"Pedidos": ["status", "Numero_Pedido", "Ausente"], "Itens": None})
+    assert servidor.total() == 3
+
+
+def _alteracao(numero: str, status: str = "CONCLUÍDO") -> dict:
+    return {"Numero_Pedido": numero, "Status": status, "Ultima_Atualizacao": "11/01/2025 09:00", "Responsavel_Atualizacao": "ana"}
+
+
+def test_indice_de_linhas_evita_baixar_a_coluna_de_numeros(criar_sync, servidor):
+    sync = criar_sync()
+    df = pd.DataFrame([{"Numero_Pedido": f"REQ-00{n}", "Serial": f"S{n}", "Status": "PENDENTE"} for n in (1, 2, 3)])
+    df = df.reindex(columns=COLUNAS_PEDIDOS, fill_value="")
+    assert sync.salvar_pedido_completo(df, pd.DataFrame({"Numero_Pedido": df["Numero_Pedido"], "Serial": df["Serial"], "Quantidade": 1}))[0]
+    servidor.zerar_contadores()
+
+    assert sync.atualizar_status_pedidos_sheets([_alteracao("REQ-002")])["atualizados"] == ["REQ-002"]
+    # Cabeçalho e conferência das linhas do índice em um único batchGet, sem baixar a coluna A
+    leituras = {linha["operacao"]: linha["requisicoes"] for linha in servidor.resumo() if linha["tipo"] == "leitura"}
+    assert leituras.get("values_batch_get") == 1 and "batch_get" not in leituras
+
+    # Linhas reordenadas na planilha: a conferência falha, o índice é refeito e a linha certa é alterada
+    aba = servidor.planilhas[URL_PADRAO].worksheet("Pedidos")
+    valores = aba.get_all_values()
+    aba.update("A2", [valores[3], valores[1], valores[2]])
+    assert sync.atualizar_status_pedidos_sheets([_alteracao("REQ-003", "PROCESSO")])["atualizados"] == ["REQ-003"]
+    status = {linha["Numero_Pedido"]: linha["Status"] for linha in aba.get_all_records()}
+    assert status == {"REQ-001": "PENDENTE", "REQ-002": "CONCLUÍDO", "REQ-003": "PROCESSO"}
+
+
+def test_salvar_nao_baixa_a_aba_de_pedidos(criar_sync, servidor, gravar_na_planilha, novo_pedido, monkeypatch):
+    gravar_na_planilha(criar_sync(), *[novo_pedido(numero) for numero in range(1, 30)])
+    sync = criar_sync("outro")
+    # A primeira gravação do processo carrega a cópia usada na conferência de seriais pendentes
+    gravar_na_planilha(sync, novo_pedido(30))
+    planilha = servidor.planilhas[URL_PADRAO]
+    intervalos = []
+    original = planilha.values_batch_get
+
+    def registrar(ranges, *args, **kwargs):
+        intervalos.extend(ranges)
+        return original(ranges, *args, **kwargs)
+    monkeypatch.setattr(planilha, "values_batch_get", registrar)
+    servidor.zerar_contadores()
+
+    gravar_na_planilha(sync, novo_pedido(31), novo_pedido(32))
+    assert servidor.total("leitura") == 0
+
+    # Índice de pendentes expirado: a conferência relê só as linhas acrescentadas depois da
+    # carga (cabeçalho + 29 pedidos) e o fim da aba Alteracoes, em um único batchGet
+    monkeypatch.setattr(sync.get_indice_pendentes(), "ttl", 0)
+    gravar_na_planilha(sync, novo_pedido(33))
+    assert [linha["operacao"] for linha in servidor.resumo() if linha["tipo"] == "leitura"] == ["values_batch_get"]
+    assert intervalos == ["'Pedidos'!A31:T", "'Alteracoes'!A2:D"]
+
+
+def test_migracao_roda_uma_vez_por_versao_do_esquema(criar_sync, servidor, monkeypatch):
+    sync = criar_sync()
+    sync.migrar_esquema()
+    servidor.zerar_contadores()
+    sync.migrar_esquema()
+    assert servidor.total() == 0
+
+    # Outro processo (conexão nova) só confere as versões na aba _meta
+    sync._conexao().invalidar()
+    sync.migrar_esquema()
+    assert servidor.total("escrita") == 0
+
+    # Nova versão do esquema: aplicada uma única vez, em um único batch_update
+    monkeypatch.setattr(sheets_pedidos_sync, "VERSAO_ESQUEMA", 2)
+    servidor.zerar_contadores()
+    sync.migrar_esquema()
+    sync.migrar_esquema()
+    assert [(linha["operacao"], linha["requisicoes"]) for linha in servidor.resumo() if linha["tipo"] == "escrita"] == [("batch_update", 1)]
+    sync._conexao().invalidar()
+    assert sync._versoes_esquema() == {"Alteracoes": 2, "Itens": 2, "Pedidos": 2}
+
+
+def _concluir(sync, numero):
+    return sync.atualizar_status_pedidos_sheets([_alteracao(numero)])
+
+
+@pytest.fixture
+def status_sempre_expirado(monkeypatch):
+    """A contagem por Status expira na hora: toda leitura seguinte é servida do cache e relida"""
+    monkeypatch.setitem(sheets_pedidos_sync.TTL_LEITURAS, "Pedidos", 0)
+
+
+def test_contagem_por_status_baixa_so_a_coluna_status(criar_sync, criar_controller, servidor, gravar_na_planilha, monkeypatch):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001", "REQ-002")
+    _concluir(sync, "REQ-001")
+    planilha = servidor.planilhas[URL_PADRAO]
+    intervalos = []
+    original = planilha.values_batch_get
+
+    def registrar(ranges, *args, **kwargs):
+        intervalos.extend(ranges)
+        return original(ranges, *args, **kwargs)
+    monkeypatch.setattr(planilha, "values_batch_get", registrar)
+
+    assert criar_controller(sync).contar_status().to_dict() == {"CONCLUÍDO": 1, "PENDENTE": 1}
+    coluna = gspread.utils.rowcol_to_a1(1, COLUNAS_PEDIDOS.index("Status") + 1).rstrip("1")
+    assert intervalos == [f"'Pedidos'!{coluna}2:{coluna}"]
+
+
+def test_contagem_por_status_serve_o_ultimo_resultado_sem_cota(
+    criar_sync, criar_controller, servidor, gravar_na_planilha, status_sempre_expirado
+):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001", "REQ-002")
+    _concluir(sync, "REQ-001")
+    controller = criar_controller(sync)
+    assert controller.contar_status().to_dict() == {"CONCLUÍDO": 1, "PENDENTE": 1}
+
+    # Cota esgotada depois de uma gravação (a leitura é aguardada): falha, mas o último resultado ainda serve
+    servidor.falhar(429, vezes=50)
+    sync.invalidar_leituras("Pedidos")
+
+    assert controller.contar_status().to_dict() == {"CONCLUÍDO": 1, "PENDENTE": 1}
+    assert "última atualização falhou" in controller.legenda_contagem_status()
+
+
+def test_contagem_por_status_nao_espera_o_google(
+    criar_sync, criar_controller, servidor, gravar_na_planilha, esperar, status_sempre_expirado
+):
+    sync = criar_sync()
+    gravar_na_planilha(sync, "REQ-001")
+    controller = criar_controller(sync)
+    assert controller.contar_status().to_dict() == {"PENDENTE": 1}
+
+    gravar_na_planilha(criar_sync("outro"), "REQ-002")
+    servidor.latencia = 0.5
+    inicio = time.monotonic()
+    assert controller.contar_status().to_dict() == {"PENDENTE": 1}
+    assert time.monotonic() - inicio < 0.3
+    assert controller.legenda_contagem_status().endswith("atualizando…")
+
+    # A releitura em segundo plano traz o pedido novo para a próxima renderização
+    esperar(lambda: not sync.situacao_contagem_status()["atualizando"])
+    servidor.latencia = 0.0
+    assert controller.contar_status().to_dict() == {"PENDENTE": 2}
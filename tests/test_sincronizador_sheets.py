@@ -0,0 +1,178 @@
+import threading
+
+import pytest
+
+from utils.gspread_fake import URL_PADRAO
+from utils.sincronizador_sheets import SincronizadorSheets
+
+
+def _status_na_planilha(servidor) -> dict:
+    registros = servidor.planilhas[URL_PADRAO].worksheet("Pedidos").get_all_records()
+    return {linha["Numero_Pedido"]: linha["Status"] for linha in registros}
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "excel"])
+def test_alteracao_de_pedido_ausente_da_planilha_vai_para_quarentena(
+    criar_sync, criar_controller, servidor, backend, novo_pedido, gravar_na_planilha
+):
+    sync = criar_sync()
+    gravar_na_planilha(sync, novo_pedido("REQ-050"))
+    controller = criar_controller(sync, backend=backend)
+    # REQ-054 é um pedido legado que nunca chegou à planilha
+    controller.store.substituir_pedidos([novo_pedido("REQ-050"), novo_pedido("REQ-054")])
+    assert controller.atualizar_status_pedidos([
+        {"numero_pedido": "REQ-050", "novo_status": "PROCESSO"},
+        {"numero_pedido": "REQ-054", "novo_status": "PROCESSO"},
+    ], responsavel="ana") == {}
+
+    sucesso, mensagem = controller.sincronizar_sheets()
+
+    assert sucesso, mensagem
+    assert _status_na_planilha(servidor) == {"REQ-050": "PROCESSO"}
+    quarentena = controller.quarentena_sincronizacao()
+    assert quarentena[["Numero_Pedido", "Tipo"]].values.tolist() == [["REQ-054", "alteracao"]]
+    assert controller.contar_pendencias_sincronizacao() == 0
+
+    # A fila não volta a reescrever as mesmas células nem a marcar Alteracoes
+    marcadores = len(servidor.planilhas[URL_PADRAO].worksheet("Alteracoes").get_all_values())
+    servidor.zerar_contadores()
+    assert controller.sincronizar_sheets()[0]
+    assert servidor.total() == 0
+    assert len(servidor.planilhas[URL_PADRAO].worksheet("Alteracoes").get_all_values()) == marcadores
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "excel"])
+def test_duplicado_na_planilha_nao_bloqueia_os_outros_pedidos(
+    criar_sync, criar_controller, servidor, backend, novo_pedido, gravar_na_planilha
+):
+    sync = criar_sync()
+    # REQ-900 foi criado direto na planilha com o mesmo serial, máquina, posto e coordenada
+    gravar_na_planilha(sync, novo_pedido("REQ-900", serial="DUP"))
+    controller = criar_controller(sync, backend=backend)
+    controller.store.inserir_pedidos([novo_pedido("REQ-001", serial="DUP"), novo_pedido("REQ-002", serial="OTHER")])
+
+    sucesso, mensagem = controller.sincronizar_sheets()
+
+    assert sucesso, mensagem
+    assert _status_na_planilha(servidor) == {"REQ-900": "PENDENTE", "REQ-002": "PENDENTE"}
+    assert controller.quarentena_sincronizacao()["Numero_Pedido"].tolist() == ["REQ-001"]
+    assert controller.contar_pendencias_sincronizacao() == 0
+
+    # Resolvido o pedido da planilha, o pedido em quarentena volta à fila e é enviado
+    assert sync.atualizar_status_pedidos_sheets([{
+        "Numero_Pedido": "REQ-900", "Status": "CONCLUÍDO", "Ultima_Atualizacao": "11/01/2025 09:00",
+        "Responsavel_Atualizacao": "ana"
+    }])["atualizados"] == ["REQ-900"]
+    assert controller.reenviar_quarentena(["REQ-001"]) == 1
+    assert controller.contar_pendencias_sincronizacao() == 1
+    assert controller.sincronizar_sheets()[0]
+    assert _status_na_planilha(servidor) == {"REQ-900": "CONCLUÍDO", "REQ-002": "PENDENTE", "REQ-001": "PENDENTE"}
+    assert controller.quarentena_sincronizacao().empty
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "excel"])
+def test_envia_so_os_pedidos_novos_ou_alterados(criar_sync, criar_controller, servidor, backend, novo_pedido, monkeypatch):
+    sync = criar_sync()
+    controller = criar_controller(sync, backend=backend)
+    controller.store.inserir_pedidos([novo_pedido(numero) for numero in (1, 2, 3)])
+    assert controller.sincronizar_sheets()[0]
+
+    controller.atualizar_status_pedido("REQ-002", "PROCESSO", "ana")
+    controller.store.inserir_pedidos([novo_pedido(4)])
+    enviados = {}
+    salvar, atualizar = sync.salvar_pedido_completo, sync.atualizar_status_pedidos_sheets
+
+    def registrar_novos(df_pedidos, df_itens):
+        enviados["novos"] = df_pedidos["Numero_Pedido"].tolist()
+        return salvar(df_pedidos, df_itens)
+
+    def registrar_alterados(registros):
+        enviados["alterados"] = [registro["Numero_Pedido"] for registro in registros]
+        return atualizar(registros)
+    monkeypatch.setattr(sync, "salvar_pedido_completo", registrar_novos)
+    monkeypatch.setattr(sync, "atualizar_status_pedidos_sheets", registrar_alterados)
+
+    assert controller.sincronizar_sheets()[0]
+    assert enviados == {"novos": ["REQ-004"], "alterados": ["REQ-002"]}
+    assert _status_na_planilha(servidor) == {
+        "REQ-001": "PENDENTE", "REQ-002": "PROCESSO", "REQ-003": "PENDENTE", "REQ-004": "PENDENTE"
+    }
+
+    # Sem mudanças locais, nada é enviado
+    enviados.clear()
+    servidor.zerar_contadores()
+    assert controller.sincronizar_sheets()[0]
+    assert enviados == {} and servidor.total() == 0
+
+
+def test_falha_da_api_mantem_a_fila(criar_sync, criar_controller, servidor, novo_pedido):
+    controller = criar_controller(criar_sync())
+    controller.store.inserir_pedidos([novo_pedido("REQ-001")])
+    servidor.falhar(400, vezes=1, operacao="append_rows")
+
+    assert not controller.sincronizar_sheets()[0]
+    assert controller.contar_pendencias_sincronizacao() == 1
+    assert controller.quarentena_sincronizacao().empty
+
+
+def test_nova_tentativa_apos_falha_nos_itens_nao_duplica_pedidos(criar_sync, criar_controller, servidor, novo_pedido):
+    controller = criar_controller(criar_sync())
+    controller.store.inserir_pedidos([novo_pedido("REQ-001"), novo_pedido("REQ-002")])
+    # O append em Pedidos passa e o de Itens falha
+    servidor.falhar(503, vezes=1, operacao="append_rows", apos=1)
+
+    assert not controller.sincronizar_sheets()[0]
+    assert controller.contar_pendencias_sincronizacao() == 2
+    assert controller.sincronizar_sheets()[0]
+
+    planilha = servidor.planilhas[URL_PADRAO]
+    assert [linha[0] for linha in planilha.worksheet("Pedidos").get_all_values()[1:]] == ["REQ-001", "REQ-002"]
+    assert [linha[0] for linha in planilha.worksheet("Itens").get_all_values()[1:]] == ["REQ-001", "REQ-002"]
+
+
+def test_sincronizador_agrupa_avisos_e_tenta_de_novo(tmp_path, esperar):
+    envios = []
+    pendentes = [0]
+    falhas = [1]
+    trava = threading.Lock()
+
+    def sincronizar():
+        with trava:
+            if falhas[0]:
+                falhas[0] -= 1
+                return False, "indisponível"
+            envios.append(pendentes[0])
+            pendentes[0] = 0
+            return True, ""
+
+    sincronizador = SincronizadorSheets(
+        sincronizar, lambda: pendentes[0], str(tmp_path / "sincronizacao.lock"),
+        contar_quarentena=lambda: 2, atraso=0.05, intervalo=0.05, espera_min=0.05, espera_max=0.1
+    )
+    for _ in range(3):
+        with trava:
+            pendentes[0] += 1
+        sincronizador.notificar()
+
+    esperar(lambda: envios)
+    assert envios == [3]
+    status = sincronizador.status()
+    assert status["pendentes"] == 0 and status["quarentena"] == 2
+    assert status["falhas_seguidas"] == 0 and status["ultimo_erro"] is None
+
+
+def test_um_sincronizador_por_armazenamento(criar_sync, tmp_path):
+    from controllers.pedido_controller import PedidoController
+
+    sync = criar_sync()
+    planilha = tmp_path / "localizacoes.xlsx"
+    planilha.touch()
+
+    def controller(nome, backend="sqlite"):
+        return PedidoController(str(planilha), backend=backend, diretorio_pedidos=str(tmp_path / nome), sheets_sync=sync)
+
+    primeiro, mesma_pasta = controller("a"), controller("a")
+    assert mesma_pasta.sincronizador is primeiro.sincronizador
+    # Outra pasta ou outro backend na mesma pasta não herdam o envio do primeiro controlador
+    assert controller("b").sincronizador is not primeiro.sincronizador
+    assert controller("a", backend="excel").sincronizador is not primeiro.sincronizador
@@ -0,0 +1,281 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from utils.file_lock import FileLock
+
+FORMATO_DATA = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+class RestauracaoIncompleta(ValueError):
+    """
+    O diário que restou para o snapshot escolhido não chega ao instante pedido (a retenção
+    descartou o trecho intermediário). `disponivel_ate` é o instante mais próximo que pode
+    ser restaurado com exatidão a partir desse snapshot.
+    """
+
+    def __init__(self, mensagem: str, disponivel_ate: datetime):
+        super().__init__(mensagem)
+        self.disponivel_ate = disponivel_ate
+
+
+class BackupPedidos:
+    """
+    Backup incremental dos pedidos.
+
+    Periodicamente grava um snapshot comprimido (gzip) e endereçado pelo conteúdo (sha256),
+    então snapshots idênticos ocupam um único arquivo. Entre snapshots, cada escrita apenas
+    acrescenta uma linha no diário de operações do snapshot corrente. A restauração carrega
+    o snapshot mais recente anterior ao instante pedido e reaplica o diário até ele; cada
+    diário vale até o snapshot seguinte (campo `fim` do manifesto), então um instante depois
+    desse fim, cujo diário a retenção já descartou, não é restaurado em silêncio.
+
+    Retenção: um snapshot por hora nas últimas 24 horas, um por dia nos últimos 7 dias
+    e um por semana nas últimas 8 semanas.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        carregar: Callable[[], pd.DataFrame],
+        intervalo_snapshot: timedelta = timedelta(hours=1),
+        tamanho_max_diario: int = 1024 * 1024,
+        retencao_horas: int = 24,
+        retencao_dias: int = 7,
+        retencao_semanas: int = 8
+    ):
+        """
+        Args:
+            diretorio: Pasta dos backups
+            carregar: Retorna todos os pedidos (usado apenas ao gerar snapshots)
+            intervalo_snapshot: Tempo máximo entre snapshots
+            tamanho_max_diario: Tamanho (bytes) do diário que força um novo snapshot
+        """
+        self.diretorio = diretorio
+        self.diretorio_objetos = os.path.join(diretorio, "objetos")
+        self.diretorio_diarios = os.path.join(diretorio, "diarios")
+        self.arquivo_manifesto = os.path.join(diretorio, "snapshots.json")
+        self.carregar = carregar
+        self.intervalo_snapshot = intervalo_snapshot
+        self.tamanho_max_diario = tamanho_max_diario
+        self.retencao_horas = retencao_horas
+        self.retencao_dias = retencao_dias
+        self.retencao_semanas = retencao_semanas
+        os.makedirs(self.diretorio_objetos, exist_ok=True)
+        os.makedirs(self.diretorio_diarios, exist_ok=True)
+        self._lock = FileLock(os.path.join(diretorio, "backup.lock"))
+
+    # ------------------------------------------------------------------ manifesto
+    def _ler_manifesto(self) -> List[dict]:
+        if not os.path.exists(self.arquivo_manifesto):
+            return []
+        try:
+            with open(self.arquivo_manifesto, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return []
+
+    def _salvar_manifesto(self, snapshots: List[dict]):
+        temporario = self.arquivo_manifesto + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(snapshots, f, indent=2)
+        os.replace(temporario, self.arquivo_manifesto)
+
+    def _caminho_diario(self, snapshot_id: str) -> str:
+        return os.path.join(self.diretorio_diarios, f"{snapshot_id}.jsonl")
+
+    def _caminho_objeto(self, hash_conteudo: str) -> str:
+        return os.path.join(self.diretorio_objetos, f"{hash_conteudo}.json.gz")
+
+    # ------------------------------------------------------------------ escrita
+    def snapshot(self) -> dict:
+        """Grava um snapshot completo (deduplicado pelo conteúdo) e inicia um novo diário"""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        agora = datetime.now()
+        registros = self.carregar().fillna("").to_dict(orient='records')
+        conteudo = json.dumps(registros, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        caminho = self._caminho_objeto(hash_conteudo)
+        if not os.path.exists(caminho):
+            temporario = caminho + ".tmp"
+            with gzip.open(temporario, 'wb') as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+        entrada = {
+            "id": agora.strftime("%Y%m%d_%H%M%S_%f"),
+            "quando": agora.strftime(FORMATO_DATA),
+            "hash": hash_conteudo,
+            "linhas": len(registros)
+        }
+        snapshots = self._ler_manifesto()
+        if snapshots:
+            # O diário do snapshot anterior termina aqui
+            snapshots[-1]["fim"] = entrada["quando"]
+        snapshots.append(entrada)
+        snapshots = self._aplicar_retencao(snapshots, agora)
+        self._salvar_manifesto(snapshots)
+        return entrada
+
+    def registrar(self, operacao: str, **dados):
+        """
+        Acrescenta uma operação ao diário. Operações suportadas:
+        - 'inserir' com `pedidos` (lista de dicionários)
+        - 'atualizar' com `numero_pedido` e `campos`
+        - 'substituir' com `pedidos` (estado completo, ex.: restauração/importação)
+        """
+        with self._lock:
+            snapshots = self._ler_manifesto()
+            if not snapshots:
+                # Primeiro uso: o snapshot já contém a operação recém-gravada
+                self._snapshot()
+                return
+            atual = snapshots[-1]
+            linha = json.dumps(
+                {"quando": datetime.now().strftime(FORMATO_DATA), "op": operacao, **dados},
+                ensure_ascii=False, default=str
+            )
+            caminho = self._caminho_diario(atual["id"])
+            with open(caminho, 'a', encoding='utf-8') as f:
+                f.write(linha + "\n")
+            idade = datetime.now() - datetime.strptime(atual["quando"], FORMATO_DATA)
+            if idade >= self.intervalo_snapshot or os.path.getsize(caminho) >= self.tamanho_max_diario:
+                self._snapshot()
+
+    # ------------------------------------------------------------------ retenção
+    def _aplicar_retencao(self, snapshots: List[dict], agora: datetime) -> List[dict]:
+        manter = set()
+        baldes = set()
+        for entrada in sorted(snapshots, key=lambda e: e["quando"], reverse=True):
+            quando = datetime.strptime(entrada["quando"], FORMATO_DATA)
+            idade = agora - quando
+            if idade <= self.intervalo_snapshot:
+                # Snapshots recentes (ex.: antes/depois de uma restauração) são todos mantidos
+                balde = ("recente", entrada["id"])
+            elif idade <= timedelta(hours=self.retencao_horas):
+                balde = ("hora", quando.strftime("%Y%m%d%H"))
+            elif idade <= timedelta(days=self.retencao_dias):
+                balde = ("dia", quando.strftime("%Y%m%d"))
+            elif idade <= timedelta(weeks=self.retencao_semanas):
+                balde = ("semana", tuple(quando.isocalendar()[:2]))
+            else:
+                continue
+            if balde not in baldes:
+                baldes.add(balde)
+                manter.add(entrada["id"])
+        # O snapshot corrente (mais novo) nunca é descartado
+        if snapshots:
+            manter.add(snapshots[-1]["id"])
+
+        mantidos = [e for e in snapshots if e["id"] in manter]
+        for entrada in snapshots:
+            if entrada["id"] not in manter:
+                caminho_diario = self._caminho_diario(entrada["id"])
+                if os.path.exists(caminho_diario):
+                    os.remove(caminho_diario)
+        # Remove objetos que nenhum snapshot mantido referencia
+        referenciados = {e["hash"] for e in mantidos}
+        for nome in os.listdir(self.diretorio_objetos):
+            if nome.endswith(".json.gz") and nome[:-len(".json.gz")] not in referenciados:
+                os.remove(os.path.join(self.diretorio_objetos, nome))
+        return mantidos
+
+    # ------------------------------------------------------------------ restauração
+    @staticmethod
+    def _fim_diario(snapshots: List[dict], indice: int) -> Optional[datetime]:
+        """Até quando o diário do snapshot `indice` vale (None: diário corrente, ainda aberto)"""
+        entrada = snapshots[indice]
+        if entrada.get("fim"):
+            return datetime.strptime(entrada["fim"], FORMATO_DATA)
+        # Manifestos antigos não têm `fim`: o melhor palpite é o snapshot seguinte que restou
+        if indice + 1 < len(snapshots):
+            return datetime.strptime(snapshots[indice + 1]["quando"], FORMATO_DATA)
+        return None
+
+    def pontos_restauracao(self) -> List[dict]:
+        """
+        Snapshots disponíveis com o intervalo coberto pelo respectivo diário: do snapshot até
+        `ate` (fim do diário, ou a última operação do diário corrente)
+        """
+        pontos = []
+        snapshots = self._ler_manifesto()
+        for indice, entrada in enumerate(snapshots):
+            ultimo = entrada["quando"]
+            operacoes = 0
+            caminho = self._caminho_diario(entrada["id"])
+            if os.path.exists(caminho):
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    for linha in f:
+                        if linha.strip():
+                            operacoes += 1
+                            ultimo = json.loads(linha)["quando"]
+            pontos.append({
+                "snapshot": datetime.strptime(entrada["quando"], FORMATO_DATA),
+                "ate": self._fim_diario(snapshots, indice) or datetime.strptime(ultimo, FORMATO_DATA),
+                "linhas": entrada["linhas"],
+                "operacoes": operacoes
+            })
+        return pontos
+
+    def restaurar(self, ate: Optional[datetime] = None, aceitar_lacuna: bool = False) -> pd.DataFrame:
+        """
+        Reconstrói os pedidos como estavam no instante `ate` (padrão: agora). Se o diário do
+        snapshot escolhido terminar antes de `ate`, lança RestauracaoIncompleta; com
+        `aceitar_lacuna=True`, restaura o estado do fim desse diário.
+        """
+        ate = ate or datetime.now()
+        snapshots = self._ler_manifesto()
+        candidatos = [
+            indice for indice, e in enumerate(snapshots)
+            if datetime.strptime(e["quando"], FORMATO_DATA) <= ate
+        ]
+        if not candidatos:
+            raise ValueError(f"Nenhum backup anterior a {ate.strftime('%d/%m/%Y %H:%M')}")
+        entrada = snapshots[candidatos[-1]]
+        fim = self._fim_diario(snapshots, candidatos[-1])
+        if fim is not None and ate > fim and not aceitar_lacuna:
+            raise RestauracaoIncompleta(
+                f"Os backups entre {fim.strftime('%d/%m/%Y %H:%M:%S')} e "
+                f"{ate.strftime('%d/%m/%Y %H:%M:%S')} já foram descartados pela retenção. "
+                f"O ponto mais próximo disponível é {fim.strftime('%d/%m/%Y %H:%M:%S')}.",
+                fim
+            )
+        with gzip.open(self._caminho_objeto(entrada["hash"]), 'rb') as f:
+            registros = json.loads(f.read().decode('utf-8'))
+
+        por_numero = {str(r.get("Numero_Pedido", "")).strip().upper(): r for r in registros}
+        caminho = self._caminho_diario(entrada["id"])
+        if os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    if not linha.strip():
+                        continue
+                    operacao = json.loads(linha)
+                    if datetime.strptime(operacao["quando"], FORMATO_DATA) > ate:
+                        break
+                    self._aplicar(operacao, registros, por_numero)
+        return pd.DataFrame(registros)
+
+    @staticmethod
+    def _aplicar(operacao: dict, registros: list, por_numero: dict):
+        if operacao["op"] == "inserir":
+            for pedido in operacao.get("pedidos", []):
+                chave = str(pedido.get("Numero_Pedido", "")).strip().upper()
+                if chave not in por_numero:
+                    registros.append(pedido)
+                    por_numero[chave] = pedido
+        elif operacao["op"] == "atualizar":
+            pedido = por_numero.get(str(operacao.get("numero_pedido", "")).strip().upper())
+            if pedido is not None:
+                pedido.update(operacao.get("campos", {}))
+        elif operacao["op"] == "substituir":
+            registros[:] = list(operacao.get("pedidos", []))
+            por_numero.clear()
+            por_numero.update({str(r.get("Numero_Pedido", "")).strip().upper(): r for r in registros})
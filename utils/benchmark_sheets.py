@@ -0,0 +1,168 @@
+"""
+Benchmark da sincronização com o Google Sheets contra o Sheets falso em memória
+(utils.gspread_fake), sem rede e sem credenciais.
+
+Uso:
+    python -m utils.benchmark_sheets --pedidos 200 --latencia 0.05 --escritas-por-minuto 60
+
+Para cada cenário mostra o tempo, as requisições de leitura e escrita recebidas pelo
+"servidor" e quantas foram recusadas (429 ou falha simulada).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.cota_sheets import CotaSheets
+from utils.gspread_fake import ServidorSheetsFalso, URL_PADRAO
+from utils.pedidos_store import COLUNAS_PEDIDOS, STATUS_PEDIDO
+from utils.sheets_pedidos_sync import SheetsPedidosSync
+
+
+def _pedido(numero: int) -> dict:
+    pedido = {coluna: "" for coluna in COLUNAS_PEDIDOS}
+    pedido.update({
+        "Numero_Pedido": f"REQ-{numero:06d}",
+        "Data": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        "Serial": f"S{numero % 500:05d}",
+        "Maquina": f"M{numero % 7}",
+        "Posto": f"P{numero % 11}",
+        "Coordenada": f"C{numero}",
+        "Status": "PENDENTE",
+        "Urgente": "Não"
+    })
+    return pedido
+
+
+def _catalogo(linhas: int, variacao: int = 0) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"Serial": f"S{i:05d}", "Descricao": f"Item {i}{' (novo)' if i < variacao else ''}", "Quantidade": i % 50}
+        for i in range(linhas)
+    ])
+
+
+def _criar_sync(servidor: ServidorSheetsFalso, diretorio: str, cota: dict) -> SheetsPedidosSync:
+    chave = f"benchmark:{id(servidor)}"
+    CotaSheets.obter(chave, **cota)
+    sync = SheetsPedidosSync(enable_sheets=False, config_file=os.path.join(diretorio, "config.json"))
+    sync.SPREADSHEET_URL = URL_PADRAO
+    sync.conectar(chave, servidor.cliente)
+    return sync
+
+
+def _medir(nome: str, servidor: ServidorSheetsFalso, cenario) -> dict:
+    servidor.zerar_contadores()
+    inicio = time.perf_counter()
+    detalhe = cenario()
+    return {
+        "cenario": nome,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "leituras": servidor.total("leitura"),
+        "escritas": servidor.total("escrita"),
+        "recusadas": sum(servidor.recusadas.values()),
+        "detalhe": detalhe
+    }
+
+
+def executar(pedidos: int = 100, lote: int = 10, catalogo: int = 5000, latencia: float = 0.0,
+             leituras_por_minuto: int = None, escritas_por_minuto: int = None, taxa_falha: float = 0.0) -> list:
+    """Roda os cenários e retorna uma linha de resultado por cenário"""
+    servidor = ServidorSheetsFalso(
+        latencia=latencia, variacao=latencia / 2,
+        leituras_por_minuto=leituras_por_minuto, escritas_por_minuto=escritas_por_minuto,
+        taxa_falha=taxa_falha, semente=1
+    )
+    servidor.criar_planilha()
+    # A cota do cliente acompanha a do servidor (sem limite = sem espera no cliente)
+    cota = {
+        "leituras_por_minuto": leituras_por_minuto or 100000,
+        "escritas_por_minuto": escritas_por_minuto or 100000,
+        "espera_base": 0.05 if not latencia else 1.0
+    }
+    diretorio = tempfile.mkdtemp(prefix="benchmark_sheets_")
+    sync = _criar_sync(servidor, diretorio, cota)
+    resultados = []
+
+    def salvar():
+        falhas = 0
+        for inicio in range(0, pedidos, lote):
+            novos = pd.DataFrame([_pedido(n) for n in range(inicio + 1, min(inicio + lote, pedidos) + 1)])
+            itens = pd.DataFrame({"Numero_Pedido": novos["Numero_Pedido"], "Serial": novos["Serial"], "Quantidade": 1})
+            sucesso, _ = sync.salvar_pedido_completo(novos, itens)
+            falhas += not sucesso
+        return f"{pedidos} pedidos em lotes de {lote}; {falhas} lote(s) com falha"
+    resultados.append(_medir("salvar pedidos", servidor, salvar))
+
+    leitor = sync._leitor_pedidos()
+    leitor.intervalo_minimo = 0
+
+    def ler():
+        leitor.invalidar()
+        df = sync.carregar_pedidos_incremental()
+        return f"{len(df)} pedidos"
+    resultados.append(_medir("leitura completa", servidor, ler))
+
+    def atualizar():
+        escolhidos = random.Random(2).sample(range(1, pedidos + 1), min(pedidos, 30))
+        agora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        # Pedidos em separação (status válido, como o PedidoController grava)
+        resultado = sync.atualizar_status_pedidos_sheets([
+            {"Numero_Pedido": f"REQ-{n:06d}", "Status": STATUS_PEDIDO[1], "Ultima_Atualizacao": agora,
+             "Responsavel_Atualizacao": "benchmark"}
+            for n in escolhidos
+        ])
+        return resultado["erro"] or f"{len(resultado['atualizados'])} status"
+    resultados.append(_medir("atualizar status", servidor, atualizar))
+
+    def ler_de_novo():
+        df = sync.carregar_pedidos_incremental()
+        return f"{len(df)} pedidos"
+    resultados.append(_medir("leitura incremental", servidor, ler_de_novo))
+
+    def contar():
+        sync.invalidar_leituras("Pedidos")
+        contagem = sync.contar_status_pedidos()
+        return ", ".join(f"{status}: {total}" for status, total in contagem.items())
+    resultados.append(_medir("contar status (dashboard)", servidor, contar))
+
+    for nome, df in (("importar catálogo", _catalogo(catalogo)), ("reimportar catálogo (1% alterado)", _catalogo(catalogo, catalogo // 100))):
+        arquivo = os.path.join(diretorio, "paco.xlsx")
+        df.to_excel(arquivo, index=False)
+        resultados.append(_medir(nome, servidor, lambda: sync.sincronizar_paco(arquivo)[1]))
+
+    def ler_catalogo():
+        # Sem o cache do processo: só a versão da aba é conferida antes de usar a cópia local
+        sync.invalidar_leituras("paco")
+        return f"{len(sync.get_paco_as_dataframe())} linhas"
+    resultados.append(_medir("ler catálogo (1ª vez)", servidor, ler_catalogo))
+    resultados.append(_medir("ler catálogo (sem mudança)", servidor, ler_catalogo))
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da sincronização com o Google Sheets (sem rede)")
+    parser.add_argument("--pedidos", type=int, default=100)
+    parser.add_argument("--lote", type=int, default=10, help="pedidos por gravação")
+    parser.add_argument("--catalogo", type=int, default=5000, help="linhas do catálogo paco")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por requisição")
+    parser.add_argument("--leituras-por-minuto", type=int, default=None)
+    parser.add_argument("--escritas-por-minuto", type=int, default=None)
+    parser.add_argument("--taxa-falha", type=float, default=0.0, help="probabilidade de 503 por requisição")
+    args = parser.parse_args()
+
+    resultados = executar(
+        pedidos=args.pedidos, lote=args.lote, catalogo=args.catalogo, latencia=args.latencia,
+        leituras_por_minuto=args.leituras_por_minuto, escritas_por_minuto=args.escritas_por_minuto,
+        taxa_falha=args.taxa_falha
+    )
+    with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+        print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from typing import Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+
+def _chave_dtype(dtype) -> str:
+    """Identificação estável do `dtype` pedido ao pandas (vazio = tipos inferidos)"""
+    if dtype is None:
+        return ""
+    def nome(tipo):
+        return getattr(tipo, "__name__", None) or str(tipo)
+    if isinstance(dtype, dict):
+        texto = json.dumps({str(col): nome(tipo) for col, tipo in dtype.items()}, sort_keys=True)
+    else:
+        texto = nome(dtype)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def _caminho_cache(caminho_excel: str, aba: Union[str, int], dtype=None) -> str:
+    # Leituras com `dtype` diferentes não compartilham o cache (ex.: tudo como texto x tipos inferidos)
+    diretorio, nome = os.path.split(os.path.abspath(caminho_excel))
+    sufixo = f".{_chave_dtype(dtype)}" if dtype is not None else ""
+    return os.path.join(diretorio, ".cache", f"{nome}.{aba}{sufixo}.feather")
+
+
+def _assinatura(caminho_excel: str) -> dict:
+    info = os.stat(caminho_excel)
+    return {b"origem_mtime_ns": str(info.st_mtime_ns).encode(), b"origem_tamanho": str(info.st_size).encode()}
+
+
+def _tipar_colunas(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas de texto com valores mistos (ex.: números e textos) viram texto, como o Arrow exige"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df.columns = [str(col) for col in df.columns]
+    # Mesmo dtype que o Arrow devolve ao ler o cache (texto inferido como tal, não 'object')
+    return df.infer_objects()
+
+
+def _gravar_cache(df: pd.DataFrame, caminho_excel: str, aba: Union[str, int], dtype=None):
+    """Grava no cache o DataFrame já normalizado por `_tipar_colunas`"""
+    caminho = _caminho_cache(caminho_excel, aba, dtype)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados.update(_assinatura(caminho_excel))
+    tabela = tabela.replace_schema_metadata(metadados)
+    # Grava em arquivo temporário e substitui, para leitores concorrentes nunca verem um cache pela metade
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    feather.write_feather(tabela, temporario)
+    os.replace(temporario, caminho)
+
+
+def ler_excel(caminho_excel: str, aba: Union[str, int] = 0, dtype=None) -> pd.DataFrame:
+    """
+    Lê uma aba do Excel através de um cache Feather (colunar) ao lado do arquivo.
+
+    O cache é refeito apenas quando o .xlsx muda (data de modificação ou tamanho), então
+    o Excel continua sendo a fonte editável e as leituras seguintes levam milissegundos.
+    Sem o pyarrow instalado, lê o Excel diretamente. Com ou sem cache, o resultado passa por
+    `_tipar_colunas`, para a primeira leitura e as seguintes devolverem os mesmos valores.
+    """
+    if feather is None:
+        return _tipar_colunas(pd.read_excel(caminho_excel, sheet_name=aba, dtype=dtype))
+
+    caminho = _caminho_cache(caminho_excel, aba, dtype)
+    if os.path.exists(caminho):
+        try:
+            tabela = feather.read_table(caminho)
+            if {k: v for k, v in (tabela.schema.metadata or {}).items() if k.startswith(b"origem_")} == _assinatura(caminho_excel):
+                return tabela.to_pandas()
+        except (OSError, pa.ArrowException):
+            pass
+
+    df = _tipar_colunas(pd.read_excel(caminho_excel, sheet_name=aba, dtype=dtype))
+    try:
+        _gravar_cache(df, caminho_excel, aba, dtype)
+    except (OSError, pa.ArrowException):
+        # Cache é só otimização: falhas ao gravá-lo não impedem a leitura
+        pass
+    return df
+
+
+def gravar_excel(df: pd.DataFrame, caminho_excel: str, aba: Optional[str] = None):
+    """Grava o DataFrame no Excel e já atualiza o cache, evitando reler o arquivo recém-gravado"""
+    if aba:
+        df.to_excel(caminho_excel, sheet_name=aba, index=False)
+    else:
+        df.to_excel(caminho_excel, index=False)
+    if feather is not None:
+        try:
+            # Células vazias voltam como NaN ao reler o Excel; o cache fica igual à releitura
+            _gravar_cache(_tipar_colunas(df.mask(df == "").infer_objects()), caminho_excel, aba or 0)
+        except (OSError, pa.ArrowException):
+            pass
@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+
+class _Carga:
+    """Leitura em andamento de uma entrada, aguardada pelas outras sessões que pediram a mesma entrada"""
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.valor = None
+        self.erro = None
+        self.descartada = False
+
+
+class CacheLeiturasSheets:
+    """
+    Cache das leituras de abas do Google Sheets compartilhado por todas as sessões do
+    processo (uma entrada por aba da planilha, ou por consulta de várias abas/colunas). Cada
+    entrada vale por `ttl` segundos; quando várias sessões pedem a mesma entrada expirada ao
+    mesmo tempo, só a primeira lê a planilha e as demais esperam e recebem o mesmo resultado.
+    As gravações feitas por este processo invalidam as entradas que envolvem as abas
+    afetadas; uma leitura que começou antes da invalidação não é guardada.
+
+    Com `max_desatualizacao`, uma entrada expirada (mas mais nova que o limite) é devolvida na
+    hora e relida em segundo plano (stale-while-revalidate); ela também é devolvida, dentro
+    do limite, quando a leitura falha. Depois de uma invalidação a leitura é aguardada, para
+    quem gravou ver a própria alteração.
+    """
+
+    _instancias = {}
+    _instancias_guard = threading.Lock()
+
+    @classmethod
+    def obter(cls, chave, **kwargs) -> "CacheLeiturasSheets":
+        with cls._instancias_guard:
+            cache = cls._instancias.get(chave)
+            if cache is None:
+                cache = cls(**kwargs)
+                cls._instancias[chave] = cache
+            return cache
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._estatisticas = {}
+
+    def _entrada(self, chave, abas: Iterable[str]) -> dict:
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            entrada = {
+                "valor": None, "lido_em": None, "valida": False, "carga": None, "geracao": 0,
+                "abas": frozenset(abas), "erro": None
+            }
+            self._entradas[chave] = entrada
+            self._estatisticas[chave] = {"acertos": 0, "leituras": 0, "compartilhadas": 0, "invalidacoes": 0}
+        return entrada
+
+    def ler(
+        self,
+        chave,
+        carregar: Callable,
+        ttl: Optional[float] = None,
+        abas: Optional[Iterable[str]] = None,
+        max_desatualizacao: Optional[float] = None,
+        revalidar: Optional[Callable] = None
+    ):
+        """
+        Valor em cache de `chave`, ou o resultado de `carregar()` (uma única leitura por vez por
+        chave). `abas` são as abas lidas, cujas gravações invalidam a entrada (padrão: a própria chave).
+        Com `max_desatualizacao`, o valor expirado é servido enquanto `revalidar()` (padrão:
+        `carregar`) o relê em segundo plano.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        while True:
+            with self._lock:
+                entrada = self._entrada(chave, abas or [chave])
+                estatisticas = self._estatisticas[chave]
+                idade = time.monotonic() - entrada["lido_em"] if entrada["valor"] is not None else None
+                if entrada["valida"] and idade < ttl:
+                    estatisticas["acertos"] += 1
+                    return entrada["valor"]
+                if entrada["valida"] and max_desatualizacao is not None and idade < max_desatualizacao:
+                    estatisticas["acertos"] += 1
+                    if entrada["carga"] is None:
+                        carga = entrada["carga"] = _Carga()
+                        estatisticas["leituras"] += 1
+                        threading.Thread(
+                            target=self._revalidar, args=(entrada, carga, entrada["geracao"], revalidar or carregar),
+                            name="revalidar-leitura", daemon=True
+                        ).start()
+                    return entrada["valor"]
+                carga = entrada["carga"]
+                if carga is None:
+                    carga = entrada["carga"] = _Carga()
+                    geracao = entrada["geracao"]
+                    estatisticas["leituras"] += 1
+                    break
+                estatisticas["compartilhadas"] += 1
+
+            # Outra sessão já está fazendo a mesma leitura: espera o resultado dela
+            carga.pronta.wait()
+            if carga.erro is not None:
+                if self._serve_apos_falha(entrada, max_desatualizacao):
+                    return entrada["valor"]
+                raise carga.erro
+            if not carga.descartada:
+                return carga.valor
+            # A entrada foi invalidada durante a leitura: tenta de novo
+
+        try:
+            return self._carregar(entrada, carga, geracao, carregar)
+        except Exception:
+            if self._serve_apos_falha(entrada, max_desatualizacao):
+                return entrada["valor"]
+            raise
+
+    def _serve_apos_falha(self, entrada: dict, max_desatualizacao: Optional[float]) -> bool:
+        """Sem resposta do Google: o último valor (mesmo invalidado) ainda serve, dentro do limite"""
+        with self._lock:
+            return (max_desatualizacao is not None and entrada["valor"] is not None
+                    and time.monotonic() - entrada["lido_em"] < max_desatualizacao)
+
+    def _carregar(self, entrada: dict, carga: _Carga, geracao: int, carregar: Callable):
+        """Executa a leitura da entrada e guarda o resultado, se ela não foi invalidada no meio"""
+        try:
+            valor = carregar()
+        except BaseException as e:
+            with self._lock:
+                entrada["carga"] = None
+                entrada["erro"] = str(e)
+            carga.erro = e
+            carga.pronta.set()
+            raise
+
+        with self._lock:
+            entrada["carga"] = None
+            entrada["erro"] = None
+            if entrada["geracao"] == geracao:
+                entrada["valor"] = valor
+                entrada["lido_em"] = time.monotonic()
+                entrada["valida"] = True
+            else:
+                carga.descartada = True
+        carga.valor = valor
+        carga.pronta.set()
+        return valor
+
+    def _revalidar(self, entrada: dict, carga: _Carga, geracao: int, carregar: Callable):
+        try:
+            self._carregar(entrada, carga, geracao, carregar)
+        except Exception:
+            # O erro fica na entrada (ver situacao); o valor anterior continua sendo servido
+            pass
+
+    def situacao(self, chave) -> dict:
+        """Idade do valor em cache (segundos), se há leitura em andamento e o erro da última leitura"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return {"idade_s": None, "atualizando": False, "erro": None}
+            return {
+                "idade_s": time.monotonic() - entrada["lido_em"] if entrada["valor"] is not None else None,
+                "atualizando": entrada["carga"] is not None,
+                "erro": entrada["erro"]
+            }
+
+    def invalidar(self, abas: Optional[Iterable[str]] = None):
+        """Invalida as entradas que leem as abas informadas (ou todas); a próxima leitura vai à planilha"""
+        abas = None if abas is None else set(abas)
+        with self._lock:
+            for chave, entrada in self._entradas.items():
+                if abas is None or entrada["abas"] & abas:
+                    # O valor fica guardado só para servir se a próxima leitura falhar
+                    entrada["valida"] = False
+                    entrada["geracao"] += 1
+                    self._estatisticas[chave]["invalidacoes"] += 1
+
+    def resumo(self) -> list:
+        """Uma linha por entrada: acertos, leituras na planilha, pedidos que aguardaram outra leitura e invalidações"""
+        with self._lock:
+            linhas = [
+                {"aba": chave if isinstance(chave, str) else " + ".join(sorted(self._entradas[chave]["abas"])) + " (consulta)", **dados}
+                for chave, dados in self._estatisticas.items()
+            ]
+        return sorted(linhas, key=lambda linha: linha["aba"])
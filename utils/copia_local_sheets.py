@@ -0,0 +1,41 @@
+import json
+import os
+import time
+from typing import Optional
+
+from utils.file_lock import FileLock
+
+
+class CopiaLocalSheets:
+    """
+    Última leitura de uma aba do Google Sheets guardada em disco, com a versão do conteúdo
+    que a aba tinha (registrada pela importação na aba _versoes). Quem lê confere a versão
+    atual da aba antes de baixá-la: se for a mesma da cópia, usa a cópia. O arquivo é ligado
+    à URL da planilha: trocar de planilha descarta a cópia.
+    """
+
+    def __init__(self, caminho_arquivo: str, url: str):
+        self.caminho_arquivo = caminho_arquivo
+        self.url = url
+        self._lock = FileLock(caminho_arquivo + ".lock")
+
+    def ler(self) -> Optional[dict]:
+        """{"versao", "salva_em" (epoch), "registros"} ou None se não houver cópia desta planilha"""
+        with self._lock:
+            if not os.path.exists(self.caminho_arquivo):
+                return None
+            try:
+                with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+            except (ValueError, OSError):
+                return None
+        if not isinstance(dados, dict) or dados.get("url") != self.url or not dados.get("versao"):
+            return None
+        return dados
+
+    def salvar(self, versao: str, registros: list):
+        temporario = f"{self.caminho_arquivo}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({"url": self.url, "versao": versao, "salva_em": time.time(), "registros": registros}, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho_arquivo)
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+import gspread
+
+# Ordem de atendimento quando a cota está no limite (menor = primeiro)
+PRIORIDADE_ESCRITA = 0
+PRIORIDADE_LEITURA = 1
+PRIORIDADE_SEGUNDO_PLANO = 2
+
+ERROS_SERVIDOR = (500, 502, 503, 504)
+
+
+class CotaExcedida(Exception):
+    """A cota do Google Sheets continuou esgotada depois de todas as tentativas"""
+
+
+def codigo_http(erro: Exception) -> Optional[int]:
+    return getattr(getattr(erro, "response", None), "status_code", None)
+
+
+class BaldeFichas:
+    """
+    Token bucket com fila por prioridade: cada requisição consome uma ficha e as fichas são
+    repostas a `por_segundo`. Com o balde vazio, as requisições esperam na ordem de prioridade
+    (e de chegada); as de segundo plano deixam `reserva` fichas para as interativas.
+    """
+
+    def __init__(self, capacidade: int, por_segundo: float, reserva: int = 0):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.reserva = reserva
+        self._fichas = float(capacidade)
+        self._atualizado = time.monotonic()
+        self._condicao = threading.Condition()
+        self._fila = []
+        self._sequencia = itertools.count()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.por_segundo)
+        self._atualizado = agora
+
+    def adquirir(self, prioridade: int, timeout: float) -> float:
+        """Consome uma ficha, aguardando a vez; retorna o tempo de espera em segundos"""
+        inicio = time.monotonic()
+        with self._condicao:
+            entrada = (prioridade, next(self._sequencia))
+            heapq.heappush(self._fila, entrada)
+            try:
+                while True:
+                    self._repor()
+                    minimo = 1 + (self.reserva if prioridade >= PRIORIDADE_SEGUNDO_PLANO else 0)
+                    primeiro = self._fila[0] == entrada
+                    if primeiro and self._fichas >= minimo:
+                        heapq.heappop(self._fila)
+                        self._fichas -= 1
+                        return time.monotonic() - inicio
+                    restante = timeout - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        raise CotaExcedida("Tempo esgotado aguardando a cota do Google Sheets")
+                    # O primeiro da fila dorme até a próxima ficha; os demais, até serem avisados
+                    pausa = (minimo - self._fichas) / self.por_segundo if primeiro else restante
+                    self._condicao.wait(min(max(pausa, 0.001), restante))
+            except BaseException:
+                if entrada in self._fila:
+                    self._fila.remove(entrada)
+                    heapq.heapify(self._fila)
+                raise
+            finally:
+                self._condicao.notify_all()
+
+    def esvaziar(self):
+        """Zera as fichas (após um 429): todas as requisições passam a esperar reposição"""
+        with self._condicao:
+            self._repor()
+            self._fichas = 0.0
+
+
+class CotaSheets:
+    """
+    Cliente de cota do Google Sheets compartilhado pelo processo (por credencial): um balde
+    de fichas para leituras e outro para escritas, nos limites por usuário do Google (60 por
+    minuto cada). Respostas 429 e 5xx são repetidas com espera exponencial com variação
+    aleatória (ou o Retry-After do servidor).
+
+    O Google conta a cota por projeto e por usuário (a conta de serviço), não por processo:
+    se `processos` apps (servidor Streamlit, app desktop, outra máquina) usam a mesma
+    credencial, cada um fica com 1/`processos` dos limites para que a soma não passe da cota.
+    """
+
+    _instancias = {}
+    _instancias_guard = threading.Lock()
+
+    @classmethod
+    def obter(cls, chave: str, **kwargs) -> "CotaSheets":
+        """Cota compartilhada da credencial `chave` (os `kwargs` só valem na criação)"""
+        with cls._instancias_guard:
+            cota = cls._instancias.get(chave)
+            if cota is None:
+                cota = cls(**kwargs)
+                cls._instancias[chave] = cota
+            return cota
+
+    def __init__(
+        self,
+        leituras_por_minuto: int = 60,
+        escritas_por_minuto: int = 60,
+        tentativas: int = 5,
+        espera_base: float = 1.0,
+        espera_max: float = 32.0,
+        timeout: float = 120.0,
+        processos: int = 1
+    ):
+        processos = max(1, int(processos or 1))
+        leituras_por_minuto = max(1, leituras_por_minuto // processos)
+        escritas_por_minuto = max(1, escritas_por_minuto // processos)
+        self.baldes = {
+            "leitura": BaldeFichas(leituras_por_minuto, leituras_por_minuto / 60, reserva=leituras_por_minuto // 6),
+            "escrita": BaldeFichas(escritas_por_minuto, escritas_por_minuto / 60)
+        }
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.timeout = timeout
+        self._guard = threading.Lock()
+        self._estatisticas = {
+            tipo: {"requisicoes": 0, "com_espera": 0, "espera_total": 0.0, "espera_max": 0.0,
+                   "respostas_429": 0, "erros_5xx": 0, "repeticoes": 0, "falhas": 0}
+            for tipo in self.baldes
+        }
+
+    def consumir(self, tipo: str = "leitura", prioridade: int = PRIORIDADE_LEITURA):
+        """Consome uma ficha para uma chamada feita fora de `executar` (ex.: abrir a planilha)"""
+        espera = self.baldes[tipo].adquirir(prioridade, self.timeout)
+        self._registrar(tipo, requisicoes=1, espera=espera)
+
+    def executar(self, operacao: Callable, escrita: bool = False, prioridade: Optional[int] = None, repetivel: bool = True):
+        """
+        Executa `operacao()` dentro da cota. 429 é sempre repetido (a requisição foi recusada);
+        5xx só se `repetivel` (ex.: não para append, que poderia duplicar linhas).
+        """
+        tipo = "escrita" if escrita else "leitura"
+        if prioridade is None:
+            prioridade = PRIORIDADE_ESCRITA if escrita else PRIORIDADE_LEITURA
+        for tentativa in range(self.tentativas):
+            self.consumir(tipo, prioridade)
+            try:
+                return operacao()
+            except gspread.exceptions.APIError as e:
+                status = codigo_http(e)
+                if status == 429:
+                    self.baldes[tipo].esvaziar()
+                    self._registrar(tipo, respostas_429=1)
+                elif status in ERROS_SERVIDOR and repetivel:
+                    self._registrar(tipo, erros_5xx=1)
+                else:
+                    raise
+                if tentativa == self.tentativas - 1:
+                    self._registrar(tipo, falhas=1)
+                    if status == 429:
+                        raise CotaExcedida("Cota do Google Sheets excedida; tente novamente em um minuto.") from e
+                    raise
+                self._registrar(tipo, repeticoes=1)
+                time.sleep(self._pausa(tentativa, e))
+
+    def _pausa(self, tentativa: int, erro: Exception) -> float:
+        pausa = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** tentativa))
+        retry_after = getattr(getattr(erro, "response", None), "headers", {}).get("Retry-After")
+        try:
+            return max(pausa, float(retry_after)) if retry_after else pausa
+        except ValueError:
+            return pausa
+
+    def _registrar(self, tipo: str, espera: float = 0.0, **contadores):
+        with self._guard:
+            dados = self._estatisticas[tipo]
+            for nome, valor in contadores.items():
+                dados[nome] += valor
+            if espera >= 0.001:
+                dados["com_espera"] += 1
+                dados["espera_total"] += espera
+                dados["espera_max"] = max(dados["espera_max"], espera)
+
+    def resumo(self) -> list:
+        """Uma linha por tipo (leitura/escrita): requisições, esperas pela cota, 429, 5xx e repetições"""
+        with self._guard:
+            return [
+                {
+                    "tipo": tipo,
+                    "requisicoes": dados["requisicoes"],
+                    "com_espera": dados["com_espera"],
+                    "espera_total_s": round(dados["espera_total"], 2),
+                    "espera_max_s": round(dados["espera_max"], 2),
+                    "respostas_429": dados["respostas_429"],
+                    "erros_5xx": dados["erros_5xx"],
+                    "repeticoes": dados["repeticoes"],
+                    "falhas": dados["falhas"]
+                }
+                for tipo, dados in self._estatisticas.items()
+            ]
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class _TravaLeituraEscrita:
+    """Leitores em paralelo e escritor exclusivo entre as threads do processo (escritores têm preferência)"""
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._leitores = 0
+        self._escritor = False
+        self._escritores_aguardando = 0
+
+    def adquirir(self, compartilhado: bool, timeout: float) -> bool:
+        with self._condicao:
+            if compartilhado:
+                if not self._condicao.wait_for(lambda: not self._escritor and not self._escritores_aguardando, timeout):
+                    return False
+                self._leitores += 1
+                return True
+            self._escritores_aguardando += 1
+            try:
+                if not self._condicao.wait_for(lambda: not self._escritor and not self._leitores, timeout):
+                    return False
+                self._escritor = True
+                return True
+            finally:
+                self._escritores_aguardando -= 1
+                # Leitores bloqueados por este escritor podem seguir se ele desistiu
+                self._condicao.notify_all()
+
+    def liberar(self, compartilhado: bool):
+        with self._condicao:
+            if compartilhado:
+                self._leitores -= 1
+            else:
+                self._escritor = False
+            self._condicao.notify_all()
+
+
+class EstatisticasBloqueio:
+    """Tempo de espera e de posse dos bloqueios, por arquivo e modo (leitura/escrita)"""
+
+    _dados = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    def registrar(cls, caminho: str, modo: str, espera: float, posse: float):
+        with cls._guard:
+            dados = cls._dados.setdefault((caminho, modo), {
+                "aquisicoes": 0, "com_espera": 0, "espera_total": 0.0, "espera_max": 0.0,
+                "posse_total": 0.0, "posse_max": 0.0
+            })
+            dados["aquisicoes"] += 1
+            if espera >= 0.001:
+                dados["com_espera"] += 1
+            dados["espera_total"] += espera
+            dados["espera_max"] = max(dados["espera_max"], espera)
+            dados["posse_total"] += posse
+            dados["posse_max"] = max(dados["posse_max"], posse)
+
+    @classmethod
+    def resumo(cls) -> list:
+        """Uma linha por arquivo/modo, com tempos em milissegundos"""
+        with cls._guard:
+            linhas = []
+            for (caminho, modo), dados in sorted(cls._dados.items()):
+                linhas.append({
+                    "arquivo": os.path.basename(caminho),
+                    "modo": modo,
+                    "aquisicoes": dados["aquisicoes"],
+                    "com_espera": dados["com_espera"],
+                    "espera_media_ms": round(1000 * dados["espera_total"] / dados["aquisicoes"], 2),
+                    "espera_max_ms": round(1000 * dados["espera_max"], 2),
+                    "posse_media_ms": round(1000 * dados["posse_total"] / dados["aquisicoes"], 2),
+                    "posse_max_ms": round(1000 * dados["posse_max"], 2)
+                })
+            return linhas
+
+    @classmethod
+    def zerar(cls):
+        with cls._guard:
+            cls._dados.clear()
+
+
+class FileLock:
+    """
+    Bloqueio entre processos baseado em arquivo (fcntl no Linux/Mac, msvcrt no Windows).
+    Também coordena as threads do mesmo processo (sessões do Streamlit).
+
+    Com `compartilhado=True` é um bloqueio de leitura: vários leitores entram juntos e só
+    um escritor (bloqueio exclusivo) por vez. No Windows o msvcrt não tem bloqueio
+    compartilhado, então entre processos a leitura também é exclusiva.
+    """
+
+    _travas_processo = {}
+    _travas_processo_guard = threading.Lock()
+
+    def __init__(self, caminho: str, timeout: float = 30.0, compartilhado: bool = False):
+        self.caminho = os.path.abspath(caminho)
+        self.timeout = timeout
+        self.compartilhado = compartilhado
+        self.modo = "leitura" if compartilhado else "escrita"
+        # Estado por thread: a mesma instância pode ser usada por várias sessões ao mesmo tempo
+        self._local = threading.local()
+        with FileLock._travas_processo_guard:
+            self._trava_threads = FileLock._travas_processo.setdefault(self.caminho, _TravaLeituraEscrita())
+
+    def _tentar_bloquear(self, arquivo) -> bool:
+        try:
+            if fcntl:
+                modo = fcntl.LOCK_SH if self.compartilhado else fcntl.LOCK_EX
+                fcntl.flock(arquivo.fileno(), modo | fcntl.LOCK_NB)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _desbloquear(self, arquivo):
+        if fcntl:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        if not self._trava_threads.adquirir(self.compartilhado, self.timeout):
+            raise TimeoutError(f"Tempo esgotado aguardando o bloqueio de {self.caminho}")
+        arquivo = None
+        try:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            arquivo = open(self.caminho, 'a+')
+            pausa = 0.001
+            while not self._tentar_bloquear(arquivo):
+                if time.monotonic() >= limite:
+                    raise TimeoutError(f"Tempo esgotado aguardando o bloqueio de {self.caminho}")
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 0.05)
+        except Exception:
+            if arquivo:
+                arquivo.close()
+            self._trava_threads.liberar(self.compartilhado)
+            raise
+        self._local.arquivo = arquivo
+        self._local.adquirido_em = time.monotonic()
+        self._local.espera = self._local.adquirido_em - inicio
+
+    def release(self):
+        arquivo = getattr(self._local, "arquivo", None)
+        try:
+            if arquivo:
+                self._desbloquear(arquivo)
+                arquivo.close()
+        finally:
+            self._local.arquivo = None
+            self._trava_threads.liberar(self.compartilhado)
+            EstatisticasBloqueio.registrar(
+                self.caminho, self.modo, self._local.espera, time.monotonic() - self._local.adquirido_em
+            )
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class BloqueioLeituraEscrita:
+    """Par de bloqueios sobre o mesmo arquivo: `leitura()` compartilhado e `escrita()` exclusivo"""
+
+    def __init__(self, caminho: str, timeout: float = 30.0):
+        self._leitura = FileLock(caminho, timeout=timeout, compartilhado=True)
+        self._escrita = FileLock(caminho, timeout=timeout)
+
+    def leitura(self) -> FileLock:
+        return self._leitura
+
+    def escrita(self) -> FileLock:
+        return self._escrita
@@ -0,0 +1,607 @@
+import copy
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional
+
+import gspread
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+URL_PADRAO = "https://docs.google.com/spreadsheets/d/planilha-falsa/edit"
+
+_INTERVALO = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+_NUMERO = re.compile(r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+
+# Requisições do spreadsheets.batchUpdate que só mexem em formatação (aceitas sem efeito nos valores)
+_SO_FORMATACAO = {"repeatCell", "updateBorders", "mergeCells", "unmergeCells", "updateDimensionProperties",
+                  "autoResizeDimensions", "addConditionalFormatRule", "setBasicFilter", "clearBasicFilter"}
+
+
+class _RespostaFalsa:
+    """O mínimo de requests.Response que gspread.exceptions.APIError e CotaSheets leem"""
+
+    def __init__(self, status_code: int, mensagem: str, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": str(int(retry_after) + 1)} if retry_after is not None else {}
+        self._corpo = {"error": {"code": status_code, "message": mensagem, "status": "FALHA_SIMULADA"}}
+        self.text = json.dumps(self._corpo)
+
+    def json(self):
+        return self._corpo
+
+
+def erro_api(status_code: int, mensagem: str, retry_after: Optional[float] = None) -> gspread.exceptions.APIError:
+    """APIError como o gspread levanta para uma resposta HTTP de erro"""
+    return gspread.exceptions.APIError(_RespostaFalsa(status_code, mensagem, retry_after))
+
+
+def _coluna(letras: str) -> int:
+    return a1_to_rowcol(f"{letras}1")[1]
+
+
+def _valor_digitado(valor, value_input_option: Optional[str]):
+    """Valor guardado na célula: USER_ENTERED converte números e booleanos, como o Sheets"""
+    if valor is None:
+        return ""
+    if value_input_option != "USER_ENTERED" or not isinstance(valor, str):
+        return valor
+    texto = valor.strip()
+    if texto.startswith("'"):
+        return texto[1:]
+    if texto.upper() in ("TRUE", "FALSE"):
+        return texto.upper() == "TRUE"
+    if _NUMERO.match(texto):
+        numero = float(texto)
+        return int(numero) if numero.is_integer() and abs(numero) < 1e15 else numero
+    return valor
+
+
+def _valor_lido(valor, value_render_option: Optional[str]):
+    """Valor devolvido na leitura: FORMATTED_VALUE (padrão) é sempre texto"""
+    if value_render_option in ("UNFORMATTED_VALUE", "FORMULA"):
+        return valor
+    if isinstance(valor, bool):
+        return "TRUE" if valor else "FALSE"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+class ServidorSheetsFalso:
+    """
+    Google Sheets em memória para medir e testar a sincronização sem rede. Implementa o
+    subconjunto do gspread usado pelo sistema (cliente, planilha e abas) e conta cada chamada
+    como uma requisição de leitura ou escrita, como a API real.
+
+    Configuração:
+        latencia / variacao: segundos de espera por requisição (latencia + uniforme(0, variacao))
+        leituras_por_minuto / escritas_por_minuto: cota por janela de 60 s; acima dela a
+            requisição é recusada com 429 e Retry-After (None = sem limite)
+        taxa_falha / codigo_falha: probabilidade de cada requisição falhar com o código dado
+        falhar(): falhas pontuais para as próximas requisições (opcionalmente de uma operação)
+
+    Vários clientes (ServidorSheetsFalso.cliente()) enxergam as mesmas planilhas, como
+    processos diferentes falando com o mesmo Google.
+    """
+
+    def __init__(
+        self,
+        latencia: float = 0.0,
+        variacao: float = 0.0,
+        leituras_por_minuto: Optional[int] = None,
+        escritas_por_minuto: Optional[int] = None,
+        taxa_falha: float = 0.0,
+        codigo_falha: int = 503,
+        semente: Optional[int] = None
+    ):
+        self.latencia = latencia
+        self.variacao = variacao
+        self.limites = {"leitura": leituras_por_minuto, "escrita": escritas_por_minuto}
+        self.taxa_falha = taxa_falha
+        self.codigo_falha = codigo_falha
+        self.planilhas = {}
+        self.chamadas = Counter()
+        self.recusadas = Counter()
+        self._janelas = {"leitura": deque(), "escrita": deque()}
+        self._falhas = deque()
+        self._aleatorio = random.Random(semente)
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def cliente(self) -> "ClienteFalso":
+        return ClienteFalso(self)
+
+    def criar_planilha(self, url: str = URL_PADRAO, titulo: str = "Planilha falsa", abas: tuple = ("Pedidos",)) -> "PlanilhaFalsa":
+        """Cria (ou recria vazia) a planilha `url` com as abas informadas"""
+        with self._lock:
+            planilha = PlanilhaFalsa(self, url, titulo)
+            for nome in abas:
+                planilha._nova_aba(nome, 1000, 26)
+            self.planilhas[url] = planilha
+            return planilha
+
+    def falhar(self, codigo: int = 503, vezes: int = 1, operacao: Optional[str] = None, apos: int = 0):
+        """
+        As próximas `vezes` requisições (de `operacao`, se informada) falham com `codigo`,
+        depois de deixar passar `apos` delas (ex.: só o segundo append_rows falha)
+        """
+        with self._lock:
+            self._falhas.extend([[operacao, codigo, apos if i == 0 else 0] for i in range(vezes)])
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.chamadas.clear()
+            self.recusadas.clear()
+
+    def total(self, tipo: Optional[str] = None) -> int:
+        """Requisições recebidas (todas, ou só de `tipo` leitura/escrita)"""
+        with self._lock:
+            return sum(n for (t, _), n in self.chamadas.items() if tipo in (None, t))
+
+    def resumo(self) -> list:
+        """Uma linha por operação: tipo, requisições e quantas foram recusadas (429/falha simulada)"""
+        with self._lock:
+            return [
+                {"operacao": operacao, "tipo": tipo, "requisicoes": n, "recusadas": self.recusadas[(tipo, operacao)]}
+                for (tipo, operacao), n in sorted(self.chamadas.items())
+            ]
+
+    def _requisicao(self, operacao: str, escrita: bool = False):
+        """Contabiliza uma chamada à API, aplicando latência, cota e falhas configuradas"""
+        tipo = "escrita" if escrita else "leitura"
+        erro = None
+        with self._lock:
+            self.chamadas[(tipo, operacao)] += 1
+            agora = time.monotonic()
+            for indice, falha in enumerate(self._falhas):
+                alvo, codigo, _ = falha
+                if alvo in (None, operacao):
+                    if falha[2]:
+                        falha[2] -= 1
+                        break
+                    del self._falhas[indice]
+                    erro = erro_api(codigo, f"Falha simulada em {operacao}")
+                    break
+            if erro is None and self.taxa_falha and self._aleatorio.random() < self.taxa_falha:
+                erro = erro_api(self.codigo_falha, f"Falha aleatória simulada em {operacao}")
+            limite = self.limites[tipo]
+            if erro is None and limite:
+                janela = self._janelas[tipo]
+                while janela and agora - janela[0] >= 60:
+                    janela.popleft()
+                if len(janela) >= limite:
+                    erro = erro_api(429, f"Quota exceeded for quota metric '{tipo}' (simulada)", retry_after=60 - (agora - janela[0]))
+                else:
+                    janela.append(agora)
+            if erro is not None:
+                self.recusadas[(tipo, operacao)] += 1
+            pausa = self.latencia + (self._aleatorio.uniform(0, self.variacao) if self.variacao else 0)
+        if pausa > 0:
+            time.sleep(pausa)
+        if erro is not None:
+            raise erro
+
+
+class ClienteFalso:
+    """Substituto de gspread.Client (o retorno de gspread.authorize)"""
+
+    def __init__(self, servidor: ServidorSheetsFalso):
+        self.servidor = servidor
+
+    def open_by_url(self, url: str) -> "PlanilhaFalsa":
+        self.servidor._requisicao("open_by_url")
+        planilha = self.servidor.planilhas.get(url)
+        if planilha is None:
+            raise gspread.exceptions.SpreadsheetNotFound(url)
+        return planilha
+
+    def open_by_key(self, chave: str) -> "PlanilhaFalsa":
+        self.servidor._requisicao("open_by_key")
+        for planilha in self.servidor.planilhas.values():
+            if planilha.id == chave:
+                return planilha
+        raise gspread.exceptions.SpreadsheetNotFound(chave)
+
+    def open(self, titulo: str) -> "PlanilhaFalsa":
+        self.servidor._requisicao("open")
+        for planilha in self.servidor.planilhas.values():
+            if planilha.title == titulo:
+                return planilha
+        raise gspread.exceptions.SpreadsheetNotFound(titulo)
+
+
+class PlanilhaFalsa:
+    """Substituto de gspread.Spreadsheet; as abas guardam valores, não formatação"""
+
+    def __init__(self, servidor: ServidorSheetsFalso, url: str, titulo: str):
+        self.servidor = servidor
+        self.url = url
+        self.id = url.rstrip("/").split("/")[-2] if "/d/" in url else url
+        self.title = titulo
+        self._abas = []
+
+    def _nova_aba(self, titulo: str, rows: int, cols: int, indice: Optional[int] = None) -> "AbaFalsa":
+        if any(aba.title == titulo for aba in self._abas):
+            raise erro_api(400, f'A sheet with the name "{titulo}" already exists. Please enter another name.')
+        aba = AbaFalsa(self, next(self.servidor._ids), titulo, rows, cols)
+        self._abas.insert(len(self._abas) if indice is None else indice, aba)
+        return aba
+
+    def _aba_por_id(self, sheet_id: int) -> "AbaFalsa":
+        for aba in self._abas:
+            if aba.id == sheet_id:
+                return aba
+        raise erro_api(400, f"No grid with id: {sheet_id}")
+
+    def _aba_do_intervalo(self, intervalo: str) -> tuple:
+        if "!" in intervalo:
+            titulo, celulas = intervalo.rsplit("!", 1)
+            titulo = titulo.strip("'").replace("''", "'")
+        elif any(aba.title == intervalo.strip("'").replace("''", "'") for aba in self._abas):
+            # Só o nome da aba: a aba inteira
+            titulo, celulas = intervalo.strip("'").replace("''", "'"), ""
+        else:
+            titulo, celulas = self._abas[0].title, intervalo
+        for aba in self._abas:
+            if aba.title == titulo:
+                return aba, celulas
+        raise erro_api(400, f"Unable to parse range: {intervalo}")
+
+    # Metadados
+    def worksheets(self) -> list:
+        self.servidor._requisicao("worksheets")
+        return list(self._abas)
+
+    def worksheet(self, titulo: str) -> "AbaFalsa":
+        self.servidor._requisicao("worksheet")
+        for aba in self._abas:
+            if aba.title == titulo:
+                return aba
+        raise gspread.exceptions.WorksheetNotFound(titulo)
+
+    def get_worksheet(self, indice: int) -> Optional["AbaFalsa"]:
+        self.servidor._requisicao("get_worksheet")
+        return self._abas[indice] if 0 <= indice < len(self._abas) else None
+
+    @property
+    def sheet1(self) -> "AbaFalsa":
+        return self.get_worksheet(0)
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> "AbaFalsa":
+        self.servidor._requisicao("add_worksheet", escrita=True)
+        with self.servidor._lock:
+            return self._nova_aba(title, rows, cols, index)
+
+    def del_worksheet(self, aba: "AbaFalsa"):
+        self.servidor._requisicao("del_worksheet", escrita=True)
+        with self.servidor._lock:
+            self._abas.remove(self._aba_por_id(aba.id))
+
+    def duplicate_sheet(self, source_sheet_id: int, insert_sheet_index: Optional[int] = None, new_sheet_id: Optional[int] = None, new_sheet_name: Optional[str] = None) -> "AbaFalsa":
+        self.servidor._requisicao("duplicate_sheet", escrita=True)
+        with self.servidor._lock:
+            return self._duplicar(source_sheet_id, insert_sheet_index, new_sheet_name)
+
+    def _duplicar(self, sheet_id: int, indice: Optional[int], titulo: Optional[str]) -> "AbaFalsa":
+        origem = self._aba_por_id(sheet_id)
+        aba = self._nova_aba(
+            titulo or f"Cópia de {origem.title}", origem.row_count, origem.col_count,
+            origem.index + 1 if indice is None else indice
+        )
+        aba._celulas = copy.deepcopy(origem._celulas)
+        aba.congeladas = origem.congeladas
+        return aba
+
+    # Valores
+    def values_batch_get(self, ranges: list, params: Optional[dict] = None) -> dict:
+        self.servidor._requisicao("values_batch_get")
+        renderizacao = (params or {}).get("valueRenderOption")
+        with self.servidor._lock:
+            resposta = []
+            for intervalo in ranges:
+                aba, celulas = self._aba_do_intervalo(intervalo)
+                valores = aba._ler(celulas, renderizacao)
+                resposta.append({"range": intervalo, "majorDimension": "ROWS", **({"values": valores} if valores else {})})
+            return {"spreadsheetId": self.id, "valueRanges": resposta}
+
+    def values_get(self, intervalo: str, params: Optional[dict] = None) -> dict:
+        return self.values_batch_get([intervalo], params)["valueRanges"][0]
+
+    def batch_update(self, body: dict) -> dict:
+        """spreadsheets.batchUpdate: todas as requisições são aplicadas, ou nenhuma"""
+        self.servidor._requisicao("batch_update", escrita=True)
+        with self.servidor._lock:
+            estado = (list(self._abas), {aba.id: aba._estado() for aba in self._abas})
+            try:
+                return {"spreadsheetId": self.id, "replies": [self._aplicar(req) for req in body.get("requests", [])]}
+            except Exception:
+                self._abas = estado[0]
+                for aba in self._abas:
+                    aba._restaurar(estado[1][aba.id])
+                raise
+
+    def _aplicar(self, requisicao: dict) -> dict:
+        (tipo, dados), = requisicao.items()
+        if tipo in _SO_FORMATACAO:
+            return {}
+        if tipo == "updateCells":
+            inicio = dados["start"]
+            aba = self._aba_por_id(inicio["sheetId"])
+            linhas = [[
+                next(iter(celula.get("userEnteredValue", {"stringValue": ""}).values())) for celula in linha.get("values", [])
+            ] for linha in dados.get("rows", [])]
+            aba._escrever(inicio.get("rowIndex", 0) + 1, inicio.get("columnIndex", 0) + 1, linhas, "RAW")
+            return {}
+        if tipo == "updateSheetProperties":
+            propriedades = dados["properties"]
+            aba = self._aba_por_id(propriedades["sheetId"])
+            if "title" in propriedades:
+                if any(outra.title == propriedades["title"] and outra is not aba for outra in self._abas):
+                    raise erro_api(400, f'A sheet with the name "{propriedades["title"]}" already exists.')
+                aba.title = propriedades["title"]
+            if "index" in propriedades:
+                self._abas.remove(aba)
+                self._abas.insert(min(propriedades["index"], len(self._abas)), aba)
+            grade = propriedades.get("gridProperties", {})
+            aba.congeladas = grade.get("frozenRowCount", aba.congeladas)
+            aba._redimensionar(grade.get("rowCount"), grade.get("columnCount"))
+            return {}
+        if tipo == "addSheet":
+            propriedades = dados.get("properties", {})
+            grade = propriedades.get("gridProperties", {})
+            aba = self._nova_aba(propriedades.get("title", f"Página{len(self._abas) + 1}"),
+                                 grade.get("rowCount", 1000), grade.get("columnCount", 26), propriedades.get("index"))
+            return {"addSheet": {"properties": {"sheetId": aba.id, "title": aba.title, "index": aba.index}}}
+        if tipo == "duplicateSheet":
+            aba = self._duplicar(dados["sourceSheetId"], dados.get("insertSheetIndex"), dados.get("newSheetName"))
+            return {"duplicateSheet": {"properties": {"sheetId": aba.id, "title": aba.title, "index": aba.index}}}
+        if tipo == "deleteSheet":
+            self._abas.remove(self._aba_por_id(dados["sheetId"]))
+            return {}
+        if tipo == "deleteDimension":
+            intervalo = dados["range"]
+            self._aba_por_id(intervalo["sheetId"])._apagar_dimensao(
+                intervalo["dimension"], intervalo["startIndex"], intervalo["endIndex"]
+            )
+            return {}
+        if tipo == "appendDimension":
+            aba = self._aba_por_id(dados["sheetId"])
+            if dados["dimension"] == "ROWS":
+                aba._redimensionar(aba.row_count + dados["length"], None)
+            else:
+                aba._redimensionar(None, aba.col_count + dados["length"])
+            return {}
+        raise erro_api(400, f"Requisição '{tipo}' não suportada pelo Sheets falso")
+
+
+class AbaFalsa:
+    """Substituto de gspread.Worksheet: grade de valores com limite de linhas/colunas"""
+
+    def __init__(self, planilha: PlanilhaFalsa, sheet_id: int, titulo: str, rows: int, cols: int):
+        self.spreadsheet = planilha
+        self.id = sheet_id
+        self.title = titulo
+        self.row_count = rows
+        self.col_count = cols
+        self.congeladas = 0
+        self.formatos = []
+        self._celulas = []
+
+    @property
+    def index(self) -> int:
+        return self.spreadsheet._abas.index(self)
+
+    def _requisicao(self, operacao: str, escrita: bool = False):
+        self.spreadsheet.servidor._requisicao(operacao, escrita)
+
+    def _estado(self) -> tuple:
+        return (self.title, self.row_count, self.col_count, self.congeladas, copy.deepcopy(self._celulas))
+
+    def _restaurar(self, estado: tuple):
+        self.title, self.row_count, self.col_count, self.congeladas, self._celulas = estado
+
+    def _limites(self, intervalo: str) -> tuple:
+        """(linha1, coluna1, linha2, coluna2) 1-based de 'A1', 'A1:B2', 'A:A', '1:1', 'A2:T'..."""
+        if "!" in intervalo:
+            intervalo = intervalo.rsplit("!", 1)[1]
+        m = _INTERVALO.match(intervalo.strip())
+        if not m:
+            raise erro_api(400, f"Unable to parse range: {self.title}!{intervalo}")
+        c1, r1, c2, r2 = m.groups()
+        if m.group(3) is None and m.group(4) is None:
+            c2, r2 = c1, r1
+        return (
+            int(r1) if r1 else 1,
+            _coluna(c1) if c1 else 1,
+            int(r2) if r2 else self.row_count,
+            _coluna(c2) if c2 else self.col_count
+        )
+
+    def _ler(self, intervalo: str, value_render_option: Optional[str] = None) -> list:
+        r1, c1, r2, c2 = self._limites(intervalo)
+        linhas = []
+        for r in range(r1, min(r2, len(self._celulas)) + 1):
+            linha = [_valor_lido(v, value_render_option) for v in self._celulas[r - 1][c1 - 1:c2]]
+            while linha and linha[-1] == "":
+                linha.pop()
+            linhas.append(linha)
+        while linhas and not linhas[-1]:
+            linhas.pop()
+        return linhas
+
+    def _escrever(self, r: int, c: int, valores: list, value_input_option: Optional[str]):
+        if valores and (r + len(valores) - 1 > self.row_count or c + max(len(v) for v in valores) - 1 > self.col_count):
+            raise erro_api(400, f"Range ({self.title}!{rowcol_to_a1(r, c)}) exceeds grid limits. "
+                                f"Max rows: {self.row_count}, max columns: {self.col_count}")
+        for i, linha in enumerate(valores):
+            while len(self._celulas) < r + i:
+                self._celulas.append([])
+            destino = self._celulas[r + i - 1]
+            for j, valor in enumerate(linha):
+                while len(destino) < c + j:
+                    destino.append("")
+                destino[c + j - 1] = _valor_digitado(valor, value_input_option)
+
+    def _limpar(self, intervalo: str):
+        r1, c1, r2, c2 = self._limites(intervalo)
+        for r in range(r1, min(r2, len(self._celulas)) + 1):
+            linha = self._celulas[r - 1]
+            for c in range(c1, min(c2, len(linha)) + 1):
+                linha[c - 1] = ""
+
+    def _redimensionar(self, rows: Optional[int], cols: Optional[int]):
+        if rows is not None:
+            self.row_count = rows
+            del self._celulas[rows:]
+        if cols is not None:
+            self.col_count = cols
+            for linha in self._celulas:
+                del linha[cols:]
+
+    def _apagar_dimensao(self, dimensao: str, inicio: int, fim: int):
+        if dimensao == "ROWS":
+            if fim - inicio >= self.row_count - self.congeladas:
+                raise erro_api(400, "You can't delete all the rows on the sheet.")
+            del self._celulas[inicio:fim]
+            self.row_count -= fim - inicio
+        else:
+            for linha in self._celulas:
+                del linha[inicio:fim]
+            self.col_count -= fim - inicio
+
+    def _ultima_linha(self) -> int:
+        return len(self._ler(f"A1:{rowcol_to_a1(self.row_count, self.col_count)}"))
+
+    # Leitura
+    def get_values(self, range_name: Optional[str] = None, value_render_option: Optional[str] = None, **kwargs) -> list:
+        self._requisicao("get_values")
+        with self.spreadsheet.servidor._lock:
+            valores = self._ler(range_name or f"A1:{rowcol_to_a1(self.row_count, self.col_count)}", value_render_option)
+        largura = max((len(linha) for linha in valores), default=0)
+        return [linha + [""] * (largura - len(linha)) for linha in valores]
+
+    def get_all_values(self, **kwargs) -> list:
+        return self.get_values(**kwargs)
+
+    def get_all_records(self, head: int = 1, default_blank="", value_render_option: Optional[str] = None, **kwargs) -> list:
+        valores = self.get_values(value_render_option=value_render_option)
+        if len(valores) < head:
+            return []
+        cabecalho = valores[head - 1]
+        return [
+            dict(zip(cabecalho, gspread.utils.numericise_all(linha, default_blank=default_blank)))
+            for linha in valores[head:]
+        ]
+
+    def row_values(self, row: int, value_render_option: Optional[str] = None, **kwargs) -> list:
+        self._requisicao("row_values")
+        with self.spreadsheet.servidor._lock:
+            valores = self._ler(f"A{row}:{rowcol_to_a1(row, self.col_count)}", value_render_option)
+        return valores[0] if valores else []
+
+    def col_values(self, col: int, value_render_option: Optional[str] = None, **kwargs) -> list:
+        self._requisicao("col_values")
+        letra = rowcol_to_a1(1, col)[:-1]
+        with self.spreadsheet.servidor._lock:
+            valores = self._ler(f"{letra}1:{letra}{self.row_count}", value_render_option)
+        return [linha[0] if linha else "" for linha in valores]
+
+    def acell(self, label: str, value_render_option: Optional[str] = None) -> gspread.Cell:
+        self._requisicao("acell")
+        row, col = a1_to_rowcol(label)
+        with self.spreadsheet.servidor._lock:
+            valores = self._ler(label, value_render_option)
+        return gspread.Cell(row, col, valores[0][0] if valores and valores[0] else None)
+
+    def cell(self, row: int, col: int, value_render_option: Optional[str] = None) -> gspread.Cell:
+        self._requisicao("cell")
+        with self.spreadsheet.servidor._lock:
+            valores = self._ler(rowcol_to_a1(row, col), value_render_option)
+        return gspread.Cell(row, col, valores[0][0] if valores and valores[0] else None)
+
+    def batch_get(self, ranges: list, value_render_option: Optional[str] = None, **kwargs) -> list:
+        self._requisicao("batch_get")
+        with self.spreadsheet.servidor._lock:
+            return [self._ler(intervalo, value_render_option) for intervalo in ranges]
+
+    # Escrita
+    def update(self, range_name, values=None, value_input_option: str = "RAW", **kwargs) -> dict:
+        self._requisicao("update", escrita=True)
+        if isinstance(range_name, list):
+            # Ordem do gspread 6: update(values, range_name)
+            range_name, values = values or "A1", range_name
+        if not isinstance(values, list):
+            values = [[values]]
+        r, c = a1_to_rowcol(range_name.split("!")[-1].split(":")[0])
+        with self.spreadsheet.servidor._lock:
+            self._escrever(r, c, values, value_input_option)
+        return {"updatedRange": f"'{self.title}'!{range_name}", "updatedRows": len(values)}
+
+    def update_cell(self, row: int, col: int, value) -> dict:
+        self._requisicao("update_cell", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            self._escrever(row, col, [[value]], "USER_ENTERED")
+        return {"updatedRange": f"'{self.title}'!{rowcol_to_a1(row, col)}"}
+
+    def batch_update(self, data: list, value_input_option: str = "RAW", **kwargs) -> dict:
+        self._requisicao("batch_update", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            for item in data:
+                self._limites(item["range"])
+            for item in data:
+                r1, c1, _, _ = self._limites(item["range"])
+                self._escrever(r1, c1, item["values"], value_input_option)
+        return {"totalUpdatedRows": sum(len(item["values"]) for item in data)}
+
+    def append_rows(self, values: list, value_input_option: str = "RAW", **kwargs) -> dict:
+        self._requisicao("append_rows", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            inicio = self._ultima_linha() + 1
+            # O append da API aumenta a grade quando preciso
+            if inicio + len(values) - 1 > self.row_count:
+                self.row_count = inicio + len(values) - 1
+            largura = max((len(linha) for linha in values), default=0)
+            self.col_count = max(self.col_count, largura)
+            self._escrever(inicio, 1, values, value_input_option)
+        fim = rowcol_to_a1(inicio + len(values) - 1, max(largura, 1))
+        return {"updates": {"updatedRange": f"'{self.title}'!A{inicio}:{fim}", "updatedRows": len(values)}}
+
+    def append_row(self, values: list, value_input_option: str = "RAW", **kwargs) -> dict:
+        return self.append_rows([values], value_input_option=value_input_option, **kwargs)
+
+    def batch_clear(self, ranges: list) -> dict:
+        self._requisicao("batch_clear", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            for intervalo in ranges:
+                self._limpar(intervalo)
+        return {"clearedRanges": list(ranges)}
+
+    def clear(self) -> dict:
+        self._requisicao("clear", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            self._celulas = []
+        return {}
+
+    def format(self, ranges, format: dict) -> dict:
+        self._requisicao("format", escrita=True)
+        self.formatos.append((ranges, format))
+        return {}
+
+    def freeze(self, rows: Optional[int] = None, cols: Optional[int] = None) -> dict:
+        self._requisicao("freeze", escrita=True)
+        if rows is not None:
+            self.congeladas = rows
+        return {}
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> dict:
+        self._requisicao("resize", escrita=True)
+        with self.spreadsheet.servidor._lock:
+            self._redimensionar(rows, cols)
+        return {}
+
+    def add_rows(self, rows: int) -> dict:
+        return self.resize(rows=self.row_count + rows)
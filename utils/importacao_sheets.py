@@ -0,0 +1,90 @@
+import re
+from collections import Counter
+from typing import List, Tuple
+
+_NUMERO = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def texto_celula(celula) -> str:
+    """
+    Célula como texto comparável entre o arquivo e a planilha: números ficam na forma que o
+    Sheets guarda com USER_ENTERED ("1.0", "001" e 1 viram "1"); o resto, como str.
+    """
+    texto = str(celula)
+    if isinstance(celula, bool) or not _NUMERO.match(texto.strip()):
+        return texto
+    numero = float(texto)
+    if not numero.is_integer():
+        return repr(numero)
+    # Inteiros longos (códigos) ficam como vieram para não perder dígitos
+    return str(int(numero)) if abs(numero) < 1e15 else texto
+
+
+def normalizar_linhas(linhas: List[list], largura: int) -> List[list]:
+    """Linhas como texto comparável, com exatamente `largura` colunas"""
+    return [[texto_celula(celula) for celula in (list(linha) + [""] * largura)[:largura]] for linha in linhas]
+
+
+def planejar_substituicao(atual: List[list], novo: List[list]) -> List[list]:
+    """
+    Conteúdo final da aba (cabeçalho + dados) que tenha exatamente as linhas de `novo`
+    mexendo no mínimo de linhas de `atual`: linhas que continuam existindo ficam onde estão
+    (a própria linha é a chave), as novas ocupam as posições das removidas e, se sobrarem
+    posições vazias, as últimas linhas sobem para preenchê-las.
+    """
+    if not atual or atual[0] != novo[0]:
+        return [list(linha) for linha in novo]
+
+    disponiveis = Counter(tuple(linha) for linha in novo[1:])
+    final = [list(novo[0])]
+    livres = []
+    for indice, linha in enumerate(atual[1:], start=1):
+        chave = tuple(linha)
+        if disponiveis[chave] > 0:
+            disponiveis[chave] -= 1
+            final.append(list(linha))
+        else:
+            final.append(None)
+            livres.append(indice)
+
+    # Linhas do arquivo que não existiam na aba, na ordem do arquivo
+    ja_mantidas = Counter(tuple(linha) for linha in final[1:] if linha is not None)
+    acrescentar = []
+    for linha in novo[1:]:
+        chave = tuple(linha)
+        if ja_mantidas[chave] > 0:
+            ja_mantidas[chave] -= 1
+        else:
+            acrescentar.append(list(linha))
+
+    for indice, linha in zip(livres, acrescentar):
+        final[indice] = linha
+    final.extend(acrescentar[len(livres):])
+
+    # Posições que ficaram vazias recebem as últimas linhas
+    livres = livres[len(acrescentar):]
+    while livres:
+        while final and final[-1] is None:
+            final.pop()
+        indice = livres.pop(0)
+        if indice < len(final):
+            final[indice] = final.pop()
+    return final
+
+
+def trechos_alterados(atual: List[list], final: List[list], linhas_por_lote: int = 500) -> List[List[Tuple[int, List[list]]]]:
+    """
+    Lotes de escrita com as linhas de `final` que diferem de `atual`. Cada lote tem no máximo
+    `linhas_por_lote` linhas, em trechos contíguos (linha inicial 1-based, valores).
+    """
+    alteradas = [i for i, linha in enumerate(final) if i >= len(atual) or atual[i] != linha]
+    lotes = []
+    for inicio in range(0, len(alteradas), linhas_por_lote):
+        trechos = []
+        for i in alteradas[inicio:inicio + linhas_por_lote]:
+            if trechos and trechos[-1][0] + len(trechos[-1][1]) == i + 1:
+                trechos[-1][1].append(final[i])
+            else:
+                trechos.append((i + 1, [final[i]]))
+        lotes.append(trechos)
+    return lotes
@@ -0,0 +1,71 @@
+import json
+import os
+from typing import Dict, Iterable, List
+
+from utils.file_lock import FileLock
+
+
+def normalizar_numero(numero) -> str:
+    return str(numero).strip().upper()
+
+
+class IndiceLinhasSheets:
+    """
+    Mapa persistido Numero_Pedido → linha da aba Pedidos do Google Sheets.
+
+    É montado uma vez a partir da coluna A e mantido a cada append (a resposta do append
+    informa as linhas gravadas). Quem usa o índice confere a célula A da linha em cache
+    antes de escrever e só reconstrói o mapa quando a conferência falha, então atualizar
+    um pedido não precisa baixar a coluna inteira. O arquivo é ligado à URL da planilha:
+    trocar de planilha descarta o mapa.
+    """
+
+    def __init__(self, caminho_arquivo: str, url: str):
+        self.caminho_arquivo = caminho_arquivo
+        self.url = url
+        self._lock = FileLock(caminho_arquivo + ".lock")
+        self._linhas = None
+
+    def _ler(self) -> Dict[str, int]:
+        if os.path.exists(self.caminho_arquivo):
+            try:
+                with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+                if dados.get("url") == self.url:
+                    return {numero: int(linha) for numero, linha in dados.get("linhas", {}).items()}
+            except (ValueError, OSError, AttributeError):
+                pass
+        return {}
+
+    def _salvar(self, linhas: Dict[str, int]):
+        temporario = f"{self.caminho_arquivo}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"url": self.url, "linhas": linhas}, f)
+        os.replace(temporario, self.caminho_arquivo)
+
+    def localizar(self, numeros: Iterable[str]) -> Dict[str, int]:
+        """Linhas em cache dos pedidos (números normalizados); os ausentes ficam de fora"""
+        numeros = [normalizar_numero(n) for n in numeros]
+        if self._linhas is None or any(n not in self._linhas for n in numeros):
+            # Outro processo pode ter registrado pedidos novos
+            with self._lock:
+                self._linhas = self._ler()
+        return {n: self._linhas[n] for n in numeros if n in self._linhas}
+
+    def registrar(self, linhas: Dict[str, int]):
+        """Acrescenta ao mapa os pedidos recém-gravados (número → linha)"""
+        with self._lock:
+            atuais = self._ler()
+            atuais.update({normalizar_numero(n): linha for n, linha in linhas.items()})
+            self._salvar(atuais)
+            self._linhas = atuais
+
+    def reconstruir(self, coluna_numeros: List[str]):
+        """Refaz o mapa a partir da coluna Numero_Pedido inteira (com o cabeçalho na linha 1)"""
+        linhas = {}
+        for linha, numero in enumerate(coluna_numeros[1:], start=2):
+            linhas.setdefault(normalizar_numero(numero), linha)
+        linhas.pop("", None)
+        with self._lock:
+            self._salvar(linhas)
+            self._linhas = linhas
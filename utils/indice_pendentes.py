@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+import pandas as pd
+
+
+def _chave(serial, maquina, posto, coordenada) -> tuple:
+    return tuple(str(valor if valor is not None else "").strip() for valor in (serial, maquina, posto, coordenada))
+
+
+class IndicePendentes:
+    """
+    Índice em memória dos pedidos PENDENTE, indexado por (serial, máquina, posto, coordenada).
+
+    Mantido a cada criação e mudança de status, torna a verificação de serial duplicado O(1).
+    O índice é reconstruído quando a `versao` da fonte muda por escrita de outro processo
+    ou, para fontes sem versão (Google Sheets), quando passa do `ttl`.
+    """
+
+    def __init__(
+        self,
+        carregar: Callable[[], pd.DataFrame],
+        versao: Optional[Callable[[], Hashable]] = None,
+        ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            carregar: Retorna os pedidos (ao menos os PENDENTE) com Numero_Pedido, Serial, Maquina, Posto, Coordenada e Status
+            versao: Retorna a revisão atual da fonte, comparada por igualdade; inteiros que cada escrita local incrementa em 1 permitem seguir as próprias escritas sem recarregar
+            ttl: Idade máxima do índice em segundos, para fontes sem controle de versão
+        """
+        self._carregar = carregar
+        self._versao = versao
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._por_chave = {}
+        self._por_numero = {}
+        self._revisao = None
+        self._carregado_em = None
+
+    def invalidar(self):
+        with self._lock:
+            self._carregado_em = None
+            self._revisao = None
+
+    def reconstruir(self):
+        with self._lock:
+            revisao = self._versao() if self._versao else None
+            df = self._carregar()
+            self._por_chave = {}
+            self._por_numero = {}
+            if not df.empty and 'Status' in df.columns:
+                pendentes = df[df['Status'].astype(str).str.strip().str.upper() == 'PENDENTE']
+                for row in pendentes.to_dict(orient='records'):
+                    self._indexar(row.get('Numero_Pedido'), _chave(
+                        row.get('Serial'), row.get('Maquina'), row.get('Posto'), row.get('Coordenada')
+                    ))
+            self._revisao = revisao
+            self._carregado_em = time.monotonic()
+
+    def _indexar(self, numero_pedido, chave: tuple):
+        numero = str(numero_pedido).strip()
+        self._por_chave.setdefault(chave, set()).add(numero)
+        self._por_numero[numero] = chave
+
+    def _remover(self, numero_pedido):
+        numero = str(numero_pedido).strip()
+        chave = self._por_numero.pop(numero, None)
+        if chave is not None:
+            numeros = self._por_chave.get(chave, set())
+            numeros.discard(numero)
+            if not numeros:
+                self._por_chave.pop(chave, None)
+
+    def _garantir_atualizado(self):
+        if self._carregado_em is None:
+            self.reconstruir()
+        elif self._versao and self._versao() != self._revisao:
+            self.reconstruir()
+        elif self.ttl is not None and time.monotonic() - self._carregado_em > self.ttl:
+            self.reconstruir()
+
+    def _registrar_escrita(self):
+        """Acompanha a revisão após uma escrita local; se outro processo escreveu junto, reconstrói depois"""
+        if not self._versao or self._revisao is None:
+            return
+        atual = self._versao()
+        if isinstance(atual, int) and atual == self._revisao + 1:
+            self._revisao = atual
+        else:
+            self._carregado_em = None
+
+    def pendente_duplicado(self, serial, maquina, posto, coordenada, ignorar_numero: Optional[str] = None) -> Optional[str]:
+        """Retorna o número de um pedido PENDENTE com a mesma chave (diferente de `ignorar_numero`), se houver"""
+        with self._lock:
+            self._garantir_atualizado()
+            numeros = self._por_chave.get(_chave(serial, maquina, posto, coordenada), set())
+            ignorar = str(ignorar_numero).strip() if ignorar_numero is not None else None
+            for numero in numeros:
+                if numero != ignorar:
+                    return numero
+            return None
+
+    def contem(self, serial, maquina, posto, coordenada) -> bool:
+        return self.pendente_duplicado(serial, maquina, posto, coordenada) is not None
+
+    def adicionar(self, pedido: dict, registrar_escrita: bool = True):
+        """Indexa um pedido recém-criado (somente se estiver PENDENTE)"""
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            if str(pedido.get('Status', 'PENDENTE')).strip().upper() == 'PENDENTE':
+                self._indexar(pedido.get('Numero_Pedido'), _chave(
+                    pedido.get('Serial'), pedido.get('Maquina'), pedido.get('Posto'), pedido.get('Coordenada')
+                ))
+            if registrar_escrita:
+                self._registrar_escrita()
+
+    def atualizar_status(self, numero_pedido: str, novo_status: str, pedido: Optional[dict] = None, registrar_escrita: bool = True):
+        """
+        Reflete uma mudança de status. Para voltar um pedido a PENDENTE é preciso informar
+        `pedido` (com Serial/Maquina/Posto/Coordenada); sem ele o índice é reconstruído depois.
+        """
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            self._remover(numero_pedido)
+            if str(novo_status).strip().upper() == 'PENDENTE':
+                if pedido:
+                    self._indexar(numero_pedido, _chave(
+                        pedido.get('Serial'), pedido.get('Maquina'), pedido.get('Posto'), pedido.get('Coordenada')
+                    ))
+                else:
+                    self._carregado_em = None
+                    return
+            if registrar_escrita:
+                self._registrar_escrita()
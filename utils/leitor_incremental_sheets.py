@@ -0,0 +1,238 @@
+import threading
+import time
+
+import gspread
+import pandas as pd
+
+from utils.cota_sheets import PRIORIDADE_LEITURA, PRIORIDADE_SEGUNDO_PLANO
+
+ABA_ALTERACOES = "Alteracoes"
+COLUNAS_ALTERACOES = ["Numero_Pedido", "Linha", "Status", "Quando"]
+
+
+def _intervalo(aba: str, inicio: str, fim: str) -> str:
+    return f"'{aba}'!{inicio}:{fim}"
+
+
+class LeitorIncremental:
+    """
+    Leitura incremental da aba Pedidos, compartilhada pelas sessões do processo.
+
+    Os pedidos só são acrescentados ao fim da aba, então cada atualização busca apenas as
+    linhas após a última já lida e as novas entradas da aba Alteracoes, em um único
+    values_batch_get. Cada entrada de Alteracoes aponta uma linha já existente que mudou
+    (ex.: status); essas linhas são relidas em uma segunda requisição, só quando houver.
+    O custo depende da atividade desde a última leitura, não do tamanho do histórico.
+    Uma recarga completa é feita na primeira leitura, a cada `recarga_completa` segundos
+    e quando algo não confere (ex.: linhas apagadas ou reordenadas na planilha). Enquanto a
+    aba Alteracoes não existir (nenhuma gravação migrou o esquema ainda), toda atualização é
+    uma recarga completa.
+
+    O último resultado bom é servido na hora enquanto tiver menos de `max_desatualizacao`
+    segundos, com a atualização feita em segundo plano (stale-while-revalidate): a página
+    não espera o Google. Ele também é servido se a leitura falhar (ex.: cota esgotada). Só
+    há espera quando não existe resultado, quando ele passou do limite ou depois de uma
+    gravação deste processo (expirar), para quem gravou ver a própria alteração.
+    """
+
+    _instancias = {}
+    _instancias_guard = threading.Lock()
+
+    @classmethod
+    def obter(cls, chave, **kwargs) -> "LeitorIncremental":
+        with cls._instancias_guard:
+            leitor = cls._instancias.get(chave)
+            if leitor is None:
+                leitor = cls(**kwargs)
+                cls._instancias[chave] = leitor
+            return leitor
+
+    def __init__(
+        self,
+        aba: str = "Pedidos",
+        ultima_coluna: str = "T",
+        intervalo_minimo: float = 15.0,
+        recarga_completa: float = 3600.0,
+        max_linhas_alteradas: int = 200,
+        max_desatualizacao: float = 300.0
+    ):
+        """
+        Args:
+            intervalo_minimo: Segundos em que o resultado anterior é reutilizado sem consultar a planilha
+            recarga_completa: Segundos entre recargas completas de segurança
+            max_linhas_alteradas: Acima disso, recarrega tudo em vez de reler linha a linha
+            max_desatualizacao: Idade máxima (segundos) do resultado servido enquanto a atualização
+                corre em segundo plano ou quando a leitura falha
+        """
+        self.aba = aba
+        self.ultima_coluna = ultima_coluna
+        self.intervalo_minimo = intervalo_minimo
+        self.recarga_completa = recarga_completa
+        self.max_linhas_alteradas = max_linhas_alteradas
+        self.max_desatualizacao = max_desatualizacao
+        # _lock: uma leitura da planilha por vez; _estado: resultado servido (nunca espera a rede)
+        self._lock = threading.Lock()
+        self._estado = threading.Lock()
+        self._cabecalho = None
+        self._linhas = []
+        self._alteracoes_lidas = 0
+        self._completo_em = None
+        self._df = None
+        self._lido_em = None
+        self._expirado = False
+        self._geracao = 0
+        self._revalidando = False
+        self._ultimo_erro = None
+
+    def invalidar(self):
+        """Força uma recarga completa na próxima leitura"""
+        with self._lock:
+            self._cabecalho = None
+        self.expirar()
+
+    def expirar(self):
+        """A próxima leitura busca o que mudou (incremental) em vez de servir o resultado atual"""
+        with self._estado:
+            self._expirado = True
+            self._geracao += 1
+
+    def situacao(self) -> dict:
+        """Idade do resultado servido (segundos), se há atualização em andamento e o último erro"""
+        with self._estado:
+            return {
+                "idade_s": time.monotonic() - self._lido_em if self._lido_em is not None else None,
+                "atualizando": self._revalidando,
+                "erro": self._ultimo_erro
+            }
+
+    def carregar(self, sync, prioridade: int = PRIORIDADE_LEITURA) -> pd.DataFrame:
+        """Pedidos da aba (como get_all_records), atualizados de forma incremental"""
+        with self._estado:
+            df = self._df
+            idade = time.monotonic() - self._lido_em if df is not None else None
+            if df is not None and not self._expirado:
+                if idade < self.intervalo_minimo:
+                    return df.copy()
+                if idade < self.max_desatualizacao:
+                    self._revalidar_em_segundo_plano(sync)
+                    return df.copy()
+        try:
+            return self._ler_planilha(sync, prioridade).copy()
+        except Exception as e:
+            with self._estado:
+                self._ultimo_erro = str(e)
+            # Sem resposta do Google: o último resultado bom ainda serve, dentro do limite
+            if df is not None and idade < self.max_desatualizacao:
+                return df.copy()
+            raise
+
+    def _revalidar_em_segundo_plano(self, sync):
+        """Dispara (uma por vez) a atualização do resultado; chamado com _estado travado"""
+        if self._revalidando:
+            return
+        self._revalidando = True
+
+        def revalidar():
+            try:
+                self._ler_planilha(sync, PRIORIDADE_SEGUNDO_PLANO)
+            except Exception as e:
+                with self._estado:
+                    self._ultimo_erro = str(e)
+            finally:
+                with self._estado:
+                    self._revalidando = False
+
+        threading.Thread(target=revalidar, name="revalidar-pedidos", daemon=True).start()
+
+    def _ler_planilha(self, sync, prioridade: int) -> pd.DataFrame:
+        with self._lock:
+            with self._estado:
+                # Outra sessão pode ter acabado de atualizar enquanto esta esperava
+                if (self._df is not None and not self._expirado
+                        and time.monotonic() - self._lido_em < self.intervalo_minimo):
+                    return self._df
+                geracao = self._geracao
+            agora = time.monotonic()
+            if self._cabecalho is None or agora - self._completo_em > self.recarga_completa:
+                self._recarregar(sync, prioridade)
+            elif not self._atualizar(sync, prioridade):
+                self._recarregar(sync, prioridade)
+            df = self._montar()
+            with self._estado:
+                self._df = df
+                self._lido_em = agora
+                self._ultimo_erro = None
+                # Gravação durante a leitura: a próxima leitura ainda precisa buscar o que mudou
+                self._expirado = self._geracao != geracao
+            return df
+
+    def _ler(self, sync, intervalos: list, prioridade: int) -> list:
+        resposta = sync.executar(lambda: sync.obter_planilha().values_batch_get(intervalos), prioridade=prioridade)
+        return [intervalo.get("values", []) for intervalo in resposta.get("valueRanges", [])]
+
+    def _tem_alteracoes(self, sync) -> bool:
+        """
+        A aba Alteracoes é criada pela migração do esquema, na primeira gravação; os leitores
+        não a criam. A conferência usa a lista de abas já em cache na conexão.
+        """
+        try:
+            sync.obter_aba(ABA_ALTERACOES)
+            return True
+        except gspread.exceptions.WorksheetNotFound:
+            return False
+
+    def _recarregar(self, sync, prioridade: int):
+        intervalos = [_intervalo(self.aba, "A1", self.ultima_coluna)]
+        if self._tem_alteracoes(sync):
+            intervalos.append(_intervalo(ABA_ALTERACOES, "A1", "D"))
+        pedidos, alteracoes = (self._ler(sync, intervalos, prioridade) + [[]])[:2]
+        self._cabecalho = pedidos[0] if pedidos else []
+        self._linhas = pedidos[1:]
+        self._alteracoes_lidas = max(len(alteracoes) - 1, 0)
+        self._completo_em = time.monotonic()
+
+    def _atualizar(self, sync, prioridade: int) -> bool:
+        """Busca linhas novas e relê as alteradas; False se for preciso recarregar tudo"""
+        # Sem a aba Alteracoes não há como saber quais linhas antigas mudaram
+        if not self._tem_alteracoes(sync):
+            return False
+        ultima_linha = len(self._linhas) + 1
+        novas, alteracoes = self._ler(sync, [
+            _intervalo(self.aba, f"A{ultima_linha + 1}", self.ultima_coluna),
+            _intervalo(ABA_ALTERACOES, f"A{self._alteracoes_lidas + 2}", "D")
+        ], prioridade)
+
+        # Linhas antigas que mudaram (as recém-acrescentadas já vieram atualizadas)
+        alteradas = {}
+        for entrada in alteracoes:
+            try:
+                linha = int(entrada[1])
+            except (IndexError, ValueError):
+                continue
+            if 2 <= linha <= ultima_linha:
+                alteradas[linha] = str(entrada[0]).strip().upper()
+        if len(alteradas) > self.max_linhas_alteradas:
+            return False
+        if alteradas:
+            ordem = sorted(alteradas)
+            relidas = self._ler(sync, [
+                _intervalo(self.aba, f"A{linha}", f"{self.ultima_coluna}{linha}") for linha in ordem
+            ], prioridade)
+            for linha, valores in zip(ordem, relidas):
+                valores = valores[0] if valores else []
+                # A linha precisa continuar sendo o mesmo pedido
+                if not valores or str(valores[0]).strip().upper() != alteradas[linha]:
+                    return False
+                self._linhas[linha - 2] = valores
+
+        self._linhas.extend(novas)
+        self._alteracoes_lidas += len(alteracoes)
+        return True
+
+    def _montar(self) -> pd.DataFrame:
+        largura = len(self._cabecalho)
+        registros = [
+            gspread.utils.numericise_all((linha + [""] * largura)[:largura], default_blank="")
+            for linha in self._linhas
+        ]
+        return pd.DataFrame(registros, columns=self._cabecalho)
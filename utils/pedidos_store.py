@@ -0,0 +1,909 @@
+import functools
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Hashable, List, Optional
+
+import pandas as pd
+
+from utils.cache_colunar import ler_excel, gravar_excel
+from utils.file_lock import BloqueioLeituraEscrita
+
+# Ordem padrão das colunas de pedidos (mesma da aba 'Pedidos' do Google Sheets)
+COLUNAS_PEDIDOS = [
+    "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT",
+    "Semiacabado", "Pagoda", "Status", "Urgente", "Ultima_Atualizacao", "Responsavel_Atualizacao",
+    "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta",
+    "Solicitante", "Observacoes"
+]
+
+
+# Colunas do diário de transições de status
+COLUNAS_TRANSICOES = ["Numero_Pedido", "De", "Para", "Responsavel", "Quando"]
+
+# Pedidos que o Google Sheets recusou no envio (Tipo: 'criacao' ou 'alteracao')
+COLUNAS_QUARENTENA = ["Numero_Pedido", "Tipo", "Motivo", "Quando"]
+
+
+# Status válidos de um pedido (os demais valores são recusados pelo PedidoController)
+STATUS_PEDIDO = ("PENDENTE", "PROCESSO", "CONCLUÍDO")
+
+
+def campos_transicao(novo_status: str, responsavel: str, quando: str) -> dict:
+    """Campos do pedido atualizados por uma mudança de status"""
+    campos = {
+        'Status': novo_status,
+        'Ultima_Atualizacao': quando,
+        'Responsavel_Atualizacao': responsavel
+    }
+    if novo_status == "PROCESSO":
+        campos['Responsavel_Separacao'] = responsavel
+        campos['Data_Separacao'] = quando
+    elif novo_status == "CONCLUÍDO":
+        campos['Responsavel_Coleta'] = responsavel
+        campos['Data_Coleta'] = quando
+    return campos
+
+
+FORMATOS_DATA = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+def particao_mensal(valor) -> str:
+    """Partição (AAAA-MM) de um pedido a partir da sua Data; vazio se a data for inválida"""
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime("%Y-%m")
+    texto = str(valor or "").strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return ""
+
+
+def filtrar_periodo(df: pd.DataFrame, data_inicial: Optional[date] = None, data_final: Optional[date] = None) -> pd.DataFrame:
+    """Mantém os pedidos com Data entre data_inicial e data_final (inclusive)"""
+    if (data_inicial is None and data_final is None) or df.empty or 'Data' not in df.columns:
+        return df
+    datas = pd.to_datetime(df['Data'], errors='coerce').dt.date
+    mascara = pd.Series(True, index=df.index)
+    if data_inicial is not None:
+        mascara &= datas >= data_inicial
+    if data_final is not None:
+        mascara &= datas <= data_final
+    return df[mascara.fillna(False)]
+
+
+def _normalizar_valor(valor):
+    """Converte valores vindos do formulário/pandas para algo gravável no armazenamento"""
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime, pd.Timestamp)):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        if pd.isna(valor):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    # Tipos numpy (int64, bool_) não são aceitos pelo sqlite3
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+
+class PedidosStore(ABC):
+    """Interface comum dos backends de armazenamento de pedidos usados pelo PedidoController"""
+
+    @property
+    @abstractmethod
+    def caminho(self) -> str:
+        """Arquivo principal dos dados; identifica o armazenamento entre instâncias do processo"""
+
+    @abstractmethod
+    def carregar_pedidos(self, data_inicial: Optional[date] = None, data_final: Optional[date] = None) -> pd.DataFrame:
+        """Pedidos criados entre data_inicial e data_final (inclusive); sem datas, todos"""
+
+    @abstractmethod
+    def buscar_pedido(self, numero_pedido: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def inserir_pedidos(self, pedidos: List[dict], ignorar_existentes: bool = False) -> int:
+        ...
+
+    @abstractmethod
+    def atualizar_pedido(self, numero_pedido: str, campos: dict) -> Optional[str]:
+        """Atualiza os campos do pedido e retorna o Numero_Pedido gravado (None se não existir)"""
+
+    @abstractmethod
+    def registrar_transicao(self, numero_pedido: str, novo_status: str, responsavel: str, quando: str) -> Optional[str]:
+        """
+        Registra a mudança de status no diário de transições (de, para, quem, quando)
+        e retorna o Numero_Pedido gravado (None se não existir)
+        """
+
+    @abstractmethod
+    def historico_status(self, numero_pedido: str) -> pd.DataFrame:
+        """Transições de status do pedido, da mais antiga para a mais recente"""
+
+    @abstractmethod
+    def compactar(self) -> int:
+        """
+        Manutenção do armazenamento. No Excel incorpora ao .xlsx as transições do diário e
+        retorna quantas aplicou; no SQLite as transições já entram materializadas, então é um
+        checkpoint do WAL e retorna quantas páginas foram devolvidas ao banco principal
+        """
+
+    @abstractmethod
+    def ultimo_numero_pedido(self) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def revisao(self) -> Hashable:
+        """
+        Revisão dos dados, comparada por igualdade: muda a cada escrita. No SQLite é um
+        contador que cada transação de escrita incrementa em 1
+        """
+
+    def contar_status(self) -> pd.Series:
+        """Quantidade de pedidos por Status"""
+        df = self.carregar_pedidos()
+        if df.empty or 'Status' not in df.columns:
+            return pd.Series(dtype=int)
+        return df['Status'].value_counts()
+
+    def carregar_pendentes(self) -> pd.DataFrame:
+        df = self.carregar_pedidos()
+        if df.empty or 'Status' not in df.columns:
+            return df
+        return df[df['Status'] == 'PENDENTE']
+
+    @abstractmethod
+    def substituir_pedidos(self, pedidos: List[dict]):
+        """
+        Substitui todos os pedidos (restauração de backup). Os pedidos restaurados são
+        considerados já enviados ao Google Sheets.
+        """
+
+    @abstractmethod
+    def pendencias_sincronizacao(self):
+        """
+        Retorna (novos, alterados, marca): pedidos criados e pedidos alterados desde o último
+        envio confirmado ao Google Sheets. `novos` inclui a coluna Quantidade para a aba Itens;
+        `marca` deve ser repassada a confirmar_criacoes/confirmar_alteracoes após o envio.
+        """
+
+    @abstractmethod
+    def confirmar_criacoes(self, marca):
+        ...
+
+    @abstractmethod
+    def confirmar_alteracoes(self, marca):
+        ...
+
+    @abstractmethod
+    def colocar_em_quarentena(self, tipo: str, motivos: dict):
+        """
+        Guarda os pedidos recusados pelo Google Sheets ({Numero_Pedido: motivo}) para que o
+        cursor de sincronização avance sem eles; ficam fora da fila até serem reenviados
+        """
+
+    @abstractmethod
+    def quarentena_sincronizacao(self) -> pd.DataFrame:
+        """Pedidos em quarentena (COLUNAS_QUARENTENA), do mais antigo para o mais recente"""
+
+    @abstractmethod
+    def reenviar_quarentena(self, numeros: List[str]) -> int:
+        """Devolve os pedidos à fila de envio e retorna quantos saíram da quarentena"""
+
+    @abstractmethod
+    def descartar_quarentena(self, numeros: List[str]) -> int:
+        """Remove os pedidos da quarentena sem reenviá-los e retorna quantos foram removidos"""
+
+    def importar_excel(self, caminho: str) -> int:
+        """Importa os pedidos de um arquivo Excel, ignorando números já existentes"""
+        df = pd.read_excel(caminho)
+        if df.empty or 'Numero_Pedido' not in df.columns:
+            return 0
+        registros = [
+            {col: _normalizar_valor(valor) for col, valor in row.items()}
+            for row in df.to_dict(orient='records')
+        ]
+        return self.inserir_pedidos(registros, ignorar_existentes=True)
+
+    def exportar_excel(self, caminho: str):
+        """Exporta todos os pedidos para um arquivo Excel"""
+        self.carregar_pedidos().to_excel(caminho, index=False)
+
+
+class SQLitePedidosStore(PedidosStore):
+    """
+    Armazena os pedidos em um banco SQLite embutido (modo WAL).
+    Criar ou atualizar um pedido grava apenas a linha afetada, sem reescrever o histórico.
+
+    Os pedidos são particionados por mês da Data (coluna `_particao`, indexada) e a tabela
+    `particoes` é o manifesto das partições existentes; consultas por período leem apenas
+    as partições que se sobrepõem ao intervalo.
+    """
+
+    def __init__(self, caminho_banco: str, arquivo_excel_legado: Optional[str] = None):
+        self.caminho_banco = caminho_banco
+        self._criar_esquema()
+        # Na primeira execução, migra os pedidos do antigo pedidos.xlsx
+        if arquivo_excel_legado and os.path.exists(arquivo_excel_legado) and self._vazio():
+            self.importar_excel(arquivo_excel_legado)
+        # Pedidos já existentes foram enviados ao Google Sheets pela versão anterior
+        with self._conexao() as conn:
+            revisao = self._revisao_atual(conn)
+            conn.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('cursor_criacoes', ?)", (revisao,))
+            conn.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('cursor_alteracoes', ?)", (revisao,))
+
+    @property
+    def caminho(self) -> str:
+        return self.caminho_banco
+
+    @contextmanager
+    def _conexao(self):
+        conn = sqlite3.connect(self.caminho_banco, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA busy_timeout = 30000")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _criar_esquema(self):
+        colunas = ", ".join(
+            f'"{col}" TEXT NOT NULL UNIQUE' if col == "Numero_Pedido" else f'"{col}" DEFAULT \'\''
+            for col in COLUNAS_PEDIDOS
+        )
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS pedidos (id INTEGER PRIMARY KEY AUTOINCREMENT, {colunas})")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pedidos_lote "
+                "ON pedidos (Serial, Maquina, Posto, Coordenada, Status)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos (Status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_data ON pedidos (Data)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('revisao', 0)")
+            # Colunas internas: revisão da criação/última alteração (cursor de sincronização) e quantidade do item
+            existentes = {row["name"] for row in conn.execute("PRAGMA table_info(pedidos)")}
+            for coluna, definicao in (("_rev_criacao", "INTEGER DEFAULT 0"), ("_rev", "INTEGER DEFAULT 0"), ("_quantidade", "DEFAULT 1")):
+                if coluna not in existentes:
+                    conn.execute(f"ALTER TABLE pedidos ADD COLUMN {coluna} {definicao}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_rev_criacao ON pedidos (_rev_criacao)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_rev ON pedidos (_rev)")
+            # Diário de transições de status (somente inserções; o histórico nunca é sobrescrito)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transicoes (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "Numero_Pedido TEXT NOT NULL, De TEXT, Para TEXT, Responsavel TEXT, Quando TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_transicoes_pedido ON transicoes (Numero_Pedido)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quarentena (Numero_Pedido TEXT NOT NULL, Tipo TEXT NOT NULL, "
+                "Motivo TEXT, Quando TEXT, PRIMARY KEY (Numero_Pedido, Tipo))"
+            )
+            # Particionamento mensal: chave AAAA-MM de cada pedido e manifesto das partições
+            if "_particao" not in existentes:
+                conn.execute("ALTER TABLE pedidos ADD COLUMN _particao TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_particao ON pedidos (_particao, Data)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS particoes (particao TEXT PRIMARY KEY, linhas INTEGER NOT NULL, "
+                "data_min TEXT, data_max TEXT)"
+            )
+            sem_particao = conn.execute("SELECT id, Data FROM pedidos WHERE _particao IS NULL").fetchall()
+            if sem_particao:
+                conn.executemany(
+                    "UPDATE pedidos SET _particao = ? WHERE id = ?",
+                    [(particao_mensal(row["Data"]), row["id"]) for row in sem_particao]
+                )
+                self._atualizar_manifesto(conn)
+
+    def _atualizar_manifesto(self, conn, particoes: Optional[set] = None):
+        """Recalcula o manifesto das partições informadas (todas, se None)"""
+        if particoes is None:
+            conn.execute("DELETE FROM particoes")
+            filtro, parametros = "", ()
+        else:
+            particoes = sorted(particoes)
+            if not particoes:
+                return
+            marcadores = ", ".join("?" for _ in particoes)
+            conn.execute(f"DELETE FROM particoes WHERE particao IN ({marcadores})", particoes)
+            filtro, parametros = f"WHERE _particao IN ({marcadores})", particoes
+        conn.execute(
+            "INSERT INTO particoes (particao, linhas, data_min, data_max) "
+            f"SELECT _particao, COUNT(*), MIN(Data), MAX(Data) FROM pedidos {filtro} GROUP BY _particao",
+            parametros
+        )
+
+    def listar_particoes(self) -> pd.DataFrame:
+        """Manifesto das partições mensais (particao, linhas, data_min, data_max)"""
+        with self._conexao() as conn:
+            return pd.read_sql_query("SELECT * FROM particoes ORDER BY particao", conn)
+
+    def _revisao_atual(self, conn) -> int:
+        return conn.execute("SELECT valor FROM meta WHERE chave = 'revisao'").fetchone()["valor"]
+
+    def _incrementar_revisao(self, conn) -> int:
+        conn.execute("UPDATE meta SET valor = valor + 1 WHERE chave = 'revisao'")
+        return self._revisao_atual(conn)
+
+    def revisao(self) -> int:
+        with self._conexao() as conn:
+            return self._revisao_atual(conn)
+
+    def _vazio(self) -> bool:
+        with self._conexao() as conn:
+            return conn.execute("SELECT 1 FROM pedidos LIMIT 1").fetchone() is None
+
+    def carregar_pedidos(self, data_inicial: Optional[date] = None, data_final: Optional[date] = None) -> pd.DataFrame:
+        colunas = ", ".join(f'"{col}"' for col in COLUNAS_PEDIDOS)
+        with self._conexao() as conn:
+            if data_inicial is None and data_final is None:
+                return pd.read_sql_query(f"SELECT {colunas} FROM pedidos ORDER BY id", conn)
+            # Poda de partições: só as partições do manifesto que se sobrepõem ao período
+            particoes = [
+                row["particao"] for row in conn.execute(
+                    "SELECT particao FROM particoes WHERE particao != '' AND particao >= ? AND particao <= ?",
+                    (data_inicial.strftime("%Y-%m") if data_inicial else "", data_final.strftime("%Y-%m") if data_final else "9999-99")
+                )
+            ]
+            if not particoes:
+                return pd.DataFrame(columns=COLUNAS_PEDIDOS)
+            marcadores = ", ".join("?" for _ in particoes)
+            df = pd.read_sql_query(
+                f"SELECT {colunas} FROM pedidos WHERE _particao IN ({marcadores}) ORDER BY id", conn, params=particoes
+            )
+        # Nas partições das pontas, o filtro exato é por dia
+        return filtrar_periodo(df, data_inicial, data_final).reset_index(drop=True)
+
+    def buscar_pedido(self, numero_pedido: str) -> Optional[dict]:
+        with self._conexao() as conn:
+            row = self._localizar(conn, numero_pedido)
+            if row is None:
+                return None
+            return {col: row[col] for col in COLUNAS_PEDIDOS}
+
+    def _localizar(self, conn, numero_pedido: str):
+        """Busca pelo número exato (indexado) e, se não achar, tolera espaços e maiúsculas/minúsculas"""
+        row = conn.execute("SELECT * FROM pedidos WHERE Numero_Pedido = ?", (numero_pedido,)).fetchone()
+        if row is None:
+            row = conn.execute(
+                "SELECT * FROM pedidos WHERE UPPER(TRIM(Numero_Pedido)) = ?",
+                (str(numero_pedido).strip().upper(),)
+            ).fetchone()
+        return row
+
+    def _inserir(self, conn, pedidos: List[dict], revisao: int, ignorar_existentes: bool) -> int:
+        colunas = COLUNAS_PEDIDOS + ["_quantidade", "_rev_criacao", "_rev", "_particao"]
+        sql = "INSERT {} INTO pedidos ({}) VALUES ({})".format(
+            "OR IGNORE" if ignorar_existentes else "",
+            ", ".join(f'"{col}"' for col in colunas),
+            ", ".join("?" for _ in colunas)
+        )
+        valores = []
+        particoes = set()
+        for pedido in pedidos:
+            linha = tuple(_normalizar_valor(pedido.get(col, "")) for col in COLUNAS_PEDIDOS)
+            particao = particao_mensal(linha[COLUNAS_PEDIDOS.index("Data")])
+            particoes.add(particao)
+            valores.append(linha + (_normalizar_valor(pedido.get("Quantidade", 1)) or 1, revisao, revisao, particao))
+        cursor = conn.executemany(sql, valores)
+        self._atualizar_manifesto(conn, particoes)
+        return cursor.rowcount
+
+    def inserir_pedidos(self, pedidos: List[dict], ignorar_existentes: bool = False) -> int:
+        if not pedidos:
+            return 0
+        with self._conexao() as conn:
+            revisao = self._incrementar_revisao(conn)
+            return self._inserir(conn, pedidos, revisao, ignorar_existentes)
+
+    def atualizar_pedido(self, numero_pedido: str, campos: dict) -> Optional[str]:
+        campos = {col: _normalizar_valor(valor) for col, valor in campos.items() if col in COLUNAS_PEDIDOS}
+        with self._conexao() as conn:
+            row = self._localizar(conn, numero_pedido)
+            if row is None:
+                return None
+            if campos:
+                revisao = self._incrementar_revisao(conn)
+                if "Data" in campos:
+                    # Mudar a data move o pedido de partição
+                    campos["_particao"] = particao_mensal(campos["Data"])
+                atribuicoes = ", ".join(f'"{col}" = ?' for col in campos)
+                conn.execute(
+                    f"UPDATE pedidos SET {atribuicoes}, _rev = ? WHERE id = ?",
+                    (*campos.values(), revisao, row["id"])
+                )
+                if "_particao" in campos:
+                    self._atualizar_manifesto(conn, {row["_particao"], campos["_particao"]})
+            return row["Numero_Pedido"]
+
+    def registrar_transicao(self, numero_pedido: str, novo_status: str, responsavel: str, quando: str) -> Optional[str]:
+        # A entrada do diário e a linha materializada são gravadas na mesma transação,
+        # com custo constante (busca indexada), independente do tamanho do histórico
+        campos = campos_transicao(novo_status, responsavel, quando)
+        with self._conexao() as conn:
+            row = self._localizar(conn, numero_pedido)
+            if row is None:
+                return None
+            revisao = self._incrementar_revisao(conn)
+            conn.execute(
+                "INSERT INTO transicoes (Numero_Pedido, De, Para, Responsavel, Quando) VALUES (?, ?, ?, ?, ?)",
+                (row["Numero_Pedido"], row["Status"], novo_status, responsavel, quando)
+            )
+            atribuicoes = ", ".join(f'"{col}" = ?' for col in campos)
+            conn.execute(
+                f"UPDATE pedidos SET {atribuicoes}, _rev = ? WHERE id = ?",
+                (*campos.values(), revisao, row["id"])
+            )
+            return row["Numero_Pedido"]
+
+    def historico_status(self, numero_pedido: str) -> pd.DataFrame:
+        colunas = ", ".join(COLUNAS_TRANSICOES)
+        with self._conexao() as conn:
+            row = self._localizar(conn, numero_pedido)
+            numero = row["Numero_Pedido"] if row is not None else numero_pedido
+            return pd.read_sql_query(
+                f"SELECT {colunas} FROM transicoes WHERE Numero_Pedido = ? ORDER BY id", conn, params=(numero,)
+            )
+
+    def compactar(self) -> int:
+        # As transições já são materializadas na mesma transação em que entram no diário;
+        # resta só devolver ao banco principal as páginas acumuladas no WAL
+        with self._conexao() as conn:
+            # O TRUNCATE informa o WAL já zerado; a contagem vem do PASSIVE que o antecede
+            _, _, paginas = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return max(paginas, 0)
+
+    def contar_status(self) -> pd.Series:
+        with self._conexao() as conn:
+            linhas = conn.execute("SELECT Status, COUNT(*) AS total FROM pedidos GROUP BY Status").fetchall()
+        return pd.Series({row["Status"]: row["total"] for row in linhas}, dtype=int)
+
+    def carregar_pendentes(self) -> pd.DataFrame:
+        colunas = ", ".join(f'"{col}"' for col in COLUNAS_PEDIDOS)
+        with self._conexao() as conn:
+            return pd.read_sql_query(f"SELECT {colunas} FROM pedidos WHERE Status = 'PENDENTE' ORDER BY id", conn)
+
+    def ultimo_numero_pedido(self) -> Optional[str]:
+        with self._conexao() as conn:
+            row = conn.execute("SELECT Numero_Pedido FROM pedidos ORDER BY id DESC LIMIT 1").fetchone()
+            return row["Numero_Pedido"] if row else None
+
+    def _cursor(self, conn, chave: str) -> int:
+        return conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()["valor"]
+
+    def pendencias_sincronizacao(self):
+        colunas = ", ".join(f'"{col}"' for col in COLUNAS_PEDIDOS)
+        with self._conexao() as conn:
+            marca = self._revisao_atual(conn)
+            cursor_criacoes = self._cursor(conn, 'cursor_criacoes')
+            cursor_alteracoes = self._cursor(conn, 'cursor_alteracoes')
+            novos = pd.read_sql_query(
+                f"SELECT {colunas}, _quantidade AS Quantidade FROM pedidos "
+                "WHERE _rev_criacao > ? AND _rev_criacao <= ? ORDER BY id",
+                conn, params=(cursor_criacoes, marca)
+            )
+            # Só conta como alteração o pedido que já foi criado no Google Sheets
+            alterados = pd.read_sql_query(
+                f"SELECT {colunas} FROM pedidos "
+                "WHERE _rev > ? AND _rev <= ? AND _rev > _rev_criacao AND _rev_criacao <= ? ORDER BY id",
+                conn, params=(cursor_alteracoes, marca, cursor_criacoes)
+            )
+        return novos, alterados, marca
+
+    def confirmar_criacoes(self, marca):
+        with self._conexao() as conn:
+            conn.execute("UPDATE meta SET valor = MAX(valor, ?) WHERE chave = 'cursor_criacoes'", (marca,))
+
+    def confirmar_alteracoes(self, marca):
+        with self._conexao() as conn:
+            conn.execute("UPDATE meta SET valor = MAX(valor, ?) WHERE chave = 'cursor_alteracoes'", (marca,))
+
+    def colocar_em_quarentena(self, tipo: str, motivos: dict):
+        quando = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._conexao() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO quarentena (Numero_Pedido, Tipo, Motivo, Quando) VALUES (?, ?, ?, ?)",
+                [(str(numero), tipo, motivo, quando) for numero, motivo in motivos.items()]
+            )
+
+    def quarentena_sincronizacao(self) -> pd.DataFrame:
+        colunas = ", ".join(COLUNAS_QUARENTENA)
+        with self._conexao() as conn:
+            return pd.read_sql_query(f"SELECT {colunas} FROM quarentena ORDER BY Quando, Numero_Pedido", conn)
+
+    def reenviar_quarentena(self, numeros: List[str]) -> int:
+        if not numeros:
+            return 0
+        marcadores = ", ".join("?" for _ in numeros)
+        with self._conexao() as conn:
+            itens = conn.execute(
+                f"SELECT Numero_Pedido, Tipo FROM quarentena WHERE Numero_Pedido IN ({marcadores})", list(numeros)
+            ).fetchall()
+            if not itens:
+                return 0
+            # Uma revisão nova coloca o pedido de volta depois do cursor de sincronização
+            revisao = self._incrementar_revisao(conn)
+            for item in itens:
+                if item["Tipo"] == "criacao":
+                    conn.execute(
+                        "UPDATE pedidos SET _rev_criacao = ?, _rev = ? WHERE Numero_Pedido = ?",
+                        (revisao, revisao, item["Numero_Pedido"])
+                    )
+                else:
+                    conn.execute("UPDATE pedidos SET _rev = ? WHERE Numero_Pedido = ?", (revisao, item["Numero_Pedido"]))
+            conn.execute(f"DELETE FROM quarentena WHERE Numero_Pedido IN ({marcadores})", list(numeros))
+            return len(itens)
+
+    def descartar_quarentena(self, numeros: List[str]) -> int:
+        if not numeros:
+            return 0
+        marcadores = ", ".join("?" for _ in numeros)
+        with self._conexao() as conn:
+            return conn.execute(f"DELETE FROM quarentena WHERE Numero_Pedido IN ({marcadores})", list(numeros)).rowcount
+
+    def substituir_pedidos(self, pedidos: List[dict]):
+        with self._conexao() as conn:
+            revisao = self._incrementar_revisao(conn)
+            conn.execute("DELETE FROM pedidos")
+            conn.execute("DELETE FROM quarentena")
+            self._inserir(conn, pedidos, revisao, ignorar_existentes=True)
+            self._atualizar_manifesto(conn)
+            conn.execute(
+                "UPDATE meta SET valor = ? WHERE chave IN ('cursor_criacoes', 'cursor_alteracoes')",
+                (revisao,)
+            )
+
+
+class ExcelPedidosStore(PedidosStore):
+    """
+    Backend legado: todo o histórico em pedidos.xlsx, reescrito a cada alteração.
+    Mudanças de status só acrescentam uma linha em pedidos_transicoes.jsonl; as leituras
+    aplicam as transições pendentes e o .xlsx é reescrito a cada `limite_compactacao` transições.
+    """
+
+    def __init__(self, arquivo_pedidos: str, limite_compactacao: int = 50):
+        self.arquivo_pedidos = arquivo_pedidos
+        self.arquivo_transicoes = os.path.splitext(arquivo_pedidos)[0] + "_transicoes.jsonl"
+        self.limite_compactacao = limite_compactacao
+        # Cursor de sincronização: linhas já enviadas e pedidos alterados desde o último envio
+        self.arquivo_sync = os.path.splitext(arquivo_pedidos)[0] + "_sync.json"
+        if not os.path.exists(self.arquivo_sync):
+            self._salvar_sync({"criados": len(self.carregar_pedidos()), "alterados": []})
+
+    @property
+    def caminho(self) -> str:
+        return self.arquivo_pedidos
+
+    def _ler_sync(self) -> dict:
+        try:
+            with open(self.arquivo_sync, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {"criados": len(self.carregar_pedidos()), "alterados": []}
+
+    def _salvar_sync(self, estado: dict):
+        with open(self.arquivo_sync, 'w') as f:
+            json.dump(estado, f)
+
+    def _ler_transicoes(self, inicio: int = 0):
+        """Retorna (transições a partir do byte `inicio`, posição final lida)"""
+        if not os.path.exists(self.arquivo_transicoes):
+            return [], inicio
+        with open(self.arquivo_transicoes, 'r', encoding='utf-8') as f:
+            f.seek(inicio)
+            conteudo = f.read()
+        # Ignora uma linha final ainda incompleta (gravação em andamento por outro processo)
+        completo = conteudo[:conteudo.rfind("\n") + 1]
+        transicoes = [json.loads(linha) for linha in completo.splitlines() if linha.strip()]
+        return transicoes, inicio + len(completo.encode('utf-8'))
+
+    def _transicoes_aplicadas(self) -> int:
+        try:
+            with open(self.arquivo_sync, 'r') as f:
+                return json.load(f).get("transicoes_aplicadas", 0)
+        except (ValueError, OSError):
+            return 0
+
+    @staticmethod
+    def _aplicar_campos(df: pd.DataFrame, idx, campos: dict):
+        for col, valor in campos.items():
+            if col in df.columns and df[col].dtype != object:
+                df[col] = df[col].astype(object)
+            df.loc[idx, col] = _normalizar_valor(valor)
+
+    def _carregar(self):
+        """Pedidos do .xlsx com as transições pendentes aplicadas, e a posição do diário já incorporada"""
+        if os.path.exists(self.arquivo_pedidos):
+            df = ler_excel(self.arquivo_pedidos)
+        else:
+            df = pd.DataFrame(columns=COLUNAS_PEDIDOS)
+        transicoes, fim = self._ler_transicoes(self._transicoes_aplicadas())
+        if transicoes and not df.empty:
+            posicoes = {
+                str(numero).strip().upper(): idx
+                for idx, numero in df['Numero_Pedido'].items()
+            }
+            for transicao in transicoes:
+                idx = posicoes.get(str(transicao["Numero_Pedido"]).strip().upper())
+                if idx is not None:
+                    self._aplicar_campos(df, idx, campos_transicao(
+                        transicao["Para"], transicao["Responsavel"], transicao["Quando"]
+                    ))
+        return df, fim, len(transicoes)
+
+    def _gravar(self, df: pd.DataFrame, transicoes_aplicadas: int, quantidades: Optional[dict] = None):
+        """
+        Reescreve o .xlsx (já com as transições incorporadas até `transicoes_aplicadas`).
+        `quantidades` (Numero_Pedido → Quantidade dos pedidos inseridos) fica no estado de
+        sincronização até o pedido ser enviado à aba Itens, já que o .xlsx não tem essa coluna.
+        """
+        gravar_excel(df, self.arquivo_pedidos)
+        estado = self._ler_sync()
+        estado["transicoes_aplicadas"] = transicoes_aplicadas
+        if quantidades:
+            estado["quantidades"] = dict(estado.get("quantidades", {}), **quantidades)
+        self._salvar_sync(estado)
+
+    def carregar_pedidos(self, data_inicial: Optional[date] = None, data_final: Optional[date] = None) -> pd.DataFrame:
+        # Sem partições: o arquivo inteiro (já em cache colunar) é filtrado em memória
+        return filtrar_periodo(self._carregar()[0], data_inicial, data_final)
+
+    def _localizar(self, df: pd.DataFrame, numero_pedido: str) -> pd.DataFrame:
+        if df.empty or 'Numero_Pedido' not in df.columns:
+            return df
+        return df[df['Numero_Pedido'].astype(str).str.strip().str.upper() == str(numero_pedido).strip().upper()]
+
+    def buscar_pedido(self, numero_pedido: str) -> Optional[dict]:
+        encontrados = self._localizar(self.carregar_pedidos(), numero_pedido)
+        if encontrados.empty:
+            return None
+        return encontrados.iloc[0].to_dict()
+
+    def inserir_pedidos(self, pedidos: List[dict], ignorar_existentes: bool = False) -> int:
+        if not pedidos:
+            return 0
+        df, fim, _ = self._carregar()
+        novos = pd.DataFrame([{col: _normalizar_valor(p.get(col, "")) for col in COLUNAS_PEDIDOS} for p in pedidos])
+        if ignorar_existentes and 'Numero_Pedido' in df.columns:
+            novos = novos[~novos['Numero_Pedido'].isin(df['Numero_Pedido'])]
+        df = pd.concat([df, novos], ignore_index=True)
+        inseridos = set(novos['Numero_Pedido'].astype(str))
+        self._gravar(df, fim, quantidades={
+            str(p.get("Numero_Pedido", "")): _normalizar_valor(p.get("Quantidade", 1)) or 1
+            for p in pedidos if str(p.get("Numero_Pedido", "")) in inseridos
+        })
+        return len(novos)
+
+    def _marcar_alterado(self, numero: str):
+        estado = self._ler_sync()
+        if numero not in estado["alterados"]:
+            estado["alterados"].append(numero)
+            self._salvar_sync(estado)
+
+    def atualizar_pedido(self, numero_pedido: str, campos: dict) -> Optional[str]:
+        df, fim, _ = self._carregar()
+        encontrados = self._localizar(df, numero_pedido)
+        if encontrados.empty:
+            return None
+        idx = encontrados.index[0]
+        self._aplicar_campos(df, idx, campos)
+        self._gravar(df, fim)
+        numero = str(df.loc[idx, 'Numero_Pedido'])
+        self._marcar_alterado(numero)
+        return numero
+
+    def registrar_transicao(self, numero_pedido: str, novo_status: str, responsavel: str, quando: str) -> Optional[str]:
+        df, _, pendentes = self._carregar()
+        encontrados = self._localizar(df, numero_pedido)
+        if encontrados.empty:
+            return None
+        pedido = encontrados.iloc[0]
+        numero = str(pedido['Numero_Pedido'])
+        linha = json.dumps({
+            "Numero_Pedido": numero,
+            "De": _normalizar_valor(pedido.get('Status', "")),
+            "Para": novo_status,
+            "Responsavel": responsavel,
+            "Quando": quando
+        }, ensure_ascii=False)
+        with open(self.arquivo_transicoes, 'a', encoding='utf-8') as f:
+            f.write(linha + "\n")
+        self._marcar_alterado(numero)
+        if pendentes + 1 >= self.limite_compactacao:
+            self.compactar()
+        return numero
+
+    def historico_status(self, numero_pedido: str) -> pd.DataFrame:
+        transicoes, _ = self._ler_transicoes()
+        chave = str(numero_pedido).strip().upper()
+        return pd.DataFrame(
+            [t for t in transicoes if str(t["Numero_Pedido"]).strip().upper() == chave],
+            columns=COLUNAS_TRANSICOES
+        )
+
+    def compactar(self) -> int:
+        df, fim, pendentes = self._carregar()
+        if pendentes:
+            self._gravar(df, fim)
+        return pendentes
+
+    def ultimo_numero_pedido(self) -> Optional[str]:
+        df = self.carregar_pedidos()
+        if df.empty or 'Numero_Pedido' not in df.columns:
+            return None
+        numeros = df['Numero_Pedido'].dropna().tolist()
+        return numeros[-1] if numeros else None
+
+    def revisao(self) -> tuple:
+        # Sem contador próprio: (mtime_ns, tamanho) de cada arquivo; qualquer alteração no
+        # .xlsx ou no diário de transições muda a revisão
+        revisao = []
+        for caminho in (self.arquivo_pedidos, self.arquivo_transicoes):
+            try:
+                info = os.stat(caminho)
+                revisao.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                revisao.append(None)
+        return tuple(revisao)
+
+    def pendencias_sincronizacao(self):
+        df = self.carregar_pedidos()
+        estado = self._ler_sync()
+        novos = df.iloc[estado["criados"]:]
+        reenvios = estado.get("reenviar", [])
+        if reenvios and 'Numero_Pedido' in df.columns:
+            # Pedidos devolvidos da quarentena são enviados de novo como criação
+            anteriores = df.iloc[:estado["criados"]]
+            novos = pd.concat([anteriores[anteriores['Numero_Pedido'].astype(str).isin(reenvios)], novos])
+        novos = novos.copy()
+        quantidades = estado.get("quantidades", {})
+        novos["Quantidade"] = [
+            quantidades.get(str(numero), 1) for numero in novos.get("Numero_Pedido", pd.Series(dtype=object))
+        ]
+        alterados = df.iloc[:estado["criados"]]
+        if 'Numero_Pedido' in alterados.columns:
+            alterados = alterados[alterados['Numero_Pedido'].astype(str).isin(estado["alterados"])]
+        marca = {
+            "criados": len(df),
+            "alterados": list(estado["alterados"]),
+            "enviados": [str(numero) for numero in novos.get("Numero_Pedido", [])]
+        }
+        return novos, alterados, marca
+
+    def confirmar_criacoes(self, marca):
+        estado = self._ler_sync()
+        estado["criados"] = max(estado["criados"], marca["criados"])
+        enviados = set(marca.get("enviados", []))
+        estado["quantidades"] = {n: q for n, q in estado.get("quantidades", {}).items() if n not in enviados}
+        estado["reenviar"] = [n for n in estado.get("reenviar", []) if n not in enviados]
+        self._salvar_sync(estado)
+
+    def confirmar_alteracoes(self, marca):
+        estado = self._ler_sync()
+        estado["alterados"] = [n for n in estado["alterados"] if n not in marca["alterados"]]
+        self._salvar_sync(estado)
+
+    def colocar_em_quarentena(self, tipo: str, motivos: dict):
+        quando = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        estado = self._ler_sync()
+        chaves = {(str(numero), tipo) for numero in motivos}
+        quarentena = [q for q in estado.get("quarentena", []) if (q["Numero_Pedido"], q["Tipo"]) not in chaves]
+        quarentena.extend(
+            {"Numero_Pedido": str(numero), "Tipo": tipo, "Motivo": motivo, "Quando": quando}
+            for numero, motivo in motivos.items()
+        )
+        estado["quarentena"] = quarentena
+        self._salvar_sync(estado)
+
+    def quarentena_sincronizacao(self) -> pd.DataFrame:
+        return pd.DataFrame(self._ler_sync().get("quarentena", []), columns=COLUNAS_QUARENTENA)
+
+    def reenviar_quarentena(self, numeros: List[str]) -> int:
+        numeros = {str(numero) for numero in numeros}
+        estado = self._ler_sync()
+        itens = [q for q in estado.get("quarentena", []) if q["Numero_Pedido"] in numeros]
+        for item in itens:
+            fila = "reenviar" if item["Tipo"] == "criacao" else "alterados"
+            estado.setdefault(fila, [])
+            if item["Numero_Pedido"] not in estado[fila]:
+                estado[fila].append(item["Numero_Pedido"])
+        estado["quarentena"] = [q for q in estado.get("quarentena", []) if q["Numero_Pedido"] not in numeros]
+        self._salvar_sync(estado)
+        return len(itens)
+
+    def descartar_quarentena(self, numeros: List[str]) -> int:
+        numeros = {str(numero) for numero in numeros}
+        estado = self._ler_sync()
+        restantes = [q for q in estado.get("quarentena", []) if q["Numero_Pedido"] not in numeros]
+        removidos = len(estado.get("quarentena", [])) - len(restantes)
+        estado["quarentena"] = restantes
+        self._salvar_sync(estado)
+        return removidos
+
+    def substituir_pedidos(self, pedidos: List[dict]):
+        df = pd.DataFrame(
+            [{col: _normalizar_valor(p.get(col, "")) for col in COLUNAS_PEDIDOS} for p in pedidos],
+            columns=COLUNAS_PEDIDOS
+        )
+        gravar_excel(df, self.arquivo_pedidos)
+        # O estado restaurado já inclui as transições anteriores do diário
+        _, fim = self._ler_transicoes()
+        self._salvar_sync({"criados": len(df), "alterados": [], "transicoes_aplicadas": fim})
+
+    def importar_excel(self, caminho: str) -> int:
+        if os.path.abspath(caminho) == os.path.abspath(self.arquivo_pedidos):
+            return 0
+        return super().importar_excel(caminho)
+
+    def exportar_excel(self, caminho: str):
+        if os.path.abspath(caminho) != os.path.abspath(self.arquivo_pedidos):
+            super().exportar_excel(caminho)
+
+
+class PedidosStoreBloqueado:
+    """
+    Envolve um backend com bloqueio entre processos (sessões do Streamlit e app desktop):
+    leituras seguem em paralelo com bloqueio compartilhado e cada escrita tem uma seção
+    exclusiva curta. Os tempos de espera ficam em EstatisticasBloqueio.
+    """
+
+    LEITURAS = {
+        "carregar_pedidos", "buscar_pedido", "ultimo_numero_pedido",
+        "carregar_pendentes", "pendencias_sincronizacao", "historico_status", "exportar_excel",
+        "listar_particoes", "contar_status", "quarentena_sincronizacao"
+    }
+    ESCRITAS = {
+        "inserir_pedidos", "atualizar_pedido", "registrar_transicao", "compactar",
+        "confirmar_criacoes", "confirmar_alteracoes", "substituir_pedidos", "importar_excel",
+        "colocar_em_quarentena", "reenviar_quarentena", "descartar_quarentena"
+    }
+
+    def __init__(self, store: PedidosStore, caminho_bloqueio: str):
+        self.store = store
+        self.bloqueio = BloqueioLeituraEscrita(caminho_bloqueio)
+
+    def __getattr__(self, nome):
+        atributo = getattr(self.store, nome)
+        if nome in self.LEITURAS:
+            trava = self.bloqueio.leitura()
+        elif nome in self.ESCRITAS:
+            trava = self.bloqueio.escrita()
+        else:
+            # revisao() e atributos simples não precisam de bloqueio
+            return atributo
+
+        @functools.wraps(atributo)
+        def chamada(*args, **kwargs):
+            with trava:
+                return atributo(*args, **kwargs)
+        return chamada
+
+
+def criar_store(backend: str, diretorio_pedidos: str) -> PedidosStoreBloqueado:
+    """Cria o backend de armazenamento configurado ('sqlite' ou 'excel'), já com bloqueio de leitura/escrita"""
+    arquivo_excel = os.path.join(diretorio_pedidos, 'pedidos.xlsx')
+    caminho_bloqueio = os.path.join(diretorio_pedidos, 'pedidos.lock')
+    if backend not in ("sqlite", "excel"):
+        raise ValueError(f"Backend de armazenamento inválido: {backend}. Use 'sqlite' ou 'excel'.")
+    # A inicialização (esquema, migração do pedidos.xlsx, cursores) acontece em seção exclusiva
+    with BloqueioLeituraEscrita(caminho_bloqueio).escrita():
+        if backend == "excel":
+            store = ExcelPedidosStore(arquivo_excel)
+        else:
+            store = SQLitePedidosStore(os.path.join(diretorio_pedidos, 'pedidos.db'), arquivo_excel_legado=arquivo_excel)
+    return PedidosStoreBloqueado(store, caminho_bloqueio)
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from utils.file_lock import FileLock
+
+# Contador único dos números de pedido, relativo à pasta do app (o mesmo para o app web,
+# o controlador e os apps de leitura local)
+ARQUIVO_SEQUENCIA = os.path.join("pedidos", "sequencia_pedidos.json")
+
+
+class ReservaIndisponivel(RuntimeError):
+    """Não há números reservados no Google Sheets e não foi possível reservar um novo bloco"""
+
+
+class SequenciaPedidos:
+    """
+    Alocador persistente dos números de pedido (REQ-XXX).
+
+    O último número emitido fica em um pequeno arquivo JSON protegido por bloqueio entre
+    processos, então cada número custa uma leitura e uma gravação de poucos bytes,
+    independente do tamanho do histórico. Opcionalmente, os números são retirados de
+    blocos reservados no Google Sheets, para que o app web e o desktop não colidam: nesse
+    modo nenhum número é emitido fora de um bloco reservado (sem conexão, a reserva falha
+    com ReservaIndisponivel em vez de numerar por conta própria). Com `antecipar`, o bloco
+    seguinte é reservado em segundo plano quando o atual está no fim, então uma queda de
+    conexão só impede novos pedidos depois de esgotar os dois blocos.
+    """
+
+    def __init__(
+        self,
+        caminho_arquivo: str,
+        prefixo: str = "REQ-",
+        semente: Optional[Callable[[], int]] = None,
+        reservar_bloco: Optional[Callable[[int], Tuple[int, int]]] = None,
+        tamanho_bloco: int = 20,
+        antecipar: int = 0
+    ):
+        """
+        Args:
+            caminho_arquivo: Arquivo JSON onde o contador é persistido
+            prefixo: Prefixo dos números de pedido
+            semente: Retorna o maior número já usado; chamada só quando o contador ainda não existe
+            reservar_bloco: Reserva `n` números no Google Sheets e retorna (primeiro, último)
+            tamanho_bloco: Quantidade de números reservados por vez no Google Sheets
+            antecipar: Restando esta quantidade no bloco, o próximo é reservado em segundo plano (0 = não antecipa)
+        """
+        self.caminho_arquivo = caminho_arquivo
+        self.prefixo = prefixo
+        self.semente = semente
+        self.reservar_bloco = reservar_bloco
+        self.tamanho_bloco = tamanho_bloco
+        self.antecipar = antecipar
+        self._lock = FileLock(caminho_arquivo + ".lock")
+        self._antecipacao = None
+        self._guarda_antecipacao = threading.Lock()
+
+    def formatar(self, numero: int) -> str:
+        return f"{self.prefixo}{numero:03d}"
+
+    def _ler_estado(self) -> dict:
+        if os.path.exists(self.caminho_arquivo):
+            try:
+                with open(self.caminho_arquivo, 'r') as f:
+                    return json.load(f)
+            except (ValueError, OSError):
+                pass
+        ultimo = 0
+        if self.semente:
+            try:
+                ultimo = int(self.semente() or 0)
+            except Exception:
+                ultimo = 0
+        return {"proximo": ultimo + 1, "limite": None}
+
+    def _salvar_estado(self, estado: dict):
+        # Grava em arquivo temporário e substitui, para nunca deixar o contador corrompido
+        temporario = self.caminho_arquivo + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(estado, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_arquivo)
+
+    def _garantir_bloco(self, estado: dict, quantidade: int):
+        """Reserva um novo bloco no Google Sheets quando o bloco local não comporta `quantidade`"""
+        if not self.reservar_bloco:
+            estado["limite"] = None
+            return
+        limite = estado.get("limite")
+        if limite is not None and estado["proximo"] + quantidade - 1 <= limite:
+            return
+        reserva = estado.get("reserva")
+        if reserva and reserva[1] - reserva[0] + 1 >= quantidade:
+            # Bloco já reservado em segundo plano: não precisa de conexão agora
+            estado["proximo"], estado["limite"] = reserva
+            del estado["reserva"]
+            return
+        try:
+            primeiro, ultimo = self.reservar_bloco(max(self.tamanho_bloco, quantidade))
+        except Exception as e:
+            raise ReservaIndisponivel(f"Não foi possível reservar números de pedido no Google Sheets: {str(e)}") from e
+        # O restante do bloco anterior (menor que `quantidade`) é descartado: o novo é exclusivo deste cliente
+        estado["proximo"] = primeiro
+        estado["limite"] = ultimo
+
+    def reservar(self, quantidade: int) -> List[int]:
+        """Reserva `quantidade` números consecutivos de forma atômica"""
+        if quantidade <= 0:
+            return []
+        with self._lock:
+            estado = self._ler_estado()
+            self._garantir_bloco(estado, quantidade)
+            primeiro = estado["proximo"]
+            estado["proximo"] = primeiro + quantidade
+            self._salvar_estado(estado)
+            no_fim = self._precisa_antecipar(estado)
+        if no_fim:
+            self._antecipar_em_segundo_plano()
+        return list(range(primeiro, primeiro + quantidade))
+
+    def _precisa_antecipar(self, estado: dict) -> bool:
+        limite = estado.get("limite")
+        return bool(self.reservar_bloco and self.antecipar and limite is not None
+                    and not estado.get("reserva") and limite - estado["proximo"] + 1 <= self.antecipar)
+
+    def _antecipar_em_segundo_plano(self):
+        """Reserva o próximo bloco em uma thread, uma por vez neste processo"""
+        with self._guarda_antecipacao:
+            if self._antecipacao is not None and self._antecipacao.is_alive():
+                return
+            self._antecipacao = threading.Thread(target=self._antecipar, name="reservar-numeros", daemon=True)
+            self._antecipacao.start()
+
+    def _antecipar(self):
+        try:
+            bloco = self.reservar_bloco(self.tamanho_bloco)
+        except Exception:
+            # Sem conexão: a próxima emissão tenta de novo
+            return
+        with self._lock:
+            estado = self._ler_estado()
+            if estado.get("reserva"):
+                # Outro processo do app já antecipou; este bloco só deixa uma lacuna na numeração
+                return
+            estado["reserva"] = list(bloco)
+            self._salvar_estado(estado)
+
+    def aguardar_antecipacao(self, timeout: float = None):
+        """Espera a reserva em segundo plano em andamento, se houver"""
+        if self._antecipacao is not None:
+            self._antecipacao.join(timeout)
+
+    def proximo_numero(self) -> int:
+        return self.reservar(1)[0]
+
+    def proximo(self) -> str:
+        """Retorna o próximo número de pedido já formatado (ex.: REQ-056)"""
+        return self.formatar(self.proximo_numero())
@@ -0,0 +1,161 @@
+import threading
+import time
+from typing import Callable
+
+import gspread
+
+from utils.cota_sheets import CotaSheets, PRIORIDADE_ESCRITA
+
+
+def precisa_reconectar(erro: Exception) -> bool:
+    """Erros que indicam credencial expirada ou handle obsoleto (aba/planilha removida ou renomeada)"""
+    if isinstance(erro, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return True
+    if isinstance(erro, gspread.exceptions.APIError):
+        status = getattr(getattr(erro, "response", None), "status_code", None)
+        if status in (401, 404):
+            return True
+        # Aba renomeada: o intervalo 'Titulo!A1' deixa de existir
+        return status == 400 and "Unable to parse range" in str(erro)
+    return False
+
+
+class ConexaoSheets:
+    """
+    Cache do cliente gspread e dos handles da planilha e das abas, compartilhado por todas
+    as sessões do processo. Abrir a planilha e listar as abas custa uma chamada de metadados
+    cada, feita no máximo uma vez por `ttl`; em erro de autenticação ou de recurso não
+    encontrado os handles são descartados e a operação é repetida uma vez.
+    Todas as chamadas passam pela cota (CotaSheets) da credencial.
+    """
+
+    _instancias = {}
+    _instancias_guard = threading.Lock()
+
+    @classmethod
+    def obter(cls, chave: str, autorizar: Callable[[], gspread.Client], url: str, ttl: float = 600) -> "ConexaoSheets":
+        """Conexão compartilhada para as credenciais `chave` e a planilha `url`"""
+        with cls._instancias_guard:
+            conexao = cls._instancias.get((chave, url))
+            if conexao is None:
+                conexao = cls(autorizar, url, ttl, cota=CotaSheets.obter(chave))
+                cls._instancias[(chave, url)] = conexao
+            return conexao
+
+    def __init__(self, autorizar: Callable[[], gspread.Client], url: str, ttl: float = 600, cota: CotaSheets = None):
+        self._autorizar = autorizar
+        self.url = url
+        self.ttl = ttl
+        self.cota = cota or CotaSheets()
+        # _lock protege só o estado em memória; a espera pela cota e as chamadas à API ficam fora
+        # dele, para que as sessões com handles válidos não esperem atrás de uma chamada limitada
+        self._lock = threading.RLock()
+        self._abertura = threading.Lock()
+        self._criacao = threading.Lock()
+        self._client = None
+        self._planilha = None
+        self._abas = None
+        self._metadados = {}
+        self._aberta_em = None
+        self._geracao = 0
+
+    @property
+    def client(self) -> gspread.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = self._autorizar()
+            return self._client
+
+    def invalidar(self, reautorizar: bool = False):
+        """Descarta os handles (e o cliente, se `reautorizar`) para a próxima chamada reabrir"""
+        with self._lock:
+            self._planilha = None
+            self._abas = None
+            self._metadados = {}
+            self._aberta_em = None
+            self._geracao += 1
+            if reautorizar:
+                self._client = None
+
+    def planilha(self) -> gspread.Spreadsheet:
+        with self._lock:
+            atual = self._planilha
+            if atual is not None and time.monotonic() - self._aberta_em <= self.ttl:
+                return atual
+        # Um único thread reabre a planilha; com o handle apenas expirado, os demais seguem com ele
+        if not self._abertura.acquire(blocking=atual is None):
+            return atual
+        try:
+            with self._lock:
+                if self._planilha is not None and time.monotonic() - self._aberta_em <= self.ttl:
+                    return self._planilha
+                geracao = self._geracao
+            self.cota.consumir()
+            planilha = self.client.open_by_url(self.url)
+            with self._lock:
+                # Invalidada durante a abertura: o handle serve a esta chamada, mas não fica em cache
+                if self._geracao == geracao:
+                    self._planilha = planilha
+                    self._abas = None
+                    self._metadados = {}
+                    self._aberta_em = time.monotonic()
+            return planilha
+        finally:
+            self._abertura.release()
+
+    def _listar_abas(self, planilha: gspread.Spreadsheet) -> dict:
+        """Abas da planilha (título → handle), listadas uma vez por abertura"""
+        with self._lock:
+            if self._planilha is planilha and self._abas is not None:
+                return self._abas
+        self.cota.consumir()
+        abas = {ws.title: ws for ws in planilha.worksheets()}
+        with self._lock:
+            if self._planilha is not planilha:
+                return abas
+            if self._abas is None:
+                self._abas = abas
+            return self._abas
+
+    def aba(self, nome: str, criar: bool = False, rows: int = 100, cols: int = 20) -> gspread.Worksheet:
+        """Handle da aba `nome`; com `criar=True`, cria a aba se ela não existir"""
+        planilha = self.planilha()
+        abas = self._listar_abas(planilha)
+        with self._lock:
+            aba = abas.get(nome)
+        if aba is not None:
+            return aba
+        if not criar:
+            raise gspread.exceptions.WorksheetNotFound(nome)
+        # Criações em série: duas sessões não tentam criar a mesma aba
+        with self._criacao:
+            with self._lock:
+                aba = abas.get(nome)
+            if aba is None:
+                self.cota.consumir("escrita", PRIORIDADE_ESCRITA)
+                aba = planilha.add_worksheet(title=nome, rows=rows, cols=cols)
+                with self._lock:
+                    abas[nome] = aba
+            return aba
+
+    def metadados(self, nome: str) -> dict:
+        """
+        Metadados da aba `nome` já conhecidos localmente (ex.: cabeçalho conferido, última
+        linha escrita). São descartados junto com os handles, a cada `ttl` ou reconexão.
+        """
+        with self._lock:
+            return self._metadados.setdefault(nome, {})
+
+    def executar(self, operacao: Callable, escrita: bool = False, prioridade: int = None, repetivel: bool = True):
+        """
+        Executa `operacao()` (que deve obter os handles por esta conexão) dentro da cota.
+        Se falhar por autenticação ou handle obsoleto, reconecta e repete uma única vez.
+        """
+        try:
+            return self.cota.executar(operacao, escrita=escrita, prioridade=prioridade, repetivel=repetivel)
+        except Exception as e:
+            if not precisa_reconectar(e):
+                raise
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            self.invalidar(reautorizar=(status == 401))
+            return self.cota.executar(operacao, escrita=escrita, prioridade=prioridade, repetivel=repetivel)
@@ -1,5 +1,9 @@
 import os
 import json
+import time
+import hashlib
+import socket
+from datetime import datetime
 import pandas as pd
 try:
     import streamlit as st
@@ -8,6 +12,119 @@ except ImportError:
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import re
+from utils.indice_pendentes import IndicePendentes
+from utils.pedidos_store import campos_transicao
+from utils.sheets_conexao import ConexaoSheets
+from utils.cota_sheets import CotaExcedida, CotaSheets, PRIORIDADE_ESCRITA, PRIORIDADE_LEITURA, PRIORIDADE_SEGUNDO_PLANO
+from utils.leitor_incremental_sheets import LeitorIncremental, ABA_ALTERACOES, COLUNAS_ALTERACOES
+from utils.indice_linhas_sheets import IndiceLinhasSheets, normalizar_numero
+from utils.cache_leituras_sheets import CacheLeiturasSheets
+from utils.importacao_sheets import texto_celula, normalizar_linhas, planejar_substituicao, trechos_alterados
+from utils.file_lock import FileLock
+from utils.copia_local_sheets import CopiaLocalSheets
+from utils.sequencia_pedidos import ARQUIVO_SEQUENCIA, ReservaIndisponivel, SequenciaPedidos
+
+# Versão do esquema das abas (cabeçalho/formatação); incrementar ao mudar CABECALHOS_ESQUEMA ou a formatação
+VERSAO_ESQUEMA = 1
+ABA_META = "_meta"
+# Aba 'Controle': uma linha por reserva de números de pedido (ver reservar_bloco_numeros)
+COLUNAS_CONTROLE = ["Tipo", "Valor", "Cliente", "Reservado_Em"]
+# Validade (segundos) das leituras em cache por aba; catálogos só mudam por importação
+TTL_LEITURAS = {"paco": 600, "Projeto": 600, "layout": 600}
+TTL_LEITURAS_PADRAO = 60
+# Idade máxima (segundos) dos pedidos servidos sem esperar o Google (config.json: max_desatualizacao_s)
+MAX_DESATUALIZACAO_PADRAO = 300
+# Consulta dos totais do dashboard: só a coluna Status da aba Pedidos
+CONSULTA_STATUS = {"Pedidos": ["Status"]}
+# Cópia de trabalho usada ao importar uma aba inteira (ver _substituir_aba)
+SUFIXO_IMPORTACAO = "__importacao"
+# Versão do conteúdo de cada aba importada (Aba, Versao, Importado_Em), gravada junto com a troca da aba
+ABA_VERSOES = "_versoes"
+# Abas que só mudam por importação: antes de baixá-las, a versão é conferida com a cópia local
+ABAS_VERSIONADAS = ("paco", "Projeto", "layout")
+# Idade máxima (segundos) da cópia local reaproveitada, para pegar edições feitas direto na planilha
+IDADE_MAXIMA_COPIA = 6 * 3600
+CABECALHOS_ESQUEMA = {
+    "Pedidos": [
+        "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente", "Ultima_Atualizacao", "Responsavel_Atualizacao", "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta", "Solicitante", "Observacoes"
+    ],
+    ABA_ALTERACOES: COLUNAS_ALTERACOES
+}
+
+
+def _linha_celulas(valores: list) -> dict:
+    """Linha no formato do updateCells (batch_update)"""
+    return {"values": [
+        {"userEnteredValue": {"numberValue": v} if isinstance(v, (int, float)) else {"stringValue": str(v)}}
+        for v in valores
+    ]}
+
+
+def _requisicoes_formatacao(sheet_id: int) -> list:
+    """Formatação do cabeçalho e congelamento da linha 1 (requisições do batch_update)"""
+    return [
+        {"repeatCell": {
+            "range": {"sheetId": sheet_id, "startRowIndex": 0, "endRowIndex": 1, "startColumnIndex": 0, "endColumnIndex": 26},
+            "cell": {"userEnteredFormat": {
+                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
+                "horizontalAlignment": "CENTER",
+                "textFormat": {"bold": True}
+            }},
+            "fields": "userEnteredFormat(backgroundColor,horizontalAlignment,textFormat)"
+        }},
+        {"updateSheetProperties": {
+            "properties": {"sheetId": sheet_id, "gridProperties": {"frozenRowCount": 1}},
+            "fields": "gridProperties.frozenRowCount"
+        }}
+    ]
+
+
+def _intervalo_aba(aba: str, celulas: str = None) -> str:
+    """Intervalo A1 da aba (inteira, se `celulas` não for informado)"""
+    titulo = "'" + aba.replace("'", "''") + "'"
+    return f"{titulo}!{celulas}" if celulas else titulo
+
+
+def _contador_inicial(linhas: list):
+    """
+    Ponto de partida do contador da aba 'Controle': o valor de B1 no formato antigo
+    (Ultimo_Numero_Reservado) ou a primeira linha BASE; None se ainda não houver nenhum.
+    """
+    for indice, linha in enumerate(linhas):
+        tipo = str(linha[0]).strip().upper() if linha else ""
+        if (tipo == "BASE" or (indice == 0 and tipo == "ULTIMO_NUMERO_RESERVADO")) and len(linha) > 1 \
+                and str(linha[1]).strip().isdigit():
+            return int(linha[1])
+    return None
+
+
+def blocos_reservados(linhas: list, contador: int = 0, primeira_linha: int = 1) -> list:
+    """
+    (primeiro, último) de cada linha BLOCO da aba 'Controle', na ordem das linhas. O contador
+    começa em B1 (formato antigo), cada linha BASE o eleva ao valor dela (nunca o reduz) e
+    cada BLOCO reserva os `Valor` números seguintes. Outras linhas (cabeçalhos) são ignoradas.
+    `contador` e `primeira_linha` continuam a soma a partir de uma linha já conhecida.
+    """
+    blocos = []
+    for indice, linha in enumerate(linhas, start=primeira_linha):
+        tipo = str(linha[0]).strip().upper() if linha else ""
+        valor = str(linha[1]).strip() if len(linha) > 1 else ""
+        if not valor.isdigit():
+            continue
+        if tipo == "BASE" or (indice == 1 and tipo == "ULTIMO_NUMERO_RESERVADO"):
+            contador = max(contador, int(valor))
+        elif tipo == "BLOCO":
+            blocos.append((contador + 1, contador + int(valor)))
+            contador += int(valor)
+    return blocos
+
+
+def _sem_vazios_finais(linha: list) -> list:
+    """Linha sem as células vazias do fim (get_all_values completa as linhas até a maior largura)"""
+    linha = [texto_celula(celula) for celula in linha]
+    while linha and linha[-1] == "":
+        linha.pop()
+    return linha
 
 class SheetsPedidosSync:
     def __init__(self, enable_sheets=True, config_file="config.json"):
@@ -15,6 +132,9 @@ class SheetsPedidosSync:
         self.SPREADSHEET_URL = None
         self.client = None
         self.enable_sheets = enable_sheets
+        self._indice_pendentes = None
+        self._chave_credenciais = None
+        self._autorizar = None
         self.load_config()
         if self.enable_sheets:
             self.initialize_client()
@@ -68,20 +188,14 @@ class SheetsPedidosSync:
                         st.warning('Credenciais do Google Sheets inválidas: falta o campo "client_email".')
                     self.client = None
                     return
-                self.client = gspread.authorize(ServiceAccountCredentials.from_json_keyfile_dict(
-                    creds,
-                    scopes=['https://spreadsheets.google.com/feeds', 
-                           'https://www.googleapis.com/auth/drive']
-                ))
-                # Testar conexão
-                try:
-                    self.client.open_by_url(self.SPREADSHEET_URL)
-                except Exception as e:
-                    if st:
-                        st.warning(f"Erro ao acessar planilha: {str(e)}")
-                    else:
-                        print(f"Erro ao acessar planilha: {str(e)}")
-                    self.client = None
+                self.conectar(
+                    f"{creds.get('client_email')}:{creds.get('private_key_id', '')}",
+                    lambda: gspread.authorize(ServiceAccountCredentials.from_json_keyfile_dict(
+                        creds,
+                        scopes=['https://spreadsheets.google.com/feeds', 
+                               'https://www.googleapis.com/auth/drive']
+                    ))
+                )
             else:
                 if st:
                     st.error('Credenciais do Google Sheets não encontradas no config.json.')
@@ -95,12 +209,280 @@ class SheetsPedidosSync:
                 print(f"Erro ao inicializar cliente do Google Sheets: {str(e)}")
             self.client = None
 
-    def _get_or_create_worksheet(self, sheet, name, rows=100, cols=20):
-        """Obtém ou cria uma aba na planilha"""
+    def conectar(self, chave_credenciais: str, autorizar):
+        """
+        Usa o cliente criado por `autorizar()` (gspread.authorize, ou o ClienteFalso de
+        utils.gspread_fake para testes e benchmarks sem rede). Cliente e handles ficam em cache
+        no processo, compartilhados entre as sessões com a mesma `chave_credenciais`.
+        """
+        self._chave_credenciais = chave_credenciais
+        self._autorizar = autorizar
+        # A cota do Google é da credencial no projeto: cada processo usa só a sua parte
+        CotaSheets.obter(chave_credenciais, processos=int(self.config.get('processos_cota', 1)))
+        self.client = self._conexao().client
+        # Testar conexão (a planilha aberta fica em cache para as próximas operações)
         try:
-            return sheet.worksheet(name)
-        except gspread.exceptions.WorksheetNotFound:
-            return sheet.add_worksheet(title=name, rows=rows, cols=cols)
+            self._conexao().planilha()
+        except Exception as e:
+            if st:
+                st.warning(f"Erro ao acessar planilha: {str(e)}")
+            else:
+                print(f"Erro ao acessar planilha: {str(e)}")
+            self.client = None
+
+    def _conexao(self) -> ConexaoSheets:
+        return ConexaoSheets.obter(self._chave_credenciais, self._autorizar, self.SPREADSHEET_URL)
+
+    def obter_planilha(self) -> gspread.Spreadsheet:
+        """Handle (em cache) da planilha configurada"""
+        return self._conexao().planilha()
+
+    def obter_aba(self, nome: str, criar: bool = False, rows: int = 100, cols: int = 20) -> gspread.Worksheet:
+        """Handle (em cache) da aba `nome`; com `criar=True`, cria a aba se não existir"""
+        return self._conexao().aba(nome, criar=criar, rows=rows, cols=cols)
+
+    def executar(self, operacao, escrita: bool = False, prioridade: int = None, repetivel: bool = True):
+        """
+        Executa uma chamada ao Google Sheets dentro da cota (fila por prioridade, repetição em
+        429/5xx) e reconectando uma vez em erro de autenticação ou aba/planilha não encontrada.
+        Use `repetivel=False` em escritas que não podem ser repetidas após erro do servidor (append).
+        """
+        return self._conexao().executar(operacao, escrita=escrita, prioridade=prioridade, repetivel=repetivel)
+
+    def ler_registros(self, nome: str, prioridade: int = PRIORIDADE_LEITURA) -> list:
+        """
+        Todos os registros da aba `nome` (get_all_records), pelo cache compartilhado entre as
+        sessões: no máximo uma leitura da aba por TTL_LEITURAS, qualquer que seja o número de usuários.
+        As ABAS_VERSIONADAS só são baixadas quando a versão delas mudou desde a cópia local.
+        """
+        if nome in ABAS_VERSIONADAS:
+            carregar = lambda: self._ler_registros_versionados(nome, prioridade)
+        else:
+            carregar = lambda: self.executar(lambda: self.obter_aba(nome).get_all_records(), prioridade=prioridade)
+        registros = self._cache_leituras().ler(nome, carregar, ttl=TTL_LEITURAS.get(nome, TTL_LEITURAS_PADRAO))
+        return list(registros)
+
+    def _ler_registros_versionados(self, nome: str, prioridade: int) -> list:
+        """
+        Registros da aba `nome` a partir da cópia local quando a versão registrada na aba _versoes
+        é a mesma da cópia (uma leitura de poucas células); senão baixa a aba e atualiza a cópia.
+        """
+        # A versão é lida antes da aba: uma importação no meio do caminho só força um novo download
+        versao = self._versoes_conteudo(prioridade).get(nome, [None, None])[0]
+        copia = self._copia_local(nome)
+        if versao:
+            dados = copia.ler()
+            if dados and dados["versao"] == versao and time.time() - dados.get("salva_em", 0) < IDADE_MAXIMA_COPIA:
+                return dados["registros"]
+
+        registros = self.executar(lambda: self.obter_aba(nome).get_all_records(), prioridade=prioridade)
+        if versao:
+            try:
+                copia.salvar(versao, registros)
+            except OSError:
+                # A cópia é só otimização: sem ela, a próxima leitura baixa a aba de novo
+                pass
+        return registros
+
+    def _versoes_conteudo(self, prioridade: int = PRIORIDADE_LEITURA) -> dict:
+        """Aba → [versão, importado em] registrados na aba _versoes (vazio se ela não existir)"""
+        aba = self._aba_existente(ABA_VERSOES)
+        if aba is None:
+            return {}
+        valores = self.executar(lambda: aba.get_values("A2:C"), prioridade=prioridade)
+        return {
+            linha[0]: (list(linha[1:3]) + [""] * 2)[:2]
+            for linha in valores if linha and linha[0] and len(linha) > 1 and linha[1]
+        }
+
+    def _copia_local(self, nome: str) -> CopiaLocalSheets:
+        """Cópia em disco da aba `nome`, ao lado do config"""
+        diretorio = os.path.dirname(os.path.abspath(self.config_file))
+        return CopiaLocalSheets(os.path.join(diretorio, f"copia_sheets_{nome}.json"), self.SPREADSHEET_URL)
+
+    def ler_abas(self, consultas: dict, prioridade: int = PRIORIDADE_LEITURA, max_desatualizacao: float = None) -> dict:
+        """
+        Lê várias abas em uma única chamada values:batchGet. `consultas` mapeia aba → colunas
+        desejadas (nomes do cabeçalho, sem diferenciar maiúsculas; None = todas); só essas
+        colunas são baixadas. Retorna aba → DataFrame com os valores tipados como em
+        get_all_records. O resultado passa pelo cache compartilhado entre as sessões; com
+        `max_desatualizacao` (segundos), o resultado expirado é servido na hora e relido em
+        segundo plano (ver situacao_consulta).
+        """
+        consultas = self._normalizar_consultas(consultas)
+        resultado = self._cache_leituras().ler(
+            self._chave_consulta(consultas),
+            lambda: self._buscar_abas(consultas, prioridade),
+            ttl=min(TTL_LEITURAS.get(aba, TTL_LEITURAS_PADRAO) for aba in consultas),
+            abas=consultas,
+            max_desatualizacao=max_desatualizacao,
+            revalidar=lambda: self._buscar_abas(consultas, PRIORIDADE_SEGUNDO_PLANO)
+        )
+        return {aba: df.copy() for aba, df in resultado.items()}
+
+    @staticmethod
+    def _normalizar_consultas(consultas: dict) -> dict:
+        return {aba: (tuple(colunas) if colunas else None) for aba, colunas in consultas.items()}
+
+    @staticmethod
+    def _chave_consulta(consultas: dict) -> tuple:
+        return ("consulta",) + tuple(sorted(consultas.items(), key=lambda item: item[0]))
+
+    def situacao_consulta(self, consultas: dict) -> dict:
+        """Idade do resultado em cache de `consultas` (segundos), releitura em andamento e último erro"""
+        return self._cache_leituras().situacao(self._chave_consulta(self._normalizar_consultas(consultas)))
+
+    def _cabecalhos(self, abas: list, prioridade: int) -> dict:
+        """Cabeçalho (linha 1) de cada aba; os desconhecidos são lidos juntos em um único batchGet"""
+        faltando = [aba for aba in abas if self._conexao().metadados(aba).get("cabecalho") is None]
+        if faltando:
+            resposta = self.executar(
+                lambda: self.obter_planilha().values_batch_get([_intervalo_aba(aba, "1:1") for aba in faltando]),
+                prioridade=prioridade
+            )
+            for aba, intervalo in zip(faltando, resposta.get("valueRanges", [])):
+                valores = intervalo.get("values", [])
+                self._conexao().metadados(aba)["cabecalho"] = valores[0] if valores else []
+        return {aba: self._conexao().metadados(aba)["cabecalho"] for aba in abas}
+
+    def _buscar_abas(self, consultas: dict, prioridade: int) -> dict:
+        cabecalhos = self._cabecalhos([aba for aba, colunas in consultas.items() if colunas], prioridade)
+
+        # Intervalos: a aba inteira, ou blocos de colunas vizinhas a partir da linha 2
+        intervalos, partes = [], {}
+        for aba, colunas in consultas.items():
+            if not colunas:
+                partes[aba] = [(None, len(intervalos))]
+                intervalos.append(_intervalo_aba(aba))
+                continue
+            posicoes = {str(nome).strip().lower(): i for i, nome in reversed(list(enumerate(cabecalhos[aba])))}
+            indices = sorted({posicoes[str(c).strip().lower()] for c in colunas if str(c).strip().lower() in posicoes})
+            partes[aba] = []
+            for indice in indices:
+                if partes[aba] and partes[aba][-1][0][-1] == indice - 1:
+                    partes[aba][-1][0].append(indice)
+                    continue
+                partes[aba].append(([indice], None))
+            for n, (bloco, _) in enumerate(partes[aba]):
+                inicio = gspread.utils.rowcol_to_a1(2, bloco[0] + 1)
+                fim = gspread.utils.rowcol_to_a1(2, bloco[-1] + 1).rstrip("0123456789")
+                partes[aba][n] = (bloco, len(intervalos))
+                intervalos.append(_intervalo_aba(aba, f"{inicio}:{fim}"))
+
+        respostas = []
+        if intervalos:
+            resposta = self.executar(lambda: self.obter_planilha().values_batch_get(intervalos), prioridade=prioridade)
+            respostas = [intervalo.get("values", []) for intervalo in resposta.get("valueRanges", [])]
+
+        resultado = {}
+        for aba, colunas in consultas.items():
+            if not colunas:
+                valores = respostas[partes[aba][0][1]]
+                cabecalho, linhas = (valores[0], valores[1:]) if valores else ([], [])
+            else:
+                cabecalho = [cabecalhos[aba][i] for bloco, _ in partes[aba] for i in bloco]
+                blocos = [(len(bloco), respostas[posicao]) for bloco, posicao in partes[aba]]
+                total = max((len(valores) for _, valores in blocos), default=0)
+                linhas = [
+                    [celula for largura, valores in blocos
+                     for celula in ((valores[r] if r < len(valores) else []) + [""] * largura)[:largura]]
+                    for r in range(total)
+                ]
+            largura = len(cabecalho)
+            df = pd.DataFrame(
+                [gspread.utils.numericise_all((linha + [""] * largura)[:largura], default_blank="") for linha in linhas],
+                columns=cabecalho
+            )
+            if colunas:
+                # Colunas pedidas que a aba não tem vêm vazias
+                for coluna in colunas:
+                    if str(coluna).strip().lower() not in {str(c).strip().lower() for c in df.columns}:
+                        df[coluna] = ""
+            resultado[aba] = df
+        return resultado
+
+    def _cache_leituras(self) -> CacheLeiturasSheets:
+        return CacheLeiturasSheets.obter((self._chave_credenciais, self.SPREADSHEET_URL))
+
+    def invalidar_leituras(self, *abas: str):
+        """Descarta as leituras em cache das abas alteradas por este processo (todas, se nenhuma for informada)"""
+        self._cache_leituras().invalidar(abas or None)
+        if not abas or "Pedidos" in abas or ABA_ALTERACOES in abas:
+            # A aba Pedidos tem leitura incremental própria: basta buscar o que mudou
+            self._leitor_pedidos().expirar()
+
+    def estatisticas_cache(self) -> list:
+        """Acertos, leituras e invalidações do cache de leituras desde o início do processo"""
+        return self._cache_leituras().resumo() if self._chave_credenciais else []
+
+    def estatisticas_cota(self) -> list:
+        """Requisições, esperas pela cota e respostas 429/5xx desde o início do processo"""
+        return self._conexao().cota.resumo() if self._chave_credenciais else []
+
+    def _leitor_pedidos(self) -> LeitorIncremental:
+        leitor = LeitorIncremental.obter((self._chave_credenciais, self.SPREADSHEET_URL))
+        leitor.max_desatualizacao = self._max_desatualizacao()
+        return leitor
+
+    def _max_desatualizacao(self) -> float:
+        return float(self.config.get('max_desatualizacao_s', MAX_DESATUALIZACAO_PADRAO))
+
+    def situacao_pedidos(self) -> dict:
+        """Idade dos pedidos exibidos (segundos), atualização em segundo plano em andamento e último erro"""
+        return self._leitor_pedidos().situacao()
+
+    def carregar_pedidos_incremental(self, prioridade: int = PRIORIDADE_LEITURA) -> pd.DataFrame:
+        """Aba Pedidos lida de forma incremental (só linhas novas e linhas marcadas em Alteracoes)"""
+        return self._leitor_pedidos().carregar(self, prioridade)
+
+    def contar_status_pedidos(self, prioridade: int = PRIORIDADE_LEITURA) -> pd.Series:
+        """
+        Quantidade de pedidos por Status. Só a coluna Status é baixada, e o resultado é
+        servido na hora (e relido em segundo plano) enquanto tiver menos de max_desatualizacao_s,
+        inclusive quando a cota está esgotada; ver situacao_contagem_status
+        """
+        df = self.ler_abas(CONSULTA_STATUS, prioridade, max_desatualizacao=self._max_desatualizacao())["Pedidos"]
+        if df.empty or 'Status' not in df.columns:
+            return pd.Series(dtype=int)
+        status = df['Status'].astype(str).str.strip()
+        return status[status != ""].value_counts()
+
+    def situacao_contagem_status(self) -> dict:
+        """Idade da contagem por Status (segundos), releitura em andamento e último erro"""
+        return self.situacao_consulta(CONSULTA_STATUS)
+
+    def _carregar_pedidos_sheets(self) -> pd.DataFrame:
+        return self.carregar_pedidos_incremental()
+
+    def get_indice_pendentes(self) -> IndicePendentes:
+        """Índice dos pedidos PENDENTE da aba 'Pedidos' (recarregado no máximo a cada minuto)"""
+        if self._indice_pendentes is None:
+            self._indice_pendentes = IndicePendentes(self._carregar_pedidos_sheets, ttl=60)
+        return self._indice_pendentes
+
+    def pedidos_duplicados(self, df_pedidos: pd.DataFrame) -> dict:
+        """
+        Linhas PENDENTE que já têm outro pedido PENDENTE igual (serial, máquina, posto e
+        coordenada) na planilha: {Numero_Pedido: motivo}
+        """
+        if df_pedidos.empty or 'Serial' not in df_pedidos.columns:
+            return {}
+        indice = self.get_indice_pendentes()
+        duplicados = {}
+        for row in df_pedidos.to_dict(orient='records'):
+            if str(row.get('Status', '')).strip().upper() != 'PENDENTE':
+                continue
+            existente = indice.pendente_duplicado(
+                row.get('Serial'), row.get('Maquina'), row.get('Posto'), row.get('Coordenada'),
+                ignorar_numero=row.get('Numero_Pedido')
+            )
+            if existente:
+                duplicados[str(row.get('Numero_Pedido'))] = f"{row.get('Serial')} (já pendente em {existente})"
+        return duplicados
+
+    def _verificar_pendentes_duplicados(self, df_pedidos: pd.DataFrame) -> list:
+        """Retorna mensagens para as linhas PENDENTE que já têm outro pedido PENDENTE igual na planilha"""
+        return list(self.pedidos_duplicados(df_pedidos).values())
 
     def salvar_pedido_completo(self, df_pedidos: pd.DataFrame, df_itens: pd.DataFrame) -> tuple[bool, str]:
         """Salva pedidos e itens em abas separadas no Google Sheets"""
@@ -111,84 +493,250 @@ class SheetsPedidosSync:
             if not self.SPREADSHEET_URL:
                 raise ValueError("URL da planilha não configurada.")
 
-            # Abrir a planilha pelo URL
-            try:
-                sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            except Exception as e:
-                raise ValueError(f"Erro ao abrir planilha: {str(e)}")
-
-            # Padronizar cabeçalho da aba Pedidos
-            pedidos_padrao = [
-                "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada", "Modelo", "OT", "Semiacabado", "Pagoda", "Status", "Urgente", "Ultima_Atualizacao", "Responsavel_Atualizacao", "Responsavel_Separacao", "Data_Separacao", "Responsavel_Coleta", "Data_Coleta", "Solicitante", "Observacoes"
-            ]
-            worksheet_pedidos = self._get_or_create_worksheet(sheet, "Pedidos")
-            headers = worksheet_pedidos.row_values(1)
-            if headers != pedidos_padrao:
-                worksheet_pedidos.update('A1', [pedidos_padrao])
-
-            # Preparar os dados dos pedidos
+            # Cabeçalho padrão e formatação das abas (só na primeira vez em cada planilha)
+            self.migrar_esquema()
+
+            # Bloquear seriais que já têm pedido PENDENTE com a mesma máquina, posto e coordenada
+            duplicados = self._verificar_pendentes_duplicados(df_pedidos)
+            if duplicados:
+                return False, f"Serial já existe em um pedido ativo com as mesmas informações: {', '.join(duplicados)}"
+
+            # Preparar os dados dos pedidos. Numa nova tentativa (Pedidos gravados e Itens não), os
+            # pedidos que já estão na planilha não são acrescentados de novo
             df_pedidos = df_pedidos.fillna("")
-            pedidos_values = [df_pedidos.columns.tolist()] + df_pedidos.values.tolist()
-            pedidos_values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in pedidos_values]
+            df_novos = df_pedidos
+            if 'Numero_Pedido' in df_pedidos.columns:
+                ja_gravados = self._pedidos_ja_gravados(df_pedidos['Numero_Pedido'].tolist())
+                df_novos = df_pedidos[~df_pedidos['Numero_Pedido'].map(normalizar_numero).isin(ja_gravados)]
+            pedidos_to_append = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in df_novos.values.tolist()]
 
-            # Preparar os dados dos itens
+            # Preparar os dados dos itens (cabeçalho apenas se a aba ainda estiver vazia)
             df_itens = df_itens.fillna("")
-            itens_values = [df_itens.columns.tolist()] + df_itens.values.tolist()
-            itens_values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in itens_values]
+            self._garantir_cabecalho("Itens", df_itens.columns.tolist())
+            itens_to_append = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in df_itens.values.tolist()]
 
             # Atualizar aba de Pedidos (APENAS ADICIONAR, NÃO LIMPAR)
-            existing_rows_pedidos = worksheet_pedidos.get_all_values()
-            if existing_rows_pedidos:
-                # Se já existe cabeçalho, não adicionar de novo
-                pedidos_to_append = pedidos_values[1:]
-            else:
-                # Se está vazio, adicionar tudo (incluindo cabeçalho)
-                pedidos_to_append = pedidos_values
             if pedidos_to_append:
-                worksheet_pedidos.append_rows(pedidos_to_append, value_input_option="USER_ENTERED")
+                self._acrescentar_linhas("Pedidos", pedidos_to_append)
+                for row in df_pedidos.to_dict(orient='records'):
+                    self.get_indice_pendentes().adicionar(row, registrar_escrita=False)
 
             # Atualizar aba de Itens (APENAS ADICIONAR, NÃO LIMPAR)
-            worksheet_itens = self._get_or_create_worksheet(sheet, "Itens")
-            existing_rows = worksheet_itens.get_all_values()
-            if existing_rows:
-                itens_to_append = itens_values[1:]
-            else:
-                itens_to_append = itens_values
             if itens_to_append:
-                worksheet_itens.append_rows(itens_to_append, value_input_option="USER_ENTERED")
-
-            # Formatar as abas
-            self._format_worksheets(sheet)
+                self._acrescentar_linhas("Itens", itens_to_append)
 
             return True, "Pedido salvo com sucesso no Google Sheets!"
         except Exception as e:
             return False, f"Erro ao salvar no Google Sheets: {str(e)}"
 
-    def _format_worksheets(self, sheet):
-        """Aplica formatação básica nas abas"""
+    def _pedidos_ja_gravados(self, numeros: list) -> set:
+        """
+        Números (normalizados) que o índice de linhas já registra na aba Pedidos, conferidos na
+        planilha. Sem nenhum no índice, o caso comum de pedidos novos, não faz leitura.
+        """
         try:
-            # Formatar aba de Pedidos
-            ws_pedidos = sheet.worksheet("Pedidos")
-            ws_pedidos.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            ws_pedidos.freeze(rows=1)
+            em_cache = self._indice_linhas().localizar({normalizar_numero(n) for n in numeros if n})
+        except OSError:
+            return set()
+        if not em_cache:
+            return set()
+        linhas, _, _ = self._localizar_linhas(list(em_cache))
+        return set(linhas)
 
-            # Formatar aba de Itens
-            ws_itens = sheet.worksheet("Itens")
-            ws_itens.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            ws_itens.freeze(rows=1)
-        except Exception as e:
-            if st:
-                st.warning(f"Aviso: Não foi possível aplicar a formatação: {str(e)}")
-            else:
-                print(f"Aviso: Não foi possível aplicar a formatação: {str(e)}")
+    def _garantir_cabecalho(self, nome: str, colunas: list):
+        """
+        Grava o cabeçalho da aba se ela estiver vazia. A conferência lê só a linha 1 e é
+        lembrada nos metadados da aba, então salvamentos seguintes não fazem nenhuma leitura.
+        """
+        if self._conexao().metadados(nome).get("cabecalho"):
+            return
+        atual = self.executar(lambda: self.obter_aba(nome, criar=True).row_values(1))
+        if not atual:
+            self.executar(lambda: self.obter_aba(nome, criar=True).update('A1', [colunas]), escrita=True)
+            atual = colunas
+        self._conexao().metadados(nome)["cabecalho"] = atual
+
+    def _acrescentar_linhas(self, nome: str, linhas: list):
+        """Acrescenta linhas ao fim da aba e guarda a última linha escrita nos metadados"""
+        resposta = self.executar(
+            lambda: self.obter_aba(nome, criar=True).append_rows(linhas, value_input_option="USER_ENTERED"),
+            escrita=True, repetivel=False
+        )
+        self.invalidar_leituras(nome)
+        intervalo = ((resposta or {}).get("updates") or {}).get("updatedRange", "")
+        ultima = re.search(r"(\d+)$", intervalo)
+        if ultima:
+            self._conexao().metadados(nome)["ultima_linha"] = int(ultima.group(1))
+        primeira = re.search(r"!\$?[A-Z]+\$?(\d+)", intervalo)
+        if nome == "Pedidos" and primeira:
+            # Mantém o índice número → linha sem reler a coluna A
+            try:
+                self._indice_linhas().registrar({
+                    linha[0]: int(primeira.group(1)) + i for i, linha in enumerate(linhas) if linha
+                })
+            except OSError:
+                pass
+
+    def _versoes_esquema(self) -> dict:
+        """Versão do esquema aplicada em cada aba, lida da aba _meta uma vez por conexão"""
+        versoes = self._conexao().metadados(ABA_META).get("versoes")
+        if versoes is None:
+            valores = self.executar(lambda: self.obter_aba(ABA_META, criar=True, rows=20, cols=2).get_all_values())
+            versoes = {
+                linha[0]: int(linha[1]) for linha in valores[1:]
+                if len(linha) > 1 and str(linha[1]).strip().isdigit()
+            }
+            self._conexao().metadados(ABA_META)["versoes"] = versoes
+        return versoes
+
+    def migrar_esquema(self, abas: list = ("Pedidos", "Itens", ABA_ALTERACOES)):
+        """
+        Aplica o esquema (cabeçalho padrão, formatação e congelamento da linha 1) às abas que
+        ainda não estão na VERSAO_ESQUEMA, em uma única requisição batch_update que também
+        registra as versões na aba _meta. Abas já migradas não custam nenhuma chamada.
+        Cria as abas que faltarem (a Alteracoes só é criada aqui; os leitores não a criam).
+        """
+        versoes = self._versoes_esquema()
+        pendentes = [nome for nome in abas if versoes.get(nome, 0) < VERSAO_ESQUEMA]
+        if not pendentes:
+            return
+
+        requests = []
+        for nome in pendentes:
+            sheet_id = self.obter_aba(nome, criar=True).id
+            cabecalho = CABECALHOS_ESQUEMA.get(nome)
+            if cabecalho:
+                requests.append({"updateCells": {
+                    "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+                    "rows": [_linha_celulas(cabecalho)],
+                    "fields": "userEnteredValue"
+                }})
+            requests.extend(_requisicoes_formatacao(sheet_id))
+
+        novas = dict(versoes, **{nome: VERSAO_ESQUEMA for nome in pendentes})
+        requests.append({"updateCells": {
+            "start": {"sheetId": self.obter_aba(ABA_META).id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [_linha_celulas(["Aba", "Versao_Esquema"])] + [
+                _linha_celulas([nome, versao]) for nome, versao in sorted(novas.items())
+            ],
+            "fields": "userEnteredValue"
+        }})
+        self.executar(lambda: self.obter_planilha().batch_update({"requests": requests}), escrita=True)
+
+        self._conexao().metadados(ABA_META)["versoes"] = novas
+        if "Pedidos" in pendentes:
+            # Cabeçalho regravado: o leitor incremental precisa reler a aba
+            self._leitor_pedidos().invalidar()
+        for nome in pendentes:
+            if CABECALHOS_ESQUEMA.get(nome):
+                self._conexao().metadados(nome)["cabecalho"] = CABECALHOS_ESQUEMA[nome]
+
+    def _aba_existente(self, nome: str):
+        """Handle da aba `nome`, ou None se ela não existir"""
+        try:
+            return self.obter_aba(nome)
+        except gspread.exceptions.WorksheetNotFound:
+            return None
+
+    def _substituir_aba(self, nome: str, valores: list, linhas_por_lote: int = 500) -> dict:
+        """
+        Substitui o conteúdo da aba `nome` por `valores` (cabeçalho + linhas) sem que os leitores
+        vejam a aba vazia ou pela metade. As mudanças são gravadas em uma cópia da aba
+        (`nome`__importacao), só nas linhas que diferem e em lotes de até `linhas_por_lote`
+        linhas; a cópia toma o lugar da aba em um único batch_update. Se a importação for
+        interrompida, a cópia fica na planilha e a próxima importação continua a partir dela,
+        gravando só o que ainda falta.
+        Retorna {"linhas": total de linhas de dados, "gravadas": linhas escritas, "lotes": requisições}.
+        """
+        largura = len(valores[0])
+        valores = normalizar_linhas(valores, largura)
+        nome_copia = f"{nome}{SUFIXO_IMPORTACAO}"
+        diretorio = os.path.dirname(os.path.abspath(self.config_file))
+
+        with FileLock(os.path.join(diretorio, "importacao_sheets.lock"), timeout=600):
+            # Lista de abas atualizada: uma importação anterior pode ter deixado a cópia
+            self._conexao().invalidar()
+            atual = self._aba_existente(nome)
+            copia = self._aba_existente(nome_copia)
+
+            conteudo = []
+            if copia is not None:
+                conteudo = self.executar(lambda: copia.get_all_values(value_render_option="UNFORMATTED_VALUE"))
+                if not conteudo or _sem_vazios_finais(conteudo[0]) != valores[0]:
+                    self.executar(lambda: self.obter_planilha().del_worksheet(copia), escrita=True)
+                    copia, conteudo = None, []
+            if copia is None:
+                conteudo = self.executar(
+                    lambda: atual.get_all_values(value_render_option="UNFORMATTED_VALUE")
+                ) if atual is not None else []
+                if conteudo and _sem_vazios_finais(conteudo[0]) == valores[0]:
+                    # Mesmo cabeçalho: parte da cópia da aba atual (feita no servidor)
+                    copia = self.executar(
+                        lambda: self.obter_planilha().duplicate_sheet(atual.id, new_sheet_name=nome_copia),
+                        escrita=True
+                    )
+                else:
+                    # Aba nova ou colunas diferentes: parte de uma aba vazia
+                    copia = self.executar(
+                        lambda: self.obter_planilha().add_worksheet(title=nome_copia, rows=len(valores) + 100, cols=largura + 5),
+                        escrita=True, repetivel=False
+                    )
+                    conteudo = []
+            conteudo = normalizar_linhas(conteudo, largura)
+
+            final = planejar_substituicao(conteudo, valores)
+            lotes = trechos_alterados(conteudo, final, linhas_por_lote)
+            if len(final) > copia.row_count:
+                self.executar(lambda: copia.add_rows(len(final) - copia.row_count), escrita=True, repetivel=False)
+            for numero, lote in enumerate(lotes):
+                try:
+                    self.executar(lambda lote=lote: copia.batch_update([
+                        {"range": f"A{inicio}:{gspread.utils.rowcol_to_a1(inicio + len(linhas) - 1, largura)}", "values": linhas}
+                        for inicio, linhas in lote
+                    ], value_input_option="USER_ENTERED"), escrita=True)
+                except Exception as e:
+                    raise RuntimeError(
+                        f"importação interrompida após {numero} de {len(lotes)} lote(s) ({str(e)}). "
+                        f"A aba '{nome}' não foi alterada; importe o arquivo novamente para continuar de onde parou."
+                    ) from e
+            if len(conteudo) > len(final):
+                self.executar(
+                    lambda: copia.batch_clear([f"A{len(final) + 1}:{gspread.utils.rowcol_to_a1(len(conteudo), largura)}"]),
+                    escrita=True
+                )
+
+            # Troca atômica: a aba antiga sai e a cópia assume o nome e a posição dela,
+            # e a versão do conteúdo é registrada na mesma requisição
+            requests = []
+            propriedades = {"sheetId": copia.id, "title": nome}
+            if atual is not None:
+                requests.append({"deleteSheet": {"sheetId": atual.id}})
+                propriedades["index"] = atual.index
+            requests.append({"updateSheetProperties": {"properties": propriedades, "fields": ",".join(k for k in propriedades if k != "sheetId")}})
+            requests.extend(_requisicoes_formatacao(copia.id))
+            requests.append(self._requisicao_versao(nome, final))
+            self.executar(lambda: self.obter_planilha().batch_update({"requests": requests}), escrita=True)
+            self._conexao().invalidar()
+            self.invalidar_leituras(nome)
+
+        gravadas = sum(len(linhas) - (inicio == 1) for lote in lotes for inicio, linhas in lote)
+        return {"linhas": len(final) - 1, "gravadas": gravadas, "lotes": len(lotes)}
+
+    def _requisicao_versao(self, nome: str, conteudo: list) -> dict:
+        """updateCells que grava na aba _versoes a versão (hash do conteúdo) da aba `nome`"""
+        versoes = self._versoes_conteudo(PRIORIDADE_ESCRITA)
+        versoes[nome] = [
+            hashlib.sha1(json.dumps(conteudo, ensure_ascii=False).encode("utf-8")).hexdigest()[:16],
+            datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        ]
+        aba_versoes = self.obter_aba(ABA_VERSOES, criar=True, rows=20, cols=3)
+        return {"updateCells": {
+            "start": {"sheetId": aba_versoes.id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [_linha_celulas(["Aba", "Versao", "Importado_Em"])] + [
+                _linha_celulas([aba, *valores]) for aba, valores in sorted(versoes.items())
+            ],
+            "fields": "userEnteredValue"
+        }}
 
     def sincronizar_mapeamento(self, arquivo_mapeamento: str) -> tuple[bool, str]:
         """Sincroniza o arquivo de mapeamento com o Google Sheets"""
@@ -219,31 +767,15 @@ class SheetsPedidosSync:
             except Exception as e:
                 raise ValueError(f"Erro ao ler arquivo de mapeamento: {str(e)}")
 
-            # Abrir a planilha do Google Sheets
-            try:
-                sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            except Exception as e:
-                raise ValueError(f"Erro ao abrir planilha: {str(e)}")
-
             # Preparar os dados
             df = df.fillna("")
             values = [df.columns.tolist()] + df.values.tolist()
             values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in values]
 
-            # Atualizar ou criar a aba Projeto
-            worksheet = self._get_or_create_worksheet(sheet, "Projeto", rows=len(values)+100, cols=len(values[0])+5)
-            worksheet.clear()
-            worksheet.append_rows(values, value_input_option="USER_ENTERED")
-
-            # Formatar a aba
-            worksheet.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            worksheet.freeze(rows=1)
+            # Atualizar ou criar a aba Projeto (só as linhas que mudaram)
+            resultado = self._substituir_aba("Projeto", values)
 
-            return True, "Mapeamento sincronizado com sucesso!"
+            return True, f"Mapeamento sincronizado com sucesso! ({resultado['gravadas']} de {resultado['linhas']} linhas atualizadas)"
         except Exception as e:
             return False, f"Erro ao sincronizar mapeamento: {str(e)}"
 
@@ -261,31 +793,15 @@ class SheetsPedidosSync:
             except Exception as e:
                 raise ValueError(f"Erro ao ler arquivo local: {str(e)}")
 
-            # Abrir a planilha do Google Sheets
-            try:
-                sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            except Exception as e:
-                raise ValueError(f"Erro ao abrir planilha: {str(e)}")
-
             # Preparar os dados
             df = df.fillna("")
             values = [df.columns.tolist()] + df.values.tolist()
             values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in values]
 
-            # Atualizar ou criar a aba 'paco'
-            worksheet = self._get_or_create_worksheet(sheet, "paco", rows=len(values)+100, cols=len(values[0])+5)
-            worksheet.clear()
-            worksheet.append_rows(values, value_input_option="USER_ENTERED")
+            # Atualizar ou criar a aba 'paco' (só as linhas que mudaram)
+            resultado = self._substituir_aba("paco", values)
 
-            # Formatar a aba
-            worksheet.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            worksheet.freeze(rows=1)
-
-            return True, "Planilha local sincronizada com sucesso na aba 'paco'!"
+            return True, f"Planilha local sincronizada com sucesso na aba 'paco'! ({resultado['gravadas']} de {resultado['linhas']} linhas atualizadas)"
         except Exception as e:
             return False, f"Erro ao sincronizar aba 'paco': {str(e)}"
 
@@ -303,27 +819,11 @@ class SheetsPedidosSync:
             except Exception as e:
                 raise ValueError(f"Erro ao ler arquivo local: {str(e)}")
 
-            # Abrir a planilha do Google Sheets
-            try:
-                sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            except Exception as e:
-                raise ValueError(f"Erro ao abrir planilha: {str(e)}")
-
             # Preparar os dados (apenas header)
             values = [list(df.columns)]
 
             # Atualizar ou criar a aba 'layout'
-            worksheet = self._get_or_create_worksheet(sheet, "layout", rows=10, cols=len(values[0])+5)
-            worksheet.clear()
-            worksheet.append_rows(values, value_input_option="USER_ENTERED")
-
-            # Formatar a aba
-            worksheet.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            worksheet.freeze(rows=1)
+            self._substituir_aba("layout", values)
 
             return True, "Layout do arquivo local sincronizado com sucesso na aba 'layout'!"
         except Exception as e:
@@ -346,13 +846,38 @@ class SheetsPedidosSync:
             st.success("✅ URL salva com sucesso!")
             st.rerun()
 
+        # Idade máxima dos dados exibidos enquanto a leitura é atualizada em segundo plano
+        st.markdown("### Atualização dos Dados")
+        max_desatualizacao = st.number_input(
+            "Idade máxima dos pedidos exibidos sem esperar o Google Sheets (segundos)",
+            min_value=15, max_value=3600, step=15,
+            value=int(self.config.get('max_desatualizacao_s', MAX_DESATUALIZACAO_PADRAO))
+        )
+        if st.button("💾 Salvar idade máxima"):
+            self.config['max_desatualizacao_s'] = int(max_desatualizacao)
+            self.save_config()
+            st.success("✅ Configuração salva!")
+
+        # A cota do Google (60 leituras e 60 escritas por minuto) é da credencial, não do processo
+        processos_cota = st.number_input(
+            "Apps que usam esta mesma credencial (servidores, app desktop); cada um usa uma parte da cota",
+            min_value=1, max_value=20, step=1,
+            value=int(self.config.get('processos_cota', 1))
+        )
+        if st.button("💾 Salvar divisão da cota"):
+            self.config['processos_cota'] = int(processos_cota)
+            self.save_config()
+            st.success("✅ Configuração salva! Vale a partir da próxima inicialização do app.")
+
         # Status da conexão
         st.markdown("### Status da Conexão")
         if self.client:
             st.success("✅ Conectado ao Google Sheets")
             if st.button("🔄 Testar Conexão"):
                 try:
-                    self.client.open_by_url(self.SPREADSHEET_URL)
+                    # Reabre de fato a planilha, em vez de usar o handle em cache
+                    self._conexao().invalidar()
+                    self.obter_planilha()
                     st.success("✅ Conexão testada com sucesso!")
                 except Exception as e:
                     st.error(f"❌ Erro na conexão: {str(e)}")
@@ -387,19 +912,15 @@ class SheetsPedidosSync:
                 st.warning("Por favor, recarregue a página e aguarde um minuto antes de tentar novamente.")
                 return {}
             
-            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            ws_pedidos = sheet.worksheet("Pedidos")
-            ws_itens = sheet.worksheet("Itens")
-            
             # Buscar pedido na aba Pedidos
-            pedidos_data = ws_pedidos.get_all_records()
+            pedidos_data = self.carregar_pedidos_incremental().to_dict(orient='records')
             pedido = next((p for p in pedidos_data if p.get("Numero_Pedido") == numero_pedido), None)
             if not pedido:
                 return {}
             
-            # Buscar itens na aba Itens
-            itens_data = ws_itens.get_all_records()
-            itens = [item for item in itens_data if item.get("Numero_Pedido") == numero_pedido]
+            # Buscar itens na aba Itens (só as colunas usadas)
+            df_itens = self.ler_abas({"Itens": ["Numero_Pedido", "Serial", "Quantidade"]})["Itens"]
+            itens = df_itens[df_itens["Numero_Pedido"] == numero_pedido].to_dict(orient='records')
             
             # Converter pedido para dicionário
             info_dict = {
@@ -420,66 +941,150 @@ class SheetsPedidosSync:
                 "status": pedido.get("Status", "")
             }
         except Exception as e:
-            if "Quota exceeded" in str(e) or "[429]" in str(e):
+            if isinstance(e, CotaExcedida):
                 st.warning("Por favor, recarregue a página e aguarde um minuto antes de tentar novamente.")
+            else:
+                st.warning(f"Erro ao buscar pedido no Google Sheets: {str(e)}")
             return {}
 
     def atualizar_status_pedido_sheets(self, numero_pedido: str, novo_status: str, ultima_atualizacao: str, responsavel: str, urgente_para_concluido_urgente: bool = False) -> tuple[bool, str]:
         """Atualiza o status de um pedido diretamente no Google Sheets."""
+        resultado = self.atualizar_status_pedidos_sheets([{
+            "Numero_Pedido": numero_pedido,
+            "Status": novo_status,
+            "Ultima_Atualizacao": ultima_atualizacao,
+            "Responsavel_Atualizacao": responsavel,
+            "Concluido_Urgente": urgente_para_concluido_urgente
+        }])
+        if resultado["erro"]:
+            return False, resultado["erro"]
+        if resultado["nao_encontrados"]:
+            return False, f"Pedido {numero_pedido} não encontrado na coluna 'Numero_Pedido' da aba Pedidos no Google Sheets."
+        return True, "Status atualizado com sucesso no Google Sheets!"
+
+    def atualizar_status_pedidos_sheets(self, alteracoes: list) -> dict:
+        """
+        Atualiza o status de vários pedidos no Google Sheets com uma leitura pequena (cabeçalho
+        e conferência das linhas do índice) e uma única escrita (values.batchUpdate) com todas
+        as células afetadas.
+
+        Cada alteração é um dicionário com Numero_Pedido, Status, Ultima_Atualizacao,
+        Responsavel_Atualizacao e, opcionalmente, Concluido_Urgente.
+
+        Retorna {"atualizados": [...], "nao_encontrados": [...], "erro": str ou None}. Os
+        pedidos ausentes da aba não impedem a escrita dos demais; "erro" indica que nada foi
+        escrito (configuração, colunas ausentes ou falha da API).
+        """
+        resultado = {"atualizados": [], "nao_encontrados": [], "erro": None}
         try:
             if not self.client:
-                return False, "Cliente do Google Sheets não configurado."
+                resultado["erro"] = "Cliente do Google Sheets não configurado."
+                return resultado
             if not self.SPREADSHEET_URL:
-                return False, "URL da planilha não configurada."
+                resultado["erro"] = "URL da planilha não configurada."
+                return resultado
+            if not alteracoes:
+                return resultado
 
-            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            ws_pedidos = sheet.worksheet("Pedidos")
+            # Linha de cada pedido pelo Numero_Pedido (tolerante a espaços e case)
+            linhas, numeros_planilha, headers = self._localizar_linhas([a["Numero_Pedido"] for a in alteracoes])
 
-            # Encontrar a linha do pedido pelo Numero_Pedido (tolerante a espaços e case)
-            numeros_pedidos_col = ws_pedidos.col_values(1)
-            numero_pedido_norm = numero_pedido.strip().upper()
-            col_norm = [str(x).strip().upper() for x in numeros_pedidos_col[1:]]
-            try:
-                row_index = col_norm.index(numero_pedido_norm) + 2
-            except ValueError:
-                return False, f"Pedido '{numero_pedido}' não encontrado na coluna 'Numero_Pedido' da aba Pedidos no Google Sheets."
+            data = []
+            atualizados = []
+            marcadores = []
+            nao_encontrados = []
+            for alteracao in alteracoes:
+                numero_pedido = str(alteracao["Numero_Pedido"])
+                row_index = linhas.get(normalizar_numero(numero_pedido))
+                if row_index is None:
+                    nao_encontrados.append(numero_pedido)
+                    continue
+                campos = campos_transicao(
+                    alteracao["Status"], alteracao["Responsavel_Atualizacao"], alteracao["Ultima_Atualizacao"]
+                )
+                if alteracao.get("Concluido_Urgente"):
+                    campos["Urgente"] = "Concluido Urgente"
+                for coluna, valor in campos.items():
+                    if coluna not in headers:
+                        resultado["erro"] = f"Colunas necessárias não encontradas na aba Pedidos: '{coluna}'"
+                        return resultado
+                    data.append({
+                        "range": gspread.utils.rowcol_to_a1(row_index, headers.index(coluna) + 1),
+                        "values": [[valor]]
+                    })
+                numero_planilha = numeros_planilha[normalizar_numero(numero_pedido)]
+                atualizados.append((numero_pedido, numero_planilha, alteracao["Status"]))
+                marcadores.append([numero_planilha, row_index, alteracao["Status"], alteracao["Ultima_Atualizacao"]])
 
-            # Encontrar índices das colunas
-            headers = ws_pedidos.row_values(1)
-            try:
-                status_col_index = headers.index("Status") + 1
-                ultima_atualizacao_col_index = headers.index("Ultima_Atualizacao") + 1
-                responsavel_atualizacao_col_index = headers.index("Responsavel_Atualizacao") + 1
-                responsavel_separacao_col_index = headers.index("Responsavel_Separacao") + 1
-                data_separacao_col_index = headers.index("Data_Separacao") + 1
-                responsavel_coleta_col_index = headers.index("Responsavel_Coleta") + 1
-                data_coleta_col_index = headers.index("Data_Coleta") + 1
-                urgente_col_index = headers.index("Urgente") + 1 if urgente_para_concluido_urgente else None
-            except ValueError as e:
-                return False, f"Colunas necessárias não encontradas na aba Pedidos: {e}"
-
-            # Atualizar as células básicas
-            ws_pedidos.update_cell(row_index, status_col_index, novo_status)
-            ws_pedidos.update_cell(row_index, ultima_atualizacao_col_index, ultima_atualizacao)
-            ws_pedidos.update_cell(row_index, responsavel_atualizacao_col_index, responsavel)
-
-            # Atualizar informações específicas baseado no status
-            if novo_status == "Em Separação":
-                ws_pedidos.update_cell(row_index, responsavel_separacao_col_index, responsavel)
-                ws_pedidos.update_cell(row_index, data_separacao_col_index, ultima_atualizacao)
-            elif novo_status == "Em Coleta":
-                ws_pedidos.update_cell(row_index, responsavel_coleta_col_index, responsavel)
-                ws_pedidos.update_cell(row_index, data_coleta_col_index, ultima_atualizacao)
-
-            if urgente_para_concluido_urgente and urgente_col_index:
-                ws_pedidos.update_cell(row_index, urgente_col_index, "Concluido Urgente")
-
-            return True, "Status atualizado com sucesso no Google Sheets!"
+            if data:
+                self.executar(lambda: self.obter_aba("Pedidos").batch_update(data, value_input_option="USER_ENTERED"), escrita=True)
+                self.invalidar_leituras("Pedidos")
+                self._registrar_alteracoes(marcadores)
+
+            if self._indice_pendentes is not None:
+                for _, numero_planilha, novo_status in atualizados:
+                    self._indice_pendentes.atualizar_status(numero_planilha, novo_status, registrar_escrita=False)
+
+            resultado["atualizados"] = [numero_pedido for numero_pedido, _, _ in atualizados]
+            resultado["nao_encontrados"] = nao_encontrados
+            return resultado
         except Exception as e:
-            return False, f"Erro ao atualizar status no Google Sheets: {str(e)}"
+            resultado["erro"] = f"Erro ao atualizar status no Google Sheets: {str(e)}"
+            return resultado
+
+    def _indice_linhas(self) -> IndiceLinhasSheets:
+        """Índice Numero_Pedido → linha da aba Pedidos, persistido ao lado do config"""
+        if getattr(self, '_indice_linhas_pedidos', None) is None or self._indice_linhas_pedidos.url != self.SPREADSHEET_URL:
+            diretorio = os.path.dirname(os.path.abspath(self.config_file))
+            self._indice_linhas_pedidos = IndiceLinhasSheets(
+                os.path.join(diretorio, "indice_linhas_pedidos.json"), self.SPREADSHEET_URL
+            )
+        return self._indice_linhas_pedidos
+
+    def _localizar_linhas(self, numeros: list) -> tuple:
+        """
+        Retorna (linhas, numeros_planilha, cabecalho) para os pedidos informados, com as chaves
+        normalizadas. As linhas do índice são conferidas (célula A de cada uma) na mesma
+        requisição que lê o cabeçalho; a coluna A inteira só é baixada, e o índice refeito,
+        quando falta algum pedido no índice ou a conferência falha.
+        """
+        indice = self._indice_linhas()
+        chaves = {normalizar_numero(n) for n in numeros}
+        em_cache = indice.localizar(chaves)
+        if em_cache and len(em_cache) == len(chaves):
+            ordem = sorted(em_cache.items(), key=lambda item: item[1])
+            resposta = self.executar(lambda: self.obter_planilha().values_batch_get(
+                ["'Pedidos'!A1:Z1"] + [f"'Pedidos'!A{linha}:A{linha}" for _, linha in ordem]
+            ))
+            intervalos = [intervalo.get("values", []) for intervalo in resposta.get("valueRanges", [])]
+            headers = intervalos[0][0] if intervalos and intervalos[0] else []
+            numeros_planilha = {
+                chave: (valores[0][0] if valores and valores[0] else "")
+                for (chave, _), valores in zip(ordem, intervalos[1:])
+            }
+            if all(normalizar_numero(numeros_planilha.get(chave, "")) == chave for chave in em_cache):
+                return em_cache, numeros_planilha, headers
+
+        coluna_numeros, linha_cabecalho = self.executar(lambda: self.obter_aba("Pedidos").batch_get(["A:A", "1:1"]))
+        coluna = [linha[0] if linha else "" for linha in coluna_numeros]
+        indice.reconstruir(coluna)
+        linhas = indice.localizar(chaves)
+        return linhas, {chave: coluna[linha - 1] for chave, linha in linhas.items()}, (linha_cabecalho[0] if linha_cabecalho else [])
+
+    def _registrar_alteracoes(self, marcadores: list):
+        """
+        Acrescenta à aba Alteracoes as linhas de Pedidos que mudaram, para os leitores
+        incrementais relerem só essas linhas. Se falhar, a próxima leitura deste processo
+        recarrega a aba inteira (os demais processos só na recarga periódica).
+        """
+        try:
+            self.migrar_esquema()
+            self._acrescentar_linhas(ABA_ALTERACOES, marcadores)
+        except Exception:
+            self._leitor_pedidos().invalidar()
 
     def importar_e_atualizar_paco(self, arquivo_importado: str) -> tuple[bool, str]:
-        """Importa um arquivo Excel e sobrescreve toda a aba 'paco' do Google Sheets com o conteúdo do arquivo."""
+        """Importa um arquivo Excel e sobrescreve a aba 'paco' do Google Sheets com o conteúdo do arquivo (gravando só as diferenças)."""
         try:
             if not self.client:
                 raise ValueError("Cliente do Google Sheets não configurado. Verifique as credenciais.")
@@ -491,25 +1096,14 @@ class SheetsPedidosSync:
             df_import = pd.read_excel(arquivo_importado)
             df_import = df_import.fillna("")
 
-            # Abrir a planilha do Google Sheets
-            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-
             # Preparar os dados para sobrescrever
             values = [df_import.columns.tolist()] + df_import.values.tolist()
             values = [[str(cell) if pd.notna(cell) else "" for cell in row] for row in values]
 
-            # Atualizar ou criar a aba 'paco'
-            worksheet = self._get_or_create_worksheet(sheet, "paco", rows=len(values)+100, cols=len(values[0])+5)
-            worksheet.clear()
-            worksheet.append_rows(values, value_input_option="USER_ENTERED")
-            worksheet.format('A1:Z1', {
-                "backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8},
-                "horizontalAlignment": "CENTER",
-                "textFormat": {"bold": True}
-            })
-            worksheet.freeze(rows=1)
+            # Atualizar ou criar a aba 'paco' (só as linhas que mudaram)
+            resultado = self._substituir_aba("paco", values)
 
-            return True, "Aba 'paco' sobrescrita com sucesso com o conteúdo do arquivo importado!"
+            return True, f"Aba 'paco' sobrescrita com sucesso com o conteúdo do arquivo importado! ({resultado['gravadas']} de {resultado['linhas']} linhas atualizadas)"
         except Exception as e:
             return False, f"Erro ao importar e sobrescrever aba 'paco': {str(e)}"
 
@@ -521,9 +1115,7 @@ class SheetsPedidosSync:
             if not self.SPREADSHEET_URL:
                 raise ValueError("URL da planilha não configurada.")
 
-            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            ws_paco = sheet.worksheet("paco")
-            data = ws_paco.get_all_records()
+            data = self.ler_registros("paco")
             df = pd.DataFrame(data)
             return df
         except Exception as e:
@@ -533,29 +1125,123 @@ class SheetsPedidosSync:
                 print(f"Erro ao ler a aba 'paco' do Google Sheets: {str(e)}")
             return pd.DataFrame()
 
-    def get_proximo_numero_pedido(self, prefixo="REQ-") -> int:
+    def _maior_numero_pedido_sheets(self, prefixo="REQ-") -> int:
+        """Varre a coluna Numero_Pedido da aba 'Pedidos' e retorna o maior número (usado só como semente)"""
+        pedidos = self.executar(lambda: self.obter_aba("Pedidos").col_values(1))  # Coluna Numero_Pedido
+        max_num = 0
+        padrao = re.compile(rf"{prefixo}(\d{{3,}})$")
+        for p in pedidos[1:]:  # Ignorar cabeçalho
+            m = padrao.match(p.strip())
+            if m:
+                num = int(m.group(1))
+                if num > max_num:
+                    max_num = num
+        return max_num
+
+    def reservar_bloco_numeros(self, quantidade: int, prefixo="REQ-") -> tuple[int, int]:
         """
-        Busca o maior número de pedido já existente na aba 'Pedidos' e retorna o próximo número disponível.
-        Considera apenas pedidos no formato REQ-XXX (três dígitos).
+        Reserva um bloco de `quantidade` números de pedido e retorna (primeiro, último).
+
+        Cada reserva é uma linha acrescentada (append) à aba 'Controle'; o Google Sheets põe
+        appends concorrentes em linhas distintas, e o bloco de cada cliente é deduzido da
+        ordem das linhas (ver blocos_reservados), então dois clientes nunca recebem o mesmo bloco.
+        As linhas já somadas não mudam mais: a soma até a última reserva deste cliente fica
+        guardada (controle_reservas.json), e cada reserva só lê as linhas acrescentadas desde
+        então, não o histórico inteiro da aba.
         """
+        if not self.client or not self.SPREADSHEET_URL:
+            raise ValueError("Cliente do Google Sheets não configurado.")
+        ws_controle = self.obter_aba("Controle", criar=True, rows=10, cols=len(COLUNAS_CONTROLE))
+        quando = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        cliente = f"{socket.gethostname()}:{os.getpid()}"
+
+        linhas = []
+        metadados = self._conexao().metadados("Controle")
+        if not metadados.get("base"):
+            # A BASE (ou o B1 do formato antigo) é gravada junto com o cabeçalho, no topo da aba
+            inicio = self.executar(lambda: ws_controle.get_values("A1:B3"), prioridade=PRIORIDADE_ESCRITA)
+            if not inicio:
+                linhas.append(COLUNAS_CONTROLE)
+            if _contador_inicial(inicio) is None:
+                # Primeira reserva: o contador parte do maior número já gravado na aba Pedidos
+                linhas.append(["BASE", self._maior_numero_pedido_sheets(prefixo), cliente, quando])
+        linhas.append(["BLOCO", int(quantidade), cliente, quando])
+
+        resposta = self.executar(
+            lambda: ws_controle.append_rows(linhas, value_input_option="RAW", table_range="A1"),
+            escrita=True, repetivel=False
+        )
+        metadados["base"] = True
+        intervalo = (resposta or {}).get("updates", {}).get("updatedRange", "")
+        ultima = re.search(r"!.*?(\d+)$", intervalo)
+        if not ultima:
+            raise RuntimeError(f"Resposta inesperada ao reservar números de pedido: {intervalo!r}")
+        linha = int(ultima.group(1))
+
+        # Soma das linhas anteriores à nossa, continuando da última já conhecida
+        conhecida, contador = self._ponto_controle()
+        if conhecida >= linha:
+            # Aba 'Controle' refeita: soma desde o início
+            conhecida, contador = 0, 0
+        novas = self.executar(lambda: ws_controle.get_values(f"A{conhecida + 1}:B{linha}"), prioridade=PRIORIDADE_ESCRITA)
+        bloco = blocos_reservados(novas, contador, conhecida + 1)[-1]
+        self._salvar_ponto_controle(linha, bloco[1])
+        return bloco
+
+    def _arquivo_ponto_controle(self) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_file)), "controle_reservas.json")
+
+    def _ponto_controle(self) -> tuple:
+        """(linha, contador) da última reserva deste cliente na aba 'Controle' da planilha atual; (0, 0) se nenhuma"""
         try:
-            if not self.client or not self.SPREADSHEET_URL:
-                return 1
-            sheet = self.client.open_by_url(self.SPREADSHEET_URL)
-            ws_pedidos = sheet.worksheet("Pedidos")
-            pedidos = ws_pedidos.col_values(1)  # Coluna Numero_Pedido
-            max_num = 0
-            padrao = re.compile(rf"{prefixo}(\d{{3}})$")
-            for p in pedidos[1:]:  # Ignorar cabeçalho
-                m = padrao.match(p.strip())
-                if m:
-                    num = int(m.group(1))
-                    if num > max_num:
-                        max_num = num
-            return max_num + 1
-        except Exception as e:
-            if st:
-                st.warning(f"Não foi possível buscar o próximo número de pedido: {str(e)}")
-            else:
-                print(f"Não foi possível buscar o próximo número de pedido: {str(e)}")
-            return 1
+            with open(self._arquivo_ponto_controle(), 'r') as f:
+                ponto = json.load(f)
+            if ponto.get("url") == self.SPREADSHEET_URL:
+                return int(ponto["linha"]), int(ponto["contador"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return 0, 0
+
+    def _salvar_ponto_controle(self, linha: int, contador: int):
+        # Só avança: outro processo do mesmo app pode ter gravado uma linha posterior
+        if linha <= self._ponto_controle()[0]:
+            return
+        caminho = self._arquivo_ponto_controle()
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        try:
+            with open(temporario, 'w') as f:
+                json.dump({"url": self.SPREADSHEET_URL, "linha": linha, "contador": contador}, f)
+            os.replace(temporario, caminho)
+        except OSError:
+            # Sem o ponto de controle a próxima reserva só lê mais linhas
+            pass
+
+    def obter_sequencia(self, prefixo="REQ-") -> SequenciaPedidos:
+        """
+        Alocador de números de pedido do app (pedidos/sequencia_pedidos.json ao lado do config),
+        abastecido por blocos reservados no Google Sheets
+        """
+        if getattr(self, '_sequencia', None) is None or self._sequencia.prefixo != prefixo:
+            diretorio = os.path.dirname(os.path.abspath(self.config_file))
+            caminho = os.path.join(diretorio, ARQUIVO_SEQUENCIA)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            self._sequencia = SequenciaPedidos(
+                caminho,
+                prefixo=prefixo,
+                semente=lambda: self._maior_numero_pedido_sheets(prefixo),
+                reservar_bloco=lambda quantidade: self.reservar_bloco_numeros(quantidade, prefixo),
+                # Com 5 números restantes o próximo bloco já é reservado em segundo plano
+                antecipar=5
+            )
+        return self._sequencia
+
+    def get_proximo_numero_pedido(self, prefixo="REQ-") -> int:
+        """
+        Retorna o próximo número de pedido disponível sem varrer a aba 'Pedidos':
+        os números saem de um contador local protegido por bloqueio, abastecido por blocos
+        reservados na aba 'Controle'. Sem bloco disponível (sem conexão), lança
+        ReservaIndisponivel em vez de inventar um número que outro cliente pode usar.
+        """
+        if not self.client or not self.SPREADSHEET_URL:
+            raise ReservaIndisponivel("Google Sheets não configurado: não é possível reservar números de pedido.")
+        return self.obter_sequencia(prefixo).proximo_numero()
@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from utils.file_lock import FileLock
+
+
+class SincronizadorSheets:
+    """
+    Envio em segundo plano (write-behind) das pendências do armazenamento local para o
+    Google Sheets.
+
+    As escritas são gravadas localmente e só avisam o sincronizador; os cursores de
+    sincronização do armazenamento são a fila durável, então nada se perde se o processo
+    parar antes do envio. Uma thread por processo espera alguns instantes após cada aviso
+    (para juntar cliques seguidos em um único append/batch update) e envia tudo o que estiver
+    pendente. Em falha, tenta de novo com espera exponencial e variação aleatória. Pedidos
+    que a planilha recusa não travam a fila: `sincronizar` os move para a quarentena do
+    armazenamento e avança o cursor.
+    """
+
+    _instancias = {}
+    _instancias_guard = threading.Lock()
+
+    @classmethod
+    def obter(cls, chave: str, sincronizar: Callable[[], tuple], contar_pendentes: Callable[[], int], caminho_bloqueio: str, **kwargs) -> "SincronizadorSheets":
+        """Sincronizador compartilhado do processo para o armazenamento `chave`"""
+        with cls._instancias_guard:
+            sincronizador = cls._instancias.get(chave)
+            if sincronizador is None:
+                sincronizador = cls(sincronizar, contar_pendentes, caminho_bloqueio, **kwargs)
+                cls._instancias[chave] = sincronizador
+            return sincronizador
+
+    def __init__(
+        self,
+        sincronizar: Callable[[], tuple],
+        contar_pendentes: Callable[[], int],
+        caminho_bloqueio: str,
+        contar_quarentena: Optional[Callable[[], int]] = None,
+        atraso: float = 2.0,
+        intervalo: float = 60.0,
+        espera_min: float = 5.0,
+        espera_max: float = 300.0
+    ):
+        """
+        Args:
+            sincronizar: Envia as pendências; retorna (sucesso, mensagem)
+            contar_pendentes: Quantidade de pedidos aguardando envio
+            caminho_bloqueio: Arquivo de bloqueio (um único processo envia por vez)
+            contar_quarentena: Quantidade de pedidos recusados pela planilha (fora da fila)
+            atraso: Espera após um aviso, para agrupar escritas seguidas
+            intervalo: Verificação periódica mesmo sem avisos
+            espera_min/espera_max: Limites da espera entre tentativas após falha
+        """
+        self.sincronizar = sincronizar
+        self.contar_pendentes = contar_pendentes
+        self.contar_quarentena = contar_quarentena
+        self.atraso = atraso
+        self.intervalo = intervalo
+        self.espera_min = espera_min
+        self.espera_max = espera_max
+        self._bloqueio = FileLock(caminho_bloqueio, timeout=intervalo)
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pendente_desde = None
+        self._ultimo_aviso = None
+        self.falhas_seguidas = 0
+        self.ultimo_erro = None
+        self.ultimo_envio = None
+
+    def iniciar(self):
+        """Inicia a thread de envio (se ainda não estiver rodando); ela começa enviando o que houver pendente"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="sincronizador-sheets", daemon=True)
+                self._thread.start()
+
+    def notificar(self):
+        """Avisa que há escritas locais novas a enviar"""
+        with self._lock:
+            self._ultimo_aviso = time.time()
+            if self._pendente_desde is None:
+                self._pendente_desde = self._ultimo_aviso
+        self.iniciar()
+        self._evento.set()
+
+    def status(self) -> dict:
+        """Tamanho da fila e da quarentena, atraso do item mais antigo e resultado da última tentativa"""
+        try:
+            pendentes = self.contar_pendentes()
+        except Exception:
+            pendentes = None
+        try:
+            quarentena = self.contar_quarentena() if self.contar_quarentena else 0
+        except Exception:
+            quarentena = None
+        with self._lock:
+            atraso = time.time() - self._pendente_desde if self._pendente_desde and pendentes else 0.0
+            return {
+                "pendentes": pendentes,
+                "quarentena": quarentena,
+                "atraso_s": round(atraso, 1),
+                "falhas_seguidas": self.falhas_seguidas,
+                "ultimo_erro": self.ultimo_erro,
+                "ultimo_envio": self.ultimo_envio
+            }
+
+    def _executar(self):
+        # Primeira passada imediata: envia o que ficou pendente de execuções anteriores
+        pausa = 0.0
+        primeira = True
+        while True:
+            if primeira:
+                primeira = False
+            elif pausa:
+                # Aguardando nova tentativa: avisos não antecipam o envio
+                time.sleep(pausa)
+            elif self._evento.wait(self.intervalo):
+                time.sleep(self.atraso)
+            self._evento.clear()
+            if self._drenar():
+                pausa = 0.0
+            else:
+                espera = min(self.espera_max, self.espera_min * 2 ** (self.falhas_seguidas - 1))
+                pausa = espera * random.uniform(0.5, 1.0)
+
+    def _drenar(self) -> bool:
+        inicio = time.time()
+        enviou = False
+        try:
+            with self._bloqueio:
+                if not self.contar_pendentes():
+                    sucesso, mensagem = True, ""
+                else:
+                    enviou = True
+                    sucesso, mensagem = self.sincronizar()
+        except Exception as e:
+            sucesso, mensagem = False, str(e)
+
+        with self._lock:
+            if sucesso:
+                self.falhas_seguidas = 0
+                self.ultimo_erro = None
+                if enviou:
+                    self.ultimo_envio = datetime.now()
+                # Escritas avisadas durante o envio continuam pendentes
+                self._pendente_desde = self._ultimo_aviso if self._ultimo_aviso and self._ultimo_aviso > inicio else None
+            else:
+                self.falhas_seguidas += 1
+                self.ultimo_erro = mensagem
+                if self._pendente_desde is None:
+                    self._pendente_desde = inicio
+        return sucesso
@@ -3,20 +3,14 @@ import os
 from datetime import datetime
 import platform
 from utils.sheets_pedidos_sync import SheetsPedidosSync
+from utils.file_lock import EstatisticasBloqueio
+from utils.backup_pedidos import RestauracaoIncompleta
 
 class ConfiguracoesView:
     def __init__(self, pedido_controller):
         self.controller = pedido_controller
         self.sheets_sync = self.controller.sheets_sync if hasattr(self.controller, 'sheets_sync') else None
 
-        self.base_dir = os.path.join(
-            os.path.expanduser("~"),
-            "OneDrive - Yazaki",
-            "Solicitação",
-            "Pedidos"
-        )
-        self.arquivo_backup = os.path.join(self.base_dir, "backup")
-
     def _inicializar_planilha(self):
         """Inicializa a estrutura da planilha com todas as colunas necessárias"""
         if not self.sheets_sync or not self.sheets_sync.client:
@@ -24,8 +18,6 @@ class ConfiguracoesView:
             return False
 
         try:
-            sheet = self.sheets_sync.client.open_by_url(self.sheets_sync.SPREADSHEET_URL)
-            
             # Colunas necessárias para a aba Pedidos
             colunas_pedidos = [
                 "Numero_Pedido", "Data", "Serial", "Maquina", "Posto", "Coordenada",
@@ -36,15 +28,12 @@ class ConfiguracoesView:
             ]
 
             # Verificar/criar aba Pedidos
-            try:
-                ws_pedidos = sheet.worksheet("Pedidos")
-            except:
-                ws_pedidos = sheet.add_worksheet("Pedidos", 1000, len(colunas_pedidos))
+            ws_pedidos = self.sheets_sync.obter_aba("Pedidos", criar=True, rows=1000, cols=len(colunas_pedidos))
             
             # Atualizar cabeçalhos
-            headers = ws_pedidos.row_values(1)
+            headers = self.sheets_sync.executar(lambda: ws_pedidos.row_values(1))
             if not headers or len(headers) < len(colunas_pedidos):
-                ws_pedidos.update('A1', [colunas_pedidos])
+                self.sheets_sync.executar(lambda: ws_pedidos.update('A1', [colunas_pedidos]), escrita=True)
                 st.success("Estrutura da planilha atualizada com sucesso!")
             return True
 
@@ -91,54 +80,128 @@ class ConfiguracoesView:
         - **Versão Python:** {platform.python_version()}
         - **Ambiente:** {"Streamlit Cloud" if os.getenv('IS_STREAMLIT_CLOUD', '0') == '1' else "Local"}
         """)
-        
+
         st.markdown("---")
-        
+
+        # Exportação dos pedidos locais para Excel
+        st.markdown("#### 📤 Exportar Pedidos")
+        if st.button("📤 Exportar pedidos para Excel"):
+            try:
+                caminho = self.controller.exportar_pedidos_excel()
+                st.success(f"Pedidos exportados para {caminho}")
+            except Exception as e:
+                st.error(f"Erro ao exportar pedidos: {str(e)}")
+
+        st.markdown("---")
+
+        # Contenção no acesso aos arquivos de pedidos (desde o início deste processo)
+        st.markdown("#### 🔒 Bloqueios de Arquivo")
+        estatisticas = EstatisticasBloqueio.resumo()
+        if estatisticas:
+            st.dataframe(estatisticas, hide_index=True, use_container_width=True)
+        else:
+            st.info("Nenhum bloqueio registrado ainda")
+
+        # Uso da cota do Google Sheets (esperas no limite, respostas 429 e erros 5xx)
+        if self.sheets_sync and self.sheets_sync.client:
+            st.markdown("#### 📶 Cota do Google Sheets")
+            st.dataframe(self.sheets_sync.estatisticas_cota(), hide_index=True, use_container_width=True)
+
+            # Leituras compartilhadas entre as sessões (acertos no cache x leituras na planilha)
+            estatisticas_cache = self.sheets_sync.estatisticas_cache()
+            if estatisticas_cache:
+                st.markdown("#### 🗂️ Cache de Leituras")
+                st.dataframe(estatisticas_cache, hide_index=True, use_container_width=True)
+
+        # Fila de envio ao Google Sheets (gravações locais aguardando o sincronizador)
+        status_envio = self.controller.status_sincronizacao()
+        if status_envio:
+            st.markdown("#### 🔄 Envio ao Google Sheets")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Pedidos na fila", status_envio["pendentes"] if status_envio["pendentes"] is not None else "?")
+            col2.metric("Atraso", f"{status_envio['atraso_s']:.0f} s")
+            col3.metric("Último envio", status_envio["ultimo_envio"].strftime('%H:%M:%S') if status_envio["ultimo_envio"] else "-")
+            if status_envio["ultimo_erro"]:
+                st.warning(f"Falha no envio ({status_envio['falhas_seguidas']} tentativa(s)): {status_envio['ultimo_erro']}")
+
+            # Pedidos recusados pela planilha: fora da fila até serem reenviados ou descartados
+            quarentena = self.controller.quarentena_sincronizacao()
+            if not quarentena.empty:
+                st.warning(f"{len(quarentena)} pedido(s) recusado(s) pelo Google Sheets em quarentena")
+                st.dataframe(quarentena, hide_index=True, use_container_width=True)
+                selecionados = st.multiselect(
+                    "Pedidos", quarentena["Numero_Pedido"].unique().tolist(), key="quarentena_pedidos"
+                )
+                col1, col2 = st.columns(2)
+                if col1.button("🔁 Reenviar", key="quarentena_reenviar", disabled=not selecionados):
+                    reenviados = self.controller.reenviar_quarentena(selecionados)
+                    st.success(f"{reenviados} pedido(s) devolvido(s) à fila de envio.")
+                    st.rerun()
+                if col2.button("🗑️ Descartar", key="quarentena_descartar", disabled=not selecionados):
+                    descartados = self.controller.descartar_quarentena(selecionados)
+                    st.success(f"{descartados} pedido(s) removido(s) da quarentena.")
+                    st.rerun()
+
 
     def _mostrar_config_sheets(self):
         self.sheets_sync.render_config_page()
 
     def _mostrar_backups(self):
-        # Mostrar backups disponíveis
+        # Mostrar pontos de restauração disponíveis
         st.markdown("#### 💾 Backups Disponíveis")
-        
-        if not os.path.exists(self.arquivo_backup):
-            os.makedirs(self.arquivo_backup, exist_ok=True)
-            
-        backups = sorted([
-            f for f in os.listdir(self.arquivo_backup)
-            if f.endswith('.xlsx')
-        ], reverse=True)
-        
-        if not backups:
+
+        pontos = self.controller.listar_pontos_restauracao()
+        if not pontos:
             st.info("Nenhum backup encontrado")
         else:
-            for backup in backups:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.text(backup)
-                with col2:
-                    if st.button("📥 Restaurar", key=f"restore_{backup}"):
-                        try:
-                            # Restaurar backup                            backup_path = os.path.join(self.arquivo_backup, backup)
-                            os.replace(backup_path, self.arquivo_pedidos)
-                            st.success("Backup restaurado com sucesso!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Erro ao restaurar backup: {str(e)}")
-        
+            for ponto in reversed(pontos):
+                st.text(
+                    f"{ponto['snapshot'].strftime('%d/%m/%Y %H:%M:%S')} — {ponto['linhas']} pedidos"
+                    f" + {ponto['operacoes']} alterações (até {ponto['ate'].strftime('%d/%m/%Y %H:%M:%S')})"
+                )
+
+            # Restauração para um instante específico
+            st.markdown("#### 📥 Restaurar")
+            col1, col2 = st.columns(2)
+            with col1:
+                data = st.date_input("Data", value=datetime.now().date(), key="restore_data")
+            with col2:
+                hora = st.time_input("Hora", value=datetime.now().time(), key="restore_hora")
+            if st.button("📥 Restaurar", key="restore_backup"):
+                st.session_state.pop("restore_lacuna", None)
+                try:
+                    restaurados = self.controller.restaurar_backup(datetime.combine(data, hora))
+                    st.success(f"Backup restaurado com sucesso! {restaurados} pedidos.")
+                    st.rerun()
+                except RestauracaoIncompleta as e:
+                    st.session_state["restore_lacuna"] = {"ate": e.disponivel_ate, "mensagem": str(e)}
+                except Exception as e:
+                    st.error(f"Erro ao restaurar backup: {str(e)}")
+
+            # O instante pedido caiu em um trecho já descartado: só restaura o ponto anterior se confirmado
+            lacuna = st.session_state.get("restore_lacuna")
+            if lacuna:
+                st.warning(f"⚠️ {lacuna['mensagem']}")
+                if st.button(f"📥 Restaurar o estado de {lacuna['ate'].strftime('%d/%m/%Y %H:%M:%S')}", key="restore_lacuna_btn"):
+                    try:
+                        restaurados = self.controller.restaurar_backup(lacuna["ate"], aceitar_lacuna=True)
+                        st.session_state.pop("restore_lacuna", None)
+                        st.success(f"Backup restaurado com sucesso! {restaurados} pedidos.")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Erro ao restaurar backup: {str(e)}")
+
         # Informações sobre backups
         st.markdown("#### ℹ️ Informações")
         st.markdown("""
-        - O sistema mantém automaticamente os últimos 10 backups
-        - Um novo backup é criado sempre que há alterações nos pedidos
-        - Os backups são nomeados com data e hora para fácil identificação
-        - Use o botão "Restaurar" para voltar a uma versão anterior dos dados
+        - Um snapshot compactado dos pedidos é gravado a cada hora; entre snapshots, cada alteração é registrada em um diário
+        - São mantidos um snapshot por hora nas últimas 24 horas, um por dia na última semana e um por semana nas últimas 8 semanas
+        - Escolha a data e a hora para voltar os dados ao estado daquele momento
         """)
-        
+
         # Aviso importante
         st.warning("""
         **⚠️ Atenção!**  
         Ao restaurar um backup, a versão atual dos dados será substituída.
         Certifique-se de que deseja realmente fazer isso antes de prosseguir.
-        """)
\ No newline at end of file
+        """)
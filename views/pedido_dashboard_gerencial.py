@@ -1,21 +1,25 @@
 import streamlit as st
 import pandas as pd
+from utils.cota_sheets import PRIORIDADE_SEGUNDO_PLANO
 
 def mostrar_dashboard_gerencial(controller):
     """
     Exibe um dashboard gerencial com totais gerais.
     controller: instância de PedidoController
     """
-    # Buscar todos os pedidos
-    df_pedidos = controller.buscar_pedidos(status=None)
-    if df_pedidos.empty:
+    # Contagem por Status (só a coluna Status; o último resultado é servido e relido em segundo plano)
+    contagem = controller.contar_status(prioridade=PRIORIDADE_SEGUNDO_PLANO)
+    if contagem.empty:
         return
+    legenda = controller.legenda_contagem_status()
+    if legenda:
+        st.caption(legenda)
 
     # --- TOTAIS GERAIS ---
-    total_pedidos = len(df_pedidos)
-    total_concluido = len(df_pedidos[df_pedidos['Status'] == 'CONCLUÍDO'])
-    total_processando = len(df_pedidos[df_pedidos['Status'] == 'PROCESSO'])
-    total_pendente = len(df_pedidos[df_pedidos['Status'] == 'PENDENTE'])
+    total_pedidos = int(contagem.sum())
+    total_concluido = int(contagem.get('CONCLUÍDO', 0))
+    total_processando = int(contagem.get('PROCESSO', 0))
+    total_pendente = int(contagem.get('PENDENTE', 0))
 
     st.markdown(f"""
     <style>
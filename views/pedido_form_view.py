@@ -1,5 +1,6 @@
 import streamlit as st
 from controllers.pedido_controller import PedidoController
+from utils.cache_colunar import ler_excel
 from datetime import datetime
 import pandas as pd
 import os
@@ -340,59 +341,58 @@ class PedidoFormView:
                     df_paco = pd.DataFrame([p.__dict__ for p in pedidos_paco])
                     df_paco.columns = [str(col).strip().title() for col in df_paco.columns]
                 else:
-                    df_paco = pd.read_excel(self.pedido_controller.caminho_planilha, sheet_name='Paco', dtype=str)
+                    df_paco = ler_excel(self.pedido_controller.caminho_planilha, 'Paco', dtype=str)
                     df_paco = df_paco.fillna("")
                     df_paco.columns = [str(col).strip().title() for col in df_paco.columns]
+                # Índice do catálogo por serial normalizado (uma passada só)
+                paco_por_serial = {}
+                for row in df_paco.to_dict(orient='records'):
+                    serial = str(row.get('Serial', '')).strip().upper()
+                    if serial and serial not in paco_por_serial:
+                        paco_por_serial[serial] = {
+                            'serial': str(row.get('Serial', '')).strip(),
+                            'maquina': str(row.get('Maquina', '')).strip(),
+                            'posto': str(row.get('Posto', '')).strip(),
+                            'coordenada': str(row.get('Coordenada', '')).strip(),
+                            'modelo': str(row.get('Modelo', '')).strip(),
+                            'ot': str(row.get('Ot', '')).strip(),
+                            'semiacabado': str(row.get('Semiacabado', '')).strip(),
+                            'pagoda': str(row.get('Pagoda', '')).strip()
+                        }
                 resultados = []
                 pedidos_criados = []
+                pedidos_lote = []
+                posicoes_lote = []
                 for item in cache:
                     codigo = item['serial']
-                    codigo_norm = str(codigo).strip().upper()
-                    pedido_encontrado = None
-                    for _, row in df_paco.iterrows():
-                        serial = str(row.get('Serial', '')).strip().upper()
-                        if serial and serial == codigo_norm:
-                            pedido_encontrado = {
-                                'serial': str(row.get('Serial', '')).strip(),
-                                'maquina': str(row.get('Maquina', '')).strip(),
-                                'posto': str(row.get('Posto', '')).strip(),
-                                'coordenada': str(row.get('Coordenada', '')).strip(),
-                                'modelo': str(row.get('Modelo', '')).strip(),
-                                'ot': str(row.get('Ot', '')).strip(),
-                                'semiacabado': str(row.get('Semiacabado', '')).strip(),
-                                'pagoda': str(row.get('Pagoda', '')).strip()
-                            }
-                            break
+                    pedido_encontrado = paco_por_serial.get(str(codigo).strip().upper())
                     if pedido_encontrado:
                         data_atual = datetime.now()
-                        pedido_info = {
+                        pedidos_lote.append({
                             **pedido_encontrado,
                             "solicitante": "Sistema Automático",
                             "observacoes": "",
                             "urgente": "Não",
                             "data": data_atual,
                             "ultima_atualizacao": data_atual
-                        }
-                        try:
-                            numero_pedido = self.pedido_controller.salvar_pedido(pedido_info)
-                            if numero_pedido:
-                                status = "✅"
-                                mensagem = f"Pedido {numero_pedido} criado com sucesso"
-                                pedidos_criados.append(numero_pedido)
-                            else:
-                                status = "❌"
-                                mensagem = "Erro ao criar pedido"
-                        except Exception as e:
-                            status = "❌"
-                            mensagem = f"Erro ao criar pedido: {str(e)}"
+                        })
+                        posicoes_lote.append(len(resultados))
+                        resultados.append({'serial': codigo, 'status': "❌", 'mensagem': "Erro ao criar pedido"})
                     else:
-                        status = "❌"
-                        mensagem = "Serial não encontrado na planilha"
-                    resultados.append({
-                        'serial': codigo,
-                        'status': status,
-                        'mensagem': mensagem
-                    })
+                        resultados.append({
+                            'serial': codigo,
+                            'status': "❌",
+                            'mensagem': "Serial não encontrado na planilha"
+                        })
+                # Criar todos os pedidos encontrados em uma única operação
+                if pedidos_lote:
+                    for posicao, resultado_lote in zip(posicoes_lote, self.pedido_controller.salvar_pedidos_lote(pedidos_lote)):
+                        if resultado_lote['numero_pedido']:
+                            resultados[posicao]['status'] = "✅"
+                            resultados[posicao]['mensagem'] = f"Pedido {resultado_lote['numero_pedido']} criado com sucesso"
+                            pedidos_criados.append(resultado_lote['numero_pedido'])
+                        else:
+                            resultados[posicao]['mensagem'] = f"Erro ao criar pedido: {resultado_lote['erro']}"
                 # Limpar cache após sincronizar
                 self.cache_manager.clear_cache()
                 st.markdown('<div class="resultados-container">', unsafe_allow_html=True)
@@ -200,8 +200,13 @@ class PedidoHistoricoView:
             # Carregar e filtrar dados
             df_pedidos = self.controller.buscar_pedidos(
                 numero_pedido=filtro_numero if filtro_numero else None,
-                status=filtro_status if filtro_status != "TODOS" else None
+                status=filtro_status if filtro_status != "TODOS" else None,
+                data_inicial=data_inicial,
+                data_final=data_final
             )
+            legenda = self.controller.legenda_atualizacao_pedidos()
+            if legenda:
+                st.caption(legenda)
             
             if df_pedidos.empty:
                 st.info("Nenhum pedido encontrado.")
@@ -210,12 +215,6 @@ class PedidoHistoricoView:
             # Converter coluna de data para datetime
             df_pedidos['Data'] = pd.to_datetime(df_pedidos['Data'], errors='coerce')
 
-            # Aplicar filtros de data se fornecidos
-            if data_inicial is not None:
-                df_pedidos = df_pedidos[df_pedidos['Data'].dt.date >= data_inicial]
-            if data_final is not None:
-                df_pedidos = df_pedidos[df_pedidos['Data'].dt.date <= data_final]
-
             # Layout em duas colunas com proporção ajustada
             col1, col2 = st.columns([4, 1])
 
@@ -283,17 +282,18 @@ class PedidoHistoricoView:
                     # Se houver alterações, exibir botão para salvar
                     if status_alterados:
                         if st.button("Salvar Alterações", type="primary"):
-                            for alteracao in status_alterados:
-                                try:
-                                    self.controller.atualizar_status_pedido(
-                                        numero_pedido=alteracao['numero_pedido'],
-                                        novo_status=alteracao['novo_status'],
-                                        responsavel="Usuário do Sistema"
-                                    )
-                                except Exception as e:
-                                    st.error(f"Erro ao atualizar status do pedido {alteracao['numero_pedido']}: {str(e)}")
-                            st.success("Status do(s) pedido(s) atualizado(s).")
-                            st.rerun()
+                            erros = self.controller.atualizar_status_pedidos(
+                                status_alterados,
+                                responsavel="Usuário do Sistema"
+                            )
+                            atualizados = len(status_alterados) - len(erros)
+                            if atualizados:
+                                st.success(f"Status de {atualizados} pedido(s) atualizado(s).")
+                            for numero_pedido, erro in erros.items():
+                                st.error(f"Erro ao atualizar o status do pedido {numero_pedido}: {erro}")
+                            # Com erros, mantém a tela para que as mensagens fiquem visíveis
+                            if not erros:
+                                st.rerun()
 
             with col2:
                 st.markdown("##### Detalhes do Pedido")
@@ -326,6 +326,12 @@ class PedidoHistoricoView:
                             **Status Atual:** {status_atual}
                             """, unsafe_allow_html=True)
                         st.markdown('</div>', unsafe_allow_html=True)
+
+                        # Histórico de mudanças de status
+                        historico = self.controller.historico_status_pedido(row['Número'])
+                        if not historico.empty:
+                            with st.expander("🕒 Histórico de Status"):
+                                st.dataframe(historico.drop(columns=['Numero_Pedido']), hide_index=True, use_container_width=True)
                         
                         # Adicionar seletor de status
                         st.markdown('<div class="status-select-container">', unsafe_allow_html=True)